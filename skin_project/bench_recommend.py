@@ -0,0 +1,425 @@
+"""
+/recommend/ai 추천 파이프라인 벤치마크 (OpenAI / Pinecone 키 없이 로컬에서 실행)
+
+- 가짜 OpenAI 호환 HTTP 서버: 응답 지연(첫 토큰까지), 초당 토큰 수, 응답 토큰 수 설정 가능
+  (스트리밍/JSON 모드 포함, llm_client가 실제 HTTP로 호출)
+- 로컬 벡터 백엔드: 카테고리별 가상 제품 centroid 인덱스를 메모리에 생성 (또는 빌드된 인덱스 사용)
+- DB: sqlite 파일 (추천 내역 저장, 캐시 조회 테이블만 생성)
+- 실제 recommendation 라우터를 FastAPI TestClient로 지정한 동시성만큼 호출하고
+  단계별(인코딩, 검색, LLM 호출, 캐시 조회, DB 저장) 지연 시간과 처리량을 출력
+
+실행:
+    python bench_recommend.py --requests 200 --concurrency 16 --llm-latency-ms 300 --llm-tokens-per-sec 80
+    python bench_recommend.py --fake-encoder --output bench_result.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_REQUESTS = 100
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PRODUCTS = 300
+EMBEDDING_DIM = 768
+CATEGORY_PATTERN_PREFIX = "products의 category는 "
+
+
+# ========== 단계별 지연 시간 기록 ==========
+class StageTimer:
+    """단계 이름별 소요 시간(ms) 기록"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.enabled = True
+
+    def record(self, stage: str, elapsed_ms: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.samples[stage].append(elapsed_ms)
+
+    def wrap(self, module, attr: str, stage: str):
+        """module.attr 함수를 호출 시간을 기록하는 함수로 교체"""
+        original = getattr(module, attr)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, (time.perf_counter() - started) * 1000)
+
+        setattr(module, attr, timed)
+
+    def summary(self) -> Dict[str, Dict]:
+        result = {}
+        with self._lock:
+            for stage, values in sorted(self.samples.items()):
+                data = np.array(values)
+                result[stage] = {
+                    "count": len(values),
+                    "mean_ms": round(float(data.mean()), 2),
+                    "p50_ms": round(float(np.percentile(data, 50)), 2),
+                    "p95_ms": round(float(np.percentile(data, 95)), 2),
+                    "p99_ms": round(float(np.percentile(data, 99)), 2),
+                    "max_ms": round(float(data.max()), 2)
+                }
+        return result
+
+
+def instrument_llm(timer: StageTimer, client):
+    """llm_client.chat / stream_chat 호출 시간을 용도(tag)별로 기록 (스트림은 끝까지 읽은 시점 기준)"""
+    chat, stream_chat = client.chat, client.stream_chat
+
+    def timed_chat(*args, tag: str = "default", **kwargs):
+        started = time.perf_counter()
+        try:
+            return chat(*args, tag=tag, **kwargs)
+        finally:
+            timer.record(f"llm.{tag}", (time.perf_counter() - started) * 1000)
+
+    def timed_stream_chat(*args, tag: str = "default", **kwargs):
+        started = time.perf_counter()
+        first_chunk = None
+        try:
+            for chunk in stream_chat(*args, tag=tag, **kwargs):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter()
+                    timer.record(f"llm.{tag}.first_chunk", (first_chunk - started) * 1000)
+                yield chunk
+        finally:
+            timer.record(f"llm.{tag}", (time.perf_counter() - started) * 1000)
+
+    client.chat = timed_chat
+    client.stream_chat = timed_stream_chat
+
+
+# ========== 가짜 OpenAI 서버 ==========
+class FakeLLMConfig:
+    def __init__(self, latency_ms: float = 300, tokens_per_sec: float = 0, completion_tokens: int = 120,
+                 error_rate: float = 0.0):
+        self.latency = latency_ms / 1000.0
+        self.token_delay = 1.0 / tokens_per_sec if tokens_per_sec else 0.0
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+
+
+def _filler(tokens: int) -> str:
+    return "리뷰에서 보습과 진정 효과가 좋다는 평가가 많습니다" * max(1, tokens // 25)
+
+
+def fake_completion_content(messages: List[Dict], json_mode: bool, completion_tokens: int) -> str:
+    """요청 형식에 맞는 가짜 응답 (JSON 모드면 프롬프트의 카테고리로 구조화 응답 생성)"""
+    prompt = messages[-1].get("content", "") if messages else ""
+    if not json_mode:
+        return _filler(completion_tokens)
+
+    categories = []
+    for line in prompt.split("\n"):
+        if line.startswith(CATEGORY_PATTERN_PREFIX):
+            categories = [name.strip() for name in line[len(CATEGORY_PATTERN_PREFIX):].split(" 중 ")[0].split(",")]
+    per_item = max(1, completion_tokens // (len(categories) + 3))
+    reason = _filler(per_item)[:per_item]
+    document = {
+        "products": [{"category": category, "reason": reason} for category in categories],
+        "ointment": {"name": "벤치 연고", "reason": reason},
+        "procedures": [{"name": "레이저 토닝", "reason": reason}, {"name": "아쿠아 필링", "reason": reason}]
+    }
+    if not categories:
+        document.pop("products")
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+
+
+def make_handler(config: FakeLLMConfig):
+    class FakeOpenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            time.sleep(config.latency)
+            if config.error_rate and random.random() < config.error_rate:
+                return self._send_json(503, {"error": {"message": "fake overload", "type": "server_error"}})
+
+            json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+            content = fake_completion_content(body.get("messages", []), json_mode, config.completion_tokens)
+            pieces = [content[i:i + 2] for i in range(0, len(content), 2)]  # 2글자 ≈ 1토큰
+            usage = {"prompt_tokens": sum(len(m.get("content", "")) for m in body.get("messages", [])),
+                     "completion_tokens": len(pieces)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "fake")}
+
+            if not body.get("stream"):
+                time.sleep(config.token_delay * len(pieces))
+                return self._send_json(200, {
+                    **base, "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": usage
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for piece in pieces:
+                time.sleep(config.token_delay)
+                self._send_event({**base, "object": "chat.completion.chunk",
+                                  "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+            self._send_event({**base, "object": "chat.completion.chunk",
+                              "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._send_event({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+
+        def _send_json(self, status: int, payload: Dict):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_event(self, payload: Dict):
+            self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return FakeOpenAIHandler
+
+
+def start_fake_llm_server(config: FakeLLMConfig, port: int = 0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    print(f"🚀 가짜 OpenAI 서버 시작: http://127.0.0.1:{server.server_address[1]}/v1")
+    return server
+
+
+# ========== 로컬 백엔드 ==========
+class HashingEncoder:
+    """모델 없이 쓰는 결정적 임베딩 (같은 문장 -> 같은 벡터)"""
+
+    def __init__(self, dimension: int = EMBEDDING_DIM):
+        self.dimension = dimension
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:4], "little")
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dimension))
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def build_synthetic_product_indexes(products_per_category: int, dimension: int, seed: int = 0):
+    """카테고리별 가상 제품 centroid 인덱스 (전체 + 피부타입별)를 제품 인덱스 캐시에 등록"""
+    import product_index
+    from vector_store import LocalVectorIndex
+    from recommendation import INDEXES
+
+    rng = np.random.default_rng(seed)
+    for label, category in INDEXES.items():
+        vectors = []
+        for i in range(products_per_category):
+            base = rng.standard_normal(dimension)
+            meta = {
+                "product_name": f"벤치 {label} {i:04d}",
+                "category": category,
+                "review": "촉촉하고 자극이 없어요. 트러블이 진정됐어요. " * 5,
+                "link": "",
+                "image_url": "",
+                "price": 20000
+            }
+            vectors.append({"id": f"{category}_{i}", "values": base, "metadata": {**meta, "skin_type": ""}})
+            for skin_type in product_index.SKIN_TYPES[:3]:
+                vectors.append({
+                    "id": f"{category}_{i}_{skin_type}",
+                    "values": base + 0.3 * rng.standard_normal(dimension),
+                    "metadata": {**meta, "skin_type": skin_type}
+                })
+        index = LocalVectorIndex()
+        index.upsert(vectors)
+        product_index._product_indexes[category] = index
+    print(f"✅ 가상 제품 인덱스 생성: 카테고리당 {products_per_category}개 제품")
+
+
+def setup_database(database_url: str):
+    """벤치마크용 DB로 SessionLocal 교체 + 추천 경로에서 쓰는 테이블 생성"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    import database
+    from core.models import db_models
+
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, connect_args=connect_args)
+    database.engine = engine
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    database.Base.metadata.create_all(bind=engine, tables=[
+        db_models.User.__table__, db_models.Product.__table__,
+        db_models.RecommendationHistory.__table__, db_models.RecommendationProduct.__table__,
+        db_models.ProfileRecommendation.__table__, db_models.ProductExplanation.__table__,
+        db_models.UserSkinProfile.__table__
+    ])
+    return engine
+
+
+# ========== 부하 생성 ==========
+def random_payload(rng: random.Random, user_ids: int) -> Dict:
+    from profile_recommendations import SKIN_TYPES, SENSITIVITIES, CONCERNS
+
+    return {
+        "skin_type": rng.choice(SKIN_TYPES),
+        "sensitivity": rng.choice(SENSITIVITIES),
+        "diagnosis": rng.sample(CONCERNS, rng.randint(1, 2)),
+        "user_id": rng.randint(1, user_ids) if user_ids else None
+    }
+
+
+def run_load(client, total: int, concurrency: int, timer: StageTimer, user_ids: int = 0, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    payloads = [random_payload(rng, user_ids) for _ in range(total)]
+    status_counts: Dict[int, int] = defaultdict(int)
+    lock = threading.Lock()
+
+    def send(payload):
+        started = time.perf_counter()
+        response = client.post("/recommend/ai", json=payload)
+        timer.record("request", (time.perf_counter() - started) * 1000)
+        with lock:
+            status_counts[response.status_code] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, payloads))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "status_codes": dict(status_counts)
+    }
+
+
+def print_report(result: Dict):
+    load = result["load"]
+    print(f"\n📊 요청 {load['requests']}개, 동시성 {load['concurrency']}, {load['elapsed_s']}초 "
+          f"-> {load['throughput_rps']} req/s, 상태 코드 {load['status_codes']}")
+    print(f"{'단계':<34}{'횟수':>7}{'평균':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'최대':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<36}{stats['count']:>7}{stats['mean_ms']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    print(f"🧾 추천 내역 저장: {result['history_writer']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--warmup", type=int, default=5, help="측정에서 제외할 초기 요청 수")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="가짜 LLM 첫 토큰까지 지연")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=0, help="가짜 LLM 토큰 생성 속도 (0이면 즉시)")
+    parser.add_argument("--llm-completion-tokens", type=int, default=120)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="가짜 LLM 503 응답 비율")
+    parser.add_argument("--products", type=int, default=DEFAULT_PRODUCTS, help="카테고리당 가상 제품 수")
+    parser.add_argument("--use-built-indexes", action="store_true", help="가상 인덱스 대신 빌드된 제품 인덱스 사용")
+    parser.add_argument("--fake-encoder", action="store_true", help="임베딩 모델 대신 해시 임베딩 사용")
+    parser.add_argument("--user-ids", type=int, default=0, help="요청에 섞을 사용자 수 (0이면 비로그인)")
+    parser.add_argument("--database-url", default=None, help="기본: 임시 sqlite 파일")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from openai import OpenAI
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    setup_database(database_url)
+
+    import recommendation
+    import history_writer as history_writer_module
+    from embedding_service import embedding_service
+    from llm_client import llm_client
+    from structured_output import structured_output_stats
+
+    # 외부 서비스 대체
+    server = start_fake_llm_server(FakeLLMConfig(args.llm_latency_ms, args.llm_tokens_per_sec,
+                                                 args.llm_completion_tokens, args.llm_error_rate))
+    llm_client._client = OpenAI(base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+                                api_key="bench", max_retries=0)
+    recommendation.pc = None
+    if args.fake_encoder:
+        embedding_service._encoder = HashingEncoder()
+    dimension = embedding_service.encoder.encode(["벤치마크"]).shape[1]
+    if not args.use_built_indexes:
+        build_synthetic_product_indexes(args.products, dimension, args.seed)
+
+    # 단계별 계측
+    timer = StageTimer()
+    timer.wrap(recommendation, "encode", "encode")
+    timer.wrap(recommendation, "retrieve_best_product", "retrieval")
+    timer.wrap(recommendation, "get_profile_recommendation", "db.profile_lookup")
+    timer.wrap(recommendation, "get_user_profile", "db.user_profile")
+    timer.wrap(recommendation, "get_cached_reasons", "db.cached_reasons")
+    timer.wrap(recommendation, "generate_recommendation", "generate")
+    timer.wrap(history_writer_module.history_writer, "write_batch", "db.history_batch")
+    instrument_llm(timer, llm_client)
+
+    app = FastAPI()
+    app.include_router(recommendation.router)
+    history_writer_module.history_writer.start()
+
+    with TestClient(app) as client:
+        if args.warmup:
+            timer.enabled = False
+            run_load(client, args.warmup, min(args.concurrency, args.warmup), timer, args.user_ids, args.seed + 1)
+            history_writer_module.history_writer.flush()
+            timer.enabled = True
+        load = run_load(client, args.requests, args.concurrency, timer, args.user_ids, args.seed)
+
+    flush_started = time.perf_counter()
+    history_writer_module.history_writer.flush()
+    history_writer_module.history_writer.stop()
+    server.shutdown()
+
+    result = {
+        "load": load,
+        "stages": timer.summary(),
+        "history_writer": {**history_writer_module.history_writer.status(),
+                           "final_flush_ms": round((time.perf_counter() - flush_started) * 1000, 1)},
+        "llm": {key: value for key, value in llm_client.status().items() if key != "recent"},
+        "structured_output": structured_output_stats(),
+        "config": vars(args)
+    }
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✅ 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Enum, UniqueConstraint, Float, DateTime, Boolean, Text, ForeignKey, JSON, Date
+from sqlalchemy import Column, Integer, String, Enum, UniqueConstraint, Float, DateTime, Boolean, Text, ForeignKey, JSON, Date, LargeBinary, Index
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -31,6 +31,9 @@ class User(Base):
 # 제품 관련 모델들
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_category_id_page", "category", "id"),  # 카테고리별 목록 키셋 페이지네이션
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
@@ -40,6 +43,7 @@ class Product(Base):
     original_price = Column(Integer, nullable=True)
     rating = Column(Float, default=0.0)
     review_count = Column(Integer, default=0)
+    rating_sum = Column(Float, nullable=True)  # 리뷰 평점 합계 (NULL이면 아직 집계 전, crud.apply_product_rating_delta)
     description = Column(Text, nullable=True)
     volume = Column(String, nullable=True)
     is_popular = Column(Boolean, default=False)
@@ -115,6 +119,9 @@ class ProductShop(Base):
 # AI 추천 내역 관련 모델들
 class RecommendationHistory(Base):
     __tablename__ = "recommendation_history"
+    __table_args__ = (
+        Index("ix_recommendation_history_user_created_page", "user_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)  # User 테이블 참조 (외래키로 설정 안함 - 간단히)
@@ -122,7 +129,7 @@ class RecommendationHistory(Base):
     sensitivity = Column(String, nullable=False)  # 피부 민감도
     concerns = Column(JSON, nullable=False)  # 피부 고민 리스트 ["여드름", "홍조"]
     ai_explanation = Column(Text, nullable=True)  # AI 분석 결과 설명
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 목록 페이지네이션 정렬 키
     
     # 관계 설정
     recommended_products = relationship("RecommendationProduct", back_populates="recommendation")
@@ -141,9 +148,53 @@ class RecommendationProduct(Base):
     # 관계 설정
     recommendation = relationship("RecommendationHistory", back_populates="recommended_products")
 
+# 피부 프로필별 사전 계산 추천 (오프라인 작업으로 갱신)
+class ProfileRecommendation(Base):
+    __tablename__ = "profile_recommendations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    profile_key = Column(String, nullable=False, unique=True, index=True)  # "건성|보통|여드름,홍조"
+    skin_type = Column(String, nullable=False)
+    sensitivity = Column(String, nullable=False)
+    concerns = Column(JSON, nullable=False)  # 정렬된 피부 고민 리스트
+    result = Column(JSON, nullable=False)  # {"분석 요약", "추천 리스트"} 응답 그대로
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# 제품별 AI 추천 이유 캐시 (오프라인 배치로 생성)
+class ProductExplanation(Base):
+    __tablename__ = "product_explanations"
+    __table_args__ = (
+        UniqueConstraint("product_name", "skin_type", "concern", name="uq_product_explanation"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_name = Column(String, nullable=False, index=True)
+    category = Column(String, nullable=True)  # 토너, 앰플, 크림
+    skin_type = Column(String, nullable=False, default="")  # 표준 피부타입 ("" = 전체)
+    concern = Column(String, nullable=False, default="")  # 피부 고민 ("" = 공통)
+    reason = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# 사용자 피부 프로필 벡터 (분석/리뷰 저장 시 점진적으로 갱신, 추천 재정렬에 사용)
+class UserSkinProfile(Base):
+    __tablename__ = "user_skin_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, unique=True, index=True)
+    vector = Column(LargeBinary, nullable=True)  # float32 임베딩 바이트
+    signal_count = Column(Integer, default=0)  # 반영된 분석/리뷰 수
+    recommended_products = Column(JSON, default=list)  # 이미 추천된 제품명 (최근 순)
+    disliked_products = Column(JSON, default=list)  # 낮은 평점을 준 제품명
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # 제품 리뷰 시스템 (사용자-제품 연결)
 class ProductReview(Base):
     __tablename__ = "product_reviews"
+    __table_args__ = (
+        Index("ix_product_reviews_user_id_page", "user_id", "id"),
+        Index("ix_product_reviews_product_id_page", "product_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -166,15 +217,20 @@ class ProductReview(Base):
 # 크롤링된 리뷰 데이터 (올리브영 등)
 class CrawledReview(Base):
     __tablename__ = "crawled_reviews"
+    __table_args__ = (
+        # 중복 리뷰 방지 (bulk_create_crawled_reviews의 ON CONFLICT 대상)
+        Index("uq_crawled_reviews_source_hash", "source", "content_hash", unique=True),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)  # 매칭된 제품 ID
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True, index=True)  # 매칭된 제품 ID (product_matching)
     source = Column(String, nullable=False)  # 출처 (oliveyoung, glowpick 등)
     source_product_name = Column(String, nullable=False)  # 원본 제품명
     source_product_id = Column(String, nullable=True)  # 원본 사이트 제품 ID
     reviewer_name = Column(String, nullable=True)  # 리뷰어명 (익명처리)
     rating = Column(Float, nullable=True)  # 평점
     content = Column(Text, nullable=False)  # 리뷰 내용
+    content_hash = Column(String(64), nullable=True)  # 제품명 + 내용 sha256 (crud.crawled_review_hash)
     skin_type = Column(String, nullable=True)  # 피부타입
     age_group = Column(String, nullable=True)  # 연령대
     review_date = Column(String, nullable=True)  # 리뷰 작성일 (원본 포맷)
@@ -210,6 +266,9 @@ class DiagnosisRequest(Base):
 # AI 피부 분석 결과 테이블
 class SkinAnalysisResult(Base):
     __tablename__ = "skin_analysis_results"
+    __table_args__ = (
+        Index("ix_skin_analysis_results_user_date_page", "user_id", "analysis_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)  # 사용자 ID
@@ -1,7 +1,7 @@
 # backend_models.py
 # 의료진/예약 시스템 SQLAlchemy 모델
 
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, Date, Time, DateTime, ForeignKey, JSON, UniqueConstraint, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, Boolean, Date, Time, DateTime, ForeignKey, JSON, UniqueConstraint, CheckConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -40,6 +40,7 @@ class Doctor(Base):
     profile_image_url = Column(String(255))
     rating = Column(DECIMAL(3, 2), default=0.00)  # 0.00 ~ 5.00
     review_count = Column(Integer, default=0)
+    rating_sum = Column(Integer, nullable=True)  # 리뷰 평점 합계 (NULL이면 아직 집계 전, medical_crud.apply_doctor_rating_delta)
     consultation_fee = Column(Integer)  # 진료비
     available_days = Column(JSON)  # ["mon", "tue", "wed", ...]
     available_times = Column(JSON)  # {"start": "09:00", "end": "18:00"}
@@ -58,6 +59,9 @@ class Appointment(Base):
     __table_args__ = (
         UniqueConstraint('doctor_id', 'appointment_date', 'appointment_time', 
                         name='unique_doctor_datetime'),
+        # 예약 목록 키셋 페이지네이션 (appointment_date desc, id desc)
+        Index('ix_appointments_user_date_page', 'user_id', 'appointment_date', 'id'),
+        Index('ix_appointments_doctor_date_page', 'doctor_id', 'appointment_date', 'id'),
     )
     
     id = Column(Integer, primary_key=True, index=True)
@@ -98,7 +102,7 @@ class MedicalRecord(Base):
     precautions = Column(Text)  # 주의사항
     next_visit_date = Column(Date)  # 다음 방문 예정일
     notes = Column(Text)  # 의사 메모
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 목록 페이지네이션 정렬 키
     
     # 관계 설정
     appointment = relationship("Appointment", back_populates="medical_record")
@@ -116,7 +120,7 @@ class DoctorReview(Base):
     appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=True)
     rating = Column(Integer, nullable=False)  # 1-5
     review_text = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 목록 페이지네이션 정렬 키
     
     # 관계 설정
     doctor = relationship("Doctor", back_populates="reviews")
@@ -0,0 +1,227 @@
+"""
+크롤링 CSV import 파이프라인 (제품 / 리뷰)
+
+- CSV를 CHUNK_SIZE 행씩 읽어서 메모리 사용량을 일정하게 유지
+- 가격/평점/도움수 파싱, 결측치 처리는 청크 단위 컬럼 연산으로 처리 (iterrows 없음)
+- 제품과 성분/피부타입/효능/쇼핑몰 행은 청크마다 테이블별 executemany 한 번으로 저장
+  (SQLAlchemy가 여러 행 VALUES로 묶어 실행, 제품 ID는 RETURNING으로 받음)
+- 리뷰는 crud.bulk_create_crawled_reviews(ON CONFLICT DO NOTHING)로 저장
+
+/api/database/reset, /api/database/import-products, /api/database/import-reviews에서 사용
+"""
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from core.models.db_models import Product, ProductIngredient, ProductSkinType, ProductBenefit, Shop, ProductShop
+from crud import bulk_create_crawled_reviews
+from product_matching import ProductMatcher, clean_product_name
+
+CHUNK_SIZE = int(os.getenv("CSV_IMPORT_CHUNK_SIZE", "5000"))
+
+PRODUCT_CSV_FILES = [
+    ("./crawler/data/product_list_toner.csv", "토너"),
+    ("./crawler/data/product_list_cream.csv", "크림"),
+    ("./crawler/data/product_list_ampoule.csv", "앰플")
+]
+
+REVIEW_CSV_FILES = [
+    ("./crawler/data/reviews_bulk_toner.csv", "토너"),
+    ("./crawler/data/reviews_bulk_cream.csv", "크림"),
+    ("./crawler/data/reviews_bulk_ampoule.csv", "앰플")
+]
+
+# 카테고리별 기본 성분/효능 (토너, 크림 외에는 앰플 기본값)
+DEFAULT_INGREDIENTS = {
+    "토너": ["히알루론산", "나이아신아마이드", "글리세린"],
+    "크림": ["세라마이드", "시어버터", "판테놀"],
+    "앰플": ["비타민C", "펩타이드", "레티놀"]
+}
+DEFAULT_BENEFITS = {
+    "토너": ["수분공급", "각질제거", "진정"],
+    "크림": ["보습", "영양공급", "탄력"],
+    "앰플": ["미백", "주름개선", "트러블케어"]
+}
+DEFAULT_SKIN_TYPES = ["건성", "지성", "복합성"]
+
+
+def _column(df: pd.DataFrame, name: str, default) -> pd.Series:
+    """CSV에 없는 컬럼은 기본값으로 채운 Series"""
+    if name in df.columns:
+        return df[name]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+
+def _nullable(series: pd.Series) -> List[Optional[str]]:
+    """NaN -> None, 나머지는 문자열"""
+    return [None if pd.isna(value) else str(value) for value in series]
+
+
+# ========== 제품 ==========
+def normalize_product_chunk(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """제품 CSV 청크 -> products 행 (컬럼 단위 변환)"""
+    # 가격 문자열 파싱 ("49,000" -> 49000)
+    price = pd.to_numeric(
+        _column(df, "price_discounted", "0").astype(str).str.replace(r'[,"]', "", regex=True),
+        errors="coerce"
+    ).fillna(0).astype(int)
+
+    brand = _column(df, "brand", "Unknown").astype(str)
+
+    # 제품명에서 브랜드명, 괄호, 기획 태그 제거 (리뷰 매칭과 같은 규칙)
+    names = pd.Series(
+        [clean_product_name(full_name, brand_name) for full_name, brand_name in zip(_column(df, "name", "").astype(str), brand)],
+        index=df.index
+    )
+    # 빈 이름이면 기본값 설정
+    empty = names.str.strip() == ""
+    names[empty] = brand[empty] + f" {category}"
+
+    return pd.DataFrame({
+        "name": names.str.slice(0, 100),  # 이름 길이 제한
+        "brand": brand,
+        "category": category,
+        "price": price,
+        "original_price": price + (price * 0.1).astype(int),  # 원가는 10% 높게 설정
+        "rating": [4.0 + (hash(name) % 10) / 10 for name in names],  # 4.0~4.9 랜덤 평점
+        "review_count": [20 + (hash(brand_name + name) % 50) for brand_name, name in zip(brand, names)],  # 20~70 랜덤 리뷰 수
+        "description": brand + f"의 {category} 제품입니다. 고품질 원료로 만든 프리미엄 화장품입니다.",
+        "volume": "50ml",  # 기본 용량
+        "image_url": _column(df, "image_url", "").fillna("").astype(str)
+    }, index=df.index)
+
+
+def _shop_rows(product_id: int, price: int, shops: List[Shop]) -> List[Dict]:
+    """기본 쇼핑몰 판매정보 (쇼핑몰별로 1000원씩 차이, 첫 번째 쇼핑몰이 최저가)"""
+    rows = []
+    for i, shop in enumerate(shops):
+        shop_price = price + (i * 1000)
+        shipping_fee = 0 if shop_price >= 30000 or i == 0 else 2500  # 3만원 이상 또는 첫 번째 쇼핑몰은 무료배송
+        rows.append({
+            "product_id": product_id,
+            "shop_id": shop.id,
+            "price": shop_price,
+            "shipping": "무료배송" if shipping_fee == 0 else "유료배송",
+            "shipping_fee": shipping_fee,
+            "installment": f"{2+i}개월" if shop_price >= 20000 else None,
+            "is_free_shipping": shipping_fee == 0,
+            "is_lowest_price": i == 0,
+            "is_card_discount": i % 2 == 1  # 홀수 번째 쇼핑몰은 카드할인
+        })
+    return rows
+
+
+def import_product_csv(db: Session, csv_file: str, category: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """제품 CSV 한 파일을 청크 단위로 저장 (파일 단위 커밋), 저장한 제품 수 반환"""
+    connection = db.connection()
+    # 올리브영, 쿠팡, 네이버쇼핑 등 앞에서 생성한 4개 쇼핑몰 (파일마다 한 번만 조회)
+    shops = db.query(Shop).limit(4).all()
+    ingredients = DEFAULT_INGREDIENTS.get(category, DEFAULT_INGREDIENTS["앰플"])
+    benefits = DEFAULT_BENEFITS.get(category, DEFAULT_BENEFITS["앰플"])
+
+    imported_count = 0
+    for chunk in pd.read_csv(csv_file, chunksize=chunk_size):
+        products = normalize_product_chunk(chunk, category)
+        positions = pd.RangeIndex(imported_count, imported_count + len(products))
+        products["is_popular"] = positions < 5  # 처음 5개만 인기 제품
+        products["is_new"] = positions < 3  # 처음 3개만 신제품
+        rows = products.to_dict("records")
+
+        # 제품 ID는 입력 순서대로 RETURNING으로 받음
+        product_ids = connection.execute(
+            insert(Product.__table__).returning(Product.__table__.c.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+
+        connection.execute(insert(ProductIngredient.__table__), [
+            {"product_id": product_id, "ingredient": ingredient}
+            for product_id in product_ids for ingredient in ingredients
+        ])
+        connection.execute(insert(ProductSkinType.__table__), [
+            {"product_id": product_id, "skin_type": skin_type}
+            for product_id in product_ids for skin_type in DEFAULT_SKIN_TYPES
+        ])
+        connection.execute(insert(ProductBenefit.__table__), [
+            {"product_id": product_id, "benefit": benefit}
+            for product_id in product_ids for benefit in benefits
+        ])
+        shop_rows = [
+            shop_row
+            for product_id, row in zip(product_ids, rows)
+            for shop_row in _shop_rows(product_id, row["price"], shops)
+        ]
+        if shop_rows:
+            connection.execute(insert(ProductShop.__table__), shop_rows)
+
+        imported_count += len(product_ids)
+        print(f"💾 {category}: {imported_count}개 제품 저장 중...")
+
+    db.commit()
+    return imported_count
+
+
+def import_product_csvs(db: Session, csv_files=PRODUCT_CSV_FILES) -> List[Dict]:
+    """제품 CSV 파일들 import (파일별 결과 목록 반환)"""
+    results = []
+    for csv_file, category in csv_files:
+        if not os.path.exists(csv_file):
+            print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
+            results.append({"category": category, "error": "파일 없음"})
+            continue
+        try:
+            imported_count = import_product_csv(db, csv_file, category)
+            results.append({"category": category, "imported": imported_count, "file": csv_file})
+            print(f"✅ {category}: {imported_count}개 제품 import 완료")
+        except Exception as file_error:
+            db.rollback()
+            print(f"❌ {csv_file} 처리 실패: {file_error}")
+            results.append({"category": category, "error": str(file_error)})
+    return results
+
+
+# ========== 리뷰 ==========
+def normalize_review_chunk(df: pd.DataFrame, category: str) -> List[Dict]:
+    """리뷰 CSV 청크 -> bulk_create_crawled_reviews 입력 (컬럼 단위 변환)"""
+    rating = pd.to_numeric(_column(df, "star", None), errors="coerce").fillna(4.0).astype(float)
+    helpful = pd.to_numeric(_column(df, "helpful", 0), errors="coerce").fillna(0).astype(int)
+    frame = pd.DataFrame({
+        "source": "oliveyoung",
+        "source_product_name": _column(df, "product_name", f"{category} 제품").fillna(f"{category} 제품").astype(str),
+        "source_product_id": _column(df, "product_id", "").fillna("").astype(str),
+        "reviewer_name": None,  # 익명 처리
+        "rating": rating,
+        "content": _column(df, "review", "좋은 제품입니다.").fillna("좋은 제품입니다.").astype(str),
+        "skin_type": _nullable(_column(df, "skin_type", None)),
+        "age_group": _nullable(_column(df, "age", None)),
+        "review_date": _nullable(_column(df, "date", None)),
+        "helpful_count": helpful
+    }, index=df.index)
+    return frame.to_dict("records")
+
+
+def import_review_csvs(db: Session, csv_files=REVIEW_CSV_FILES, chunk_size: int = CHUNK_SIZE) -> List[Dict]:
+    """리뷰 CSV 파일들을 청크 단위로 import (파일별 결과 목록 반환)"""
+    # 제품 매칭은 전체 파일에서 한 번만 준비
+    matcher = ProductMatcher.from_db(db)
+    results = []
+    for csv_file, category in csv_files:
+        if not os.path.exists(csv_file):
+            print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
+            continue
+        try:
+            stats = {"created": 0, "duplicates": 0, "linked": 0, "total": 0}
+            for chunk in pd.read_csv(csv_file, chunksize=chunk_size):
+                chunk_stats = bulk_create_crawled_reviews(db, normalize_review_chunk(chunk, category), matcher=matcher)
+                if "error" in chunk_stats:
+                    raise RuntimeError(chunk_stats["error"])
+                for key in stats:
+                    stats[key] += chunk_stats.get(key, 0)
+            results.append({"file": csv_file, "category": category, "stats": stats})
+            print(f"✅ {category}: {stats['created']}개 저장, {stats['duplicates']}개 중복")
+        except Exception as file_error:
+            print(f"❌ {csv_file} 처리 실패: {file_error}")
+            results.append({"file": csv_file, "category": category, "error": str(file_error)})
+    return results
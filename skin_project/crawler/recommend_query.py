@@ -1,10 +1,14 @@
 import os
+import sys
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
 import pandas as pd
 import openai
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_service import encode
+from metadata_store import query_matches
+
 # 1. .env 환경변수 로드
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -18,26 +22,20 @@ INDEXES = {
 }
 
 # 3. 임베딩/OPENAI 준비
-model = SentenceTransformer('jhgan/ko-sbert-nli')
 pc = Pinecone(api_key=PINECONE_API_KEY)
 client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 # 4. AI 분석 결과 (여기만 바꿔서 테스트 가능)
 ai_results = ["여드름", "민감", "지성"]
 query = " ".join(ai_results)
-query_embedding = model.encode([query])[0].tolist()
+query_embedding = encode(query).tolist()
 
 final_recommend_list = []
 
 for category, index_name in INDEXES.items():
-    index = pc.Index(index_name)
-    # 카테고리별 top-10 리뷰 검색
-    result = index.query(
-        vector=query_embedding,
-        top_k=10,
-        include_metadata=True
-    )
-    matches = [m['metadata'] for m in result['matches']]
+    # 카테고리별 top-10 리뷰 검색 (메타데이터는 로컬 저장소에서 한 번에 조회)
+    result = query_matches(pc.Index(index_name), query_embedding, index_name, top_k=10)
+    matches = [m['metadata'] for m in result]
     if len(matches) == 0:
         continue
     df = pd.DataFrame(matches)
@@ -1,13 +1,15 @@
 import os
+import sys
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
-import pandas as pd
 import openai
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from product_index import search_products
+from review_search import hybrid_search
+from embedding_service import encode
+
 # 1. .env 환경변수 로드
 load_dotenv()
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # 2. 카테고리별 인덱스 이름
@@ -18,69 +20,30 @@ INDEXES = {
 }
 
 # 3. 임베딩/OPENAI 준비
-model = SentenceTransformer('jhgan/ko-sbert-nli')
-pc = Pinecone(api_key=PINECONE_API_KEY)
 client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 # 4. AI 분석 결과 (입력 부분 바꿔서 실험!)
 ai_results = ["염증성", "색소침착", "건성"]
 query = " ".join(ai_results)
-query_embedding = model.encode([query])[0].tolist()
+query_embedding = encode(query).tolist()
 
 final_recommend_list = []
 
 for category, index_name in INDEXES.items():
-    index = pc.Index(index_name)
-    result = index.query(
-        vector=query_embedding,
-        top_k=30,
-        include_metadata=True
-    )
-    matches = result['matches']
-    if not matches:
+    # 키워드/태그 역색인 + 벡터 점수로 한 번에 제품 순위 계산 (python product_index.py 로 빌드)
+    # 입력 키워드가 리뷰 본문이나 태그("건성에 좋아요", 리뷰어 피부타입)에 포함된 리뷰만 후보로 사용
+    products = hybrid_search(query_embedding, index_name, keywords=ai_results, top_k=1)
+    if products is None:
+        products = search_products(query_embedding, index_name, skin_type=" ".join(ai_results), top_k=1)
+    if products is None:
+        print(f"⚠️ {index_name} 제품 인덱스가 없습니다. 먼저 python product_index.py --category {index_name} 를 실행하세요.")
         continue
-
-    df = pd.DataFrame([
-        {
-            **m['metadata'],
-            'score': m['score']
-        } for m in matches
-    ])
-
-    # 입력 키워드가 하나라도 리뷰/피부타입 컬럼에 포함된 리뷰만 남김
-    for keyword in ai_results:
-        filtered = df[
-            df['review'].apply(lambda x: keyword in x if isinstance(x, str) else False) |
-            df['skin_type'].apply(lambda x: keyword in x if isinstance(x, str) else False)
-        ]
-        if not filtered.empty:
-            df = filtered
-
-    if len(df) == 0:
-        df = pd.DataFrame([
-            {
-                **m['metadata'],
-                'score': m['score']
-            } for m in matches
-        ])
-
-    top_products = (
-        df.groupby("product_name")
-        .agg(
-            review_count=("review", "count"),
-            sum_score=("score", "sum")
-        )
-        .sort_values("sum_score", ascending=False)
-        .head(1)
-        .reset_index()
-    )
-
-    for pname in top_products['product_name']:
-        review_row = df[df['product_name'] == pname].iloc[0]
+    for match in products:
+        meta = match["metadata"]
         final_recommend_list.append({
             "카테고리": category,
-            "제품명": pname,
-            "피부타입": review_row.get("skin_type", "")
+            "제품명": meta.get("product_name", ""),
+            "피부타입": meta.get("skin_type", "")
         })
 
 # 5. GPT 프롬프트 생성 (카테고리별 1개씩 추천)
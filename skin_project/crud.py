@@ -3,7 +3,13 @@ from core.models.db_models import User, Product, ProductIngredient, ProductSkinT
 from schemas import UserCreate, ProductCreate, ProductUpdate, RecommendationHistoryCreate
 from core.security import hash_password
 from typing import List, Optional
-from sqlalchemy import func
+import hashlib
+from sqlalchemy import func, case, exists, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from pagination import Page, paginate, paginate_sequence
+from product_search import search_product_ids
+from product_matching import ProductMatcher
 
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
@@ -69,11 +75,11 @@ def create_product(db: Session, product: ProductCreate):
     db.refresh(db_product)
     return db_product
 
-def get_products(db: Session, skip: int = 0, limit: int = 100, category: Optional[str] = None):
+def get_products(db: Session, skip: int = 0, limit: int = 100, category: Optional[str] = None, cursor: Optional[str] = None):
     query = db.query(Product)
     if category:
         query = query.filter(Product.category == category)
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, [Product.id], limit, cursor=cursor, skip=skip)
 
 def get_product(db: Session, product_id: int):
     return db.query(Product).filter(Product.id == product_id).first()
@@ -108,17 +114,17 @@ def delete_product(db: Session, product_id: int):
         return True
     return False
 
-def search_products(db: Session, query: str, skip: int = 0, limit: int = 100):
-    return db.query(Product).filter(
-        Product.name.contains(query) | 
-        Product.brand.contains(query) | 
-        Product.description.contains(query)
-    ).offset(skip).limit(limit).all()
+def search_products(db: Session, query: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """제품명/브랜드/설명 검색 (bigram 역색인, 관련도순)"""
+    ranked = search_product_ids(db, query)
+    page = paginate_sequence(ranked, lambda item: (-item[0], item[1]), limit, cursor=cursor, skip=skip)
+    product_ids = [product_id for _, product_id in page]
+    products = {product.id: product for product in db.query(Product).filter(Product.id.in_(product_ids)).all()}
+    return Page([products[product_id] for product_id in product_ids if product_id in products], page.next_cursor)
 
 # 추천 내역 관련 CRUD 함수들
-def create_recommendation_history(db: Session, recommendation_data: dict):
-    """추천 내역 저장"""
-    # 추천 기본 정보 저장
+def build_recommendation_history(recommendation_data: dict) -> RecommendationHistory:
+    """추천 내역 + 추천 제품 객체 생성 (세션에 add 하면 한 번의 flush로 함께 저장됨)"""
     db_history = RecommendationHistory(
         user_id=recommendation_data["user_id"],
         skin_type=recommendation_data["skin_type"],
@@ -126,31 +132,33 @@ def create_recommendation_history(db: Session, recommendation_data: dict):
         concerns=recommendation_data["concerns"],  # JSON 필드
         ai_explanation=recommendation_data["ai_explanation"]
     )
-    db.add(db_history)
-    db.commit()
-    db.refresh(db_history)
-    
-    # 추천 제품들 저장
     for product_data in recommendation_data["recommended_products"]:
-        db_product = RecommendationProduct(
-            recommendation_id=db_history.id,
-            product_name=product_data.get("제품명", ""),
-            product_brand=product_data.get("제품명", "").split()[0] if product_data.get("제품명") else "",
-            product_category=product_data.get("카테고리", ""),
-            reason=product_data.get("추천이유", ""),
+        # AI 원본 키("제품명")와 추천 라우터 키("product_name") 모두 지원
+        product_name = product_data.get("제품명") or product_data.get("product_name") or ""
+        db_history.recommended_products.append(RecommendationProduct(
+            product_name=product_name,
+            product_brand=product_name.split()[0] if product_name else "",
+            product_category=product_data.get("카테고리") or product_data.get("product_category") or "",
+            reason=product_data.get("추천이유") or product_data.get("reason") or "",
             ai_data=product_data  # 원본 AI 데이터 저장
-        )
-        db.add(db_product)
-    
+        ))
+    return db_history
+
+def create_recommendation_history(db: Session, recommendation_data: dict):
+    """추천 내역 저장 (한 트랜잭션)"""
+    db_history = build_recommendation_history(recommendation_data)
+    db.add(db_history)
     db.commit()
     db.refresh(db_history)
     return db_history
 
-def get_recommendation_history(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """사용자의 추천 내역 조회"""
-    return db.query(RecommendationHistory).filter(
+def get_recommendation_history(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """사용자의 추천 내역 조회 (최신순)"""
+    query = db.query(RecommendationHistory).filter(
         RecommendationHistory.user_id == user_id
-    ).order_by(RecommendationHistory.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    return paginate(query, [RecommendationHistory.created_at, RecommendationHistory.id], limit,
+                    cursor=cursor, skip=skip, descending=True)
 
 def get_recommendation_detail(db: Session, history_id: int):
     """특정 추천 내역의 상세 정보 조회"""
@@ -195,25 +203,28 @@ def create_product_review(db: Session, user_id: int, product_id: int, review_dat
     )
     
     db.add(review)
+    db.flush()
+    
+    # 제품의 평균 평점 및 리뷰 수 업데이트 (리뷰 저장과 같은 트랜잭션)
+    apply_product_rating_delta(db, product_id, review.rating or 0.0, 1)
     db.commit()
     db.refresh(review)
     
-    # 제품의 평균 평점 및 리뷰 수 업데이트
-    update_product_rating(db, product_id)
-    
     return review
 
-def get_product_reviews(db: Session, product_id: int, skip: int = 0, limit: int = 100):
+def get_product_reviews(db: Session, product_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """제품의 리뷰 목록 조회"""
-    return db.query(ProductReview).filter(
+    query = db.query(ProductReview).filter(
         ProductReview.product_id == product_id
-    ).offset(skip).limit(limit).all()
+    )
+    return paginate(query, [ProductReview.id], limit, cursor=cursor, skip=skip)
 
-def get_user_reviews(db: Session, user_id: int, skip: int = 0, limit: int = 100):
+def get_user_reviews(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """사용자가 작성한 리뷰 목록 조회"""
-    return db.query(ProductReview).filter(
+    query = db.query(ProductReview).filter(
         ProductReview.user_id == user_id
-    ).offset(skip).limit(limit).all()
+    )
+    return paginate(query, [ProductReview.id], limit, cursor=cursor, skip=skip)
 
 def get_review_by_id(db: Session, review_id: int):
     """리뷰 상세 조회"""
@@ -229,17 +240,21 @@ def update_product_review(db: Session, review_id: int, user_id: int, review_data
     if not review:
         return None
     
+    old_rating = review.rating or 0.0
+    
     # 수정 가능한 필드만 업데이트
     for field in ['rating', 'title', 'content', 'skin_type', 'skin_concern', 'sensitivity']:
         if field in review_data:
             setattr(review, field, review_data[field])
+    db.flush()
     
+    # 제품의 평균 평점 업데이트 (평점이 바뀐 경우만)
+    rating_delta = (review.rating or 0.0) - old_rating
+    if rating_delta:
+        apply_product_rating_delta(db, review.product_id, rating_delta, 0)
     db.commit()
     db.refresh(review)
     
-    # 제품의 평균 평점 업데이트
-    update_product_rating(db, review.product_id)
-    
     return review
 
 def delete_product_review(db: Session, review_id: int, user_id: int):
@@ -253,40 +268,97 @@ def delete_product_review(db: Session, review_id: int, user_id: int):
         return False
     
     product_id = review.product_id
+    rating = review.rating or 0.0
     db.delete(review)
-    db.commit()
+    db.flush()
     
     # 제품의 평균 평점 업데이트
-    update_product_rating(db, product_id)
+    apply_product_rating_delta(db, product_id, -rating, -1)
+    db.commit()
     
     return True
 
+def apply_product_rating_delta(db: Session, product_id: int, rating_delta: float, count_delta: int):
+    """제품 평점 합계/리뷰 수를 증분 반영 (커밋은 호출한 쪽에서)
+
+    리뷰 전체를 다시 집계하지 않고 UPDATE 한 번으로 rating_sum, review_count, rating을
+    함께 갱신한다. SET의 우변은 갱신 전 값을 읽고 행 잠금 안에서 실행되므로
+    동시에 리뷰가 작성돼도 합계가 어긋나지 않는다.
+    아직 집계 전(rating_sum NULL, import/샘플 데이터의 표시용 값)인 제품은 한 번 전체 집계한다.
+    """
+    new_count = Product.review_count + count_delta
+    new_sum = Product.rating_sum + rating_delta
+    result = db.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.rating_sum.isnot(None))
+        .values(
+            rating_sum=new_sum,
+            review_count=new_count,
+            rating=case((new_count > 0, new_sum / new_count), else_=0.0)
+        )
+    )
+    if not result.rowcount:
+        reconcile_product_ratings(db, product_id)
+
+def _review_stat(aggregate):
+    """제품별 리뷰 집계 스칼라 서브쿼리 (ix_product_reviews_product_id_page 인덱스 사용)"""
+    return select(aggregate).where(ProductReview.product_id == Product.id).scalar_subquery()
+
+def reconcile_product_ratings(db: Session, product_id: Optional[int] = None) -> int:
+    """제품 평점 집계를 리뷰 테이블 기준으로 다시 계산 (커밋은 호출한 쪽에서), 바뀐 제품 수 반환
+
+    product_id가 없으면 집계 중인 제품과 리뷰가 있는 제품 전체가 대상 (reconcile_ratings.py 정기 작업)
+    """
+    review_count = _review_stat(func.count(ProductReview.id))
+    rating_sum = _review_stat(func.coalesce(func.sum(ProductReview.rating), 0.0))
+    target = Product.id == product_id if product_id is not None else or_(
+        Product.rating_sum.isnot(None),
+        exists().where(ProductReview.product_id == Product.id)
+    )
+    drifted = or_(
+        Product.rating_sum.is_(None),
+        Product.review_count.is_(None),
+        Product.review_count != review_count,
+        func.abs(Product.rating_sum - rating_sum) > 1e-6
+    )
+    result = db.execute(
+        update(Product)
+        .where(target, drifted)
+        .values(
+            rating_sum=rating_sum,
+            review_count=review_count,
+            rating=case((review_count > 0, rating_sum / review_count), else_=0.0)
+        )
+    )
+    return result.rowcount or 0
+
 def update_product_rating(db: Session, product_id: int):
-    """제품의 평균 평점 및 리뷰 수 업데이트"""
-    # 제품 리뷰 통계 계산
-    stats = db.query(
-        func.avg(ProductReview.rating).label('avg_rating'),
-        func.count(ProductReview.id).label('review_count')
-    ).filter(ProductReview.product_id == product_id).first()
-    
-    # 제품 정보 업데이트
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product:
-        product.rating = float(stats.avg_rating) if stats.avg_rating else 0.0
-        product.review_count = stats.review_count if stats.review_count else 0
-        db.commit()
+    """제품의 평균 평점 및 리뷰 수를 리뷰 테이블 기준으로 다시 계산"""
+    reconcile_product_ratings(db, product_id)
+    db.commit()
 
 # ========== 크롤링된 리뷰 CRUD 함수들 ==========
 
-def create_crawled_review(db: Session, review_data: dict):
-    """크롤링된 리뷰 데이터 저장"""
+CRAWLED_REVIEW_BATCH_SIZE = 1000  # INSERT 한 번에 넣는 행 수
+
+def crawled_review_hash(source_product_name: str, content: str) -> str:
+    """크롤링 리뷰 중복 판별용 해시 (같은 출처 안에서 제품명 + 내용이 같으면 중복)"""
+    raw = f"{(source_product_name or '').strip()}\x1f{(content or '').strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def create_crawled_review(db: Session, review_data: dict, matcher: Optional[ProductMatcher] = None):
+    """크롤링된 리뷰 데이터 저장 (여러 건을 저장할 때는 matcher를 만들어 재사용)"""
+    if matcher is None:
+        matcher = ProductMatcher.from_db(db)
     review = CrawledReview(
+        product_id=matcher.resolve(review_data.get("source_product_name")),
         source=review_data.get("source", "oliveyoung"),
         source_product_name=review_data.get("source_product_name"),
         source_product_id=review_data.get("source_product_id"),
         reviewer_name=review_data.get("reviewer_name"),
         rating=review_data.get("rating"),
         content=review_data.get("content"),
+        content_hash=crawled_review_hash(review_data.get("source_product_name"), review_data.get("content")),
         skin_type=review_data.get("skin_type"),
         age_group=review_data.get("age_group"),
         review_date=review_data.get("review_date"),
@@ -299,17 +371,27 @@ def create_crawled_review(db: Session, review_data: dict):
     
     return review
 
-def bulk_create_crawled_reviews(db: Session, reviews_data: list):
-    """크롤링된 리뷰 데이터 대량 저장 (중복 방지)"""
-    created_count = 0
-    duplicate_count = 0
-    
+def _insert_ignore_duplicates(db: Session):
+    """(source, content_hash) 유니크 인덱스에 걸리는 행은 건너뛰는 INSERT"""
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    return insert(CrawledReview.__table__).on_conflict_do_nothing(index_elements=["source", "content_hash"])
+
+def bulk_create_crawled_reviews(db: Session, reviews_data: list, matcher: Optional[ProductMatcher] = None):
+    """크롤링된 리뷰 데이터 대량 저장 (중복 방지)
+
+    행마다 중복 SELECT를 하지 않고, content_hash 유니크 인덱스 +
+    INSERT ... ON CONFLICT DO NOTHING을 배치 단위로 실행한다.
+    저장/중복 수는 RETURNING으로 돌려받은 행 수로 계산한다.
+    """
     print(f"🔍 리뷰 데이터 처리 시작: {len(reviews_data)}개")
     
-    # 먼저 전체 리뷰 수 확인
-    total_existing = db.query(CrawledReview).count()
-    print(f"📊 기존 DB 리뷰 수: {total_existing}개")
+    # 리뷰를 저장하면서 제품에 연결 (원본 제품명별로 한 번만 매칭, 여러 번 나눠 저장할 때는 matcher 재사용)
+    if matcher is None:
+        matcher = ProductMatcher.from_db(db)
     
+    rows = []
+    seen = set()
+    duplicate_count = 0
     for i, review_data in enumerate(reviews_data):
         try:
             # 데이터 정리
@@ -322,47 +404,45 @@ def bulk_create_crawled_reviews(db: Session, reviews_data: list):
                 print(f"⚠️ 빈 데이터 스킵: {i+1}")
                 continue
             
-            # 중복 확인 (더 간단한 조건)
-            existing = db.query(CrawledReview).filter(
-                CrawledReview.source == source,
-                CrawledReview.source_product_name == product_name,
-                CrawledReview.content == content
-            ).first()
-            
-            if existing:
+            # 같은 배치 안의 중복은 INSERT 전에 제외
+            content_hash = crawled_review_hash(product_name, content)
+            if (source, content_hash) in seen:
                 duplicate_count += 1
-                if duplicate_count <= 5:  # 처음 5개만 로그 출력
-                    print(f"🔄 중복 발견: {product_name} - {content[:30]}...")
                 continue
+            seen.add((source, content_hash))
             
-            # 새 리뷰 생성
-            review = CrawledReview(
-                source=source,
-                source_product_name=product_name,
-                source_product_id=str(review_data.get("source_product_id", "")),
-                reviewer_name=review_data.get("reviewer_name"),
-                rating=float(review_data.get("rating", 4.0)) if review_data.get("rating") is not None else 4.0,
-                content=content,
-                skin_type=review_data.get("skin_type"),
-                age_group=review_data.get("age_group"),
-                review_date=review_data.get("review_date"),
-                helpful_count=int(review_data.get("helpful_count", 0)) if review_data.get("helpful_count") is not None else 0
-            )
-            
-            db.add(review)
-            created_count += 1
-            
-            # 진행 상황 출력 (100개마다)
-            if created_count % 100 == 0:
-                print(f"💾 진행 상황: {created_count}개 저장됨")
-            
+            rows.append({
+                "product_id": matcher.resolve(product_name),
+                "source": source,
+                "source_product_name": product_name,
+                "source_product_id": str(review_data.get("source_product_id", "")),
+                "reviewer_name": review_data.get("reviewer_name"),
+                "rating": float(review_data.get("rating", 4.0)) if review_data.get("rating") is not None else 4.0,
+                "content": content,
+                "content_hash": content_hash,
+                "skin_type": review_data.get("skin_type"),
+                "age_group": review_data.get("age_group"),
+                "review_date": review_data.get("review_date"),
+                "helpful_count": int(review_data.get("helpful_count", 0)) if review_data.get("helpful_count") is not None else 0
+            })
         except Exception as e:
             print(f"❌ 리뷰 {i+1} 처리 실패: {e}")
             continue
     
+    created_count = 0
+    linked_count = 0
     try:
+        for start in range(0, len(rows), CRAWLED_REVIEW_BATCH_SIZE):
+            batch = rows[start:start + CRAWLED_REVIEW_BATCH_SIZE]
+            # executemany + RETURNING -> 드라이버에서 여러 행 VALUES로 묶어 실행 (컴파일은 1회 캐시)
+            statement = _insert_ignore_duplicates(db).returning(CrawledReview.__table__.c.product_id)
+            inserted = db.connection().execute(statement, batch).all()
+            created_count += len(inserted)
+            duplicate_count += len(batch) - len(inserted)
+            linked_count += sum(1 for (product_id,) in inserted if product_id is not None)
+            print(f"💾 진행 상황: {start + len(batch)}/{len(rows)}개 처리")
         db.commit()
-        print(f"✅ DB 커밋 완료: {created_count}개 저장, {duplicate_count}개 중복")
+        print(f"✅ DB 커밋 완료: {created_count}개 저장 (제품 연결 {linked_count}개), {duplicate_count}개 중복")
     except Exception as e:
         print(f"❌ DB 커밋 실패: {e}")
         db.rollback()
@@ -376,12 +456,13 @@ def bulk_create_crawled_reviews(db: Session, reviews_data: list):
     return {
         "created": created_count,
         "duplicates": duplicate_count,
+        "linked": linked_count,
         "total": len(reviews_data)
     }
 
-def get_crawled_reviews(db: Session, skip: int = 0, limit: int = 100):
+def get_crawled_reviews(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """크롤링된 리뷰 목록 조회"""
-    return db.query(CrawledReview).offset(skip).limit(limit).all()
+    return paginate(db.query(CrawledReview), [CrawledReview.id], limit, cursor=cursor, skip=skip)
 
 def get_crawled_reviews_by_product_name(db: Session, product_name: str):
     """제품명으로 크롤링된 리뷰 조회"""
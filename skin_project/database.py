@@ -20,6 +20,13 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 
 print(f"🔗 데이터베이스 연결 시도: {DB_HOST}:{DB_PORT}/{DB_NAME}")
 
+# 커넥션 풀 설정 (sync/async 엔진이 각각 이 크기의 풀을 가짐)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # 풀에서 연결을 기다리는 최대 시간 (초)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))      # 오래된 연결 재생성 주기 (초)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))  # 연결당 prepared statement 캐시 수
+
 # 인코딩 관련 설정 추가
 engine = create_engine(
     DATABASE_URL, 
@@ -28,6 +35,10 @@ engine = create_engine(
         "client_encoding": "utf8",
         "options": "-c client_encoding=utf8"
     },
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
     pool_pre_ping=True  # 연결 상태 확인
 )
 
@@ -41,3 +52,38 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# ========== 비동기 엔진 (asyncpg) ==========
+# async def 핸들러에서 이벤트 루프를 막지 않도록 AsyncSession 사용
+# asyncpg는 쿼리를 prepared statement로 실행하고 연결마다 statement_cache_size 만큼 캐시한다
+# (SQLAlchemy 쪽 prepared statement 캐시 크기도 같게 맞춤)
+ASYNC_DATABASE_URL = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    f"?prepared_statement_cache_size={DB_STATEMENT_CACHE_SIZE}"
+)
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        echo=False,
+        connect_args={"statement_cache_size": DB_STATEMENT_CACHE_SIZE},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True
+    )
+    # commit 후에도 응답을 만들 때 속성을 다시 읽지 않도록 expire_on_commit=False
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+except ImportError as e:
+    async_engine = None
+    AsyncSessionLocal = None
+    print(f"⚠️ 비동기 DB 엔진을 사용할 수 없습니다 (asyncpg 설치 필요): {e}")
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("비동기 DB 엔진이 설정되지 않았습니다. asyncpg를 설치하세요.")
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,466 @@
+"""
+리뷰 임베딩 배치 수집(ingestion) 파이프라인
+
+- 리뷰 CSV(청크 단위) 또는 crawled_reviews 테이블에서 리뷰를 스트리밍으로 읽음
+- 워커 프로세스 풀에서 큰 배치 단위로 인코딩
+- 고정 크기 청크로 Pinecone 업서트 (실패 시 재시도)
+- 처리 속도(docs/sec) 리포트
+- 증분 동기화: 내용 해시 기반 고정 ID + 로컬 manifest로 신규/변경 리뷰만 임베딩,
+  원본에서 사라진 리뷰는 인덱스에서 삭제하고 tombstone으로 기록
+- 예전 업로더가 만든 ID({제품명}_{i}, 행 번호)는 첫 증분 동기화(manifest 없음) 전에
+  인덱스에서 한 번 정리 (--purge-legacy-ids로 직접 실행 가능)
+
+사용 예:
+    python embedding_pipeline.py --source csv --category cream
+    python embedding_pipeline.py --source db --category cream --workers 4
+    python embedding_pipeline.py --source csv --category cream --incremental
+    python embedding_pipeline.py --source csv --category cream --purge-legacy-ids
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import itertools
+from datetime import datetime
+import multiprocessing as mp
+from collections import deque
+from typing import Iterator, List, Dict, Optional, Iterable, Callable
+
+import pandas as pd
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 환경변수 로드
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.env"))
+load_dotenv()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawler", "data")
+
+# 카테고리(인덱스명) -> 한글 카테고리
+CATEGORIES = {
+    "toner": "토너",
+    "ampoule": "앰플",
+    "cream": "크림"
+}
+
+DEFAULT_READ_CHUNK = 2000      # CSV/DB에서 한 번에 읽을 리뷰 수
+DEFAULT_ENCODE_BATCH = 256     # 워커 한 번 호출당 인코딩할 리뷰 수
+DEFAULT_UPSERT_BATCH = 100     # Pinecone 업서트 1회당 벡터 수
+DEFAULT_MAX_RETRIES = 3
+VECTOR_ID_PREFIX = "r_"
+
+
+def build_embedding_text(skin_type, review) -> str:
+    """임베딩에 사용할 텍스트 ("피부타입 | 리뷰")"""
+    skin_type = "" if skin_type is None or (isinstance(skin_type, float) and pd.isna(skin_type)) else str(skin_type)
+    review = "" if review is None or (isinstance(review, float) and pd.isna(review)) else str(review)
+    return f"{skin_type} | {review}"
+
+
+def review_vector_id(product_name: str, review: str) -> str:
+    """제품명 + 리뷰 본문 기반의 고정 벡터 ID (CSV 행 순서와 무관)"""
+    digest = hashlib.sha1(f"{product_name}\x1f{review}".encode("utf-8")).hexdigest()
+    return f"{VECTOR_ID_PREFIX}{digest[:32]}"
+
+
+def record_content_hash(record: Dict) -> str:
+    """임베딩 텍스트 + 메타데이터 해시 (변경 감지용)"""
+    payload = json.dumps([record["text"], record["metadata"]], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _clean(value, default=""):
+    """NaN/None 값을 메타데이터에 넣을 수 있는 값으로 정리"""
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return default
+    return str(value)
+
+
+# ========== 리뷰 소스 ==========
+def iter_csv_reviews(category: str, chunksize: int = DEFAULT_READ_CHUNK) -> Iterator[List[Dict]]:
+    """reviews_bulk_{category}.csv를 청크 단위로 읽어 레코드 리스트를 yield"""
+    review_path = os.path.join(DATA_DIR, f"reviews_bulk_{category}.csv")
+    product_path = os.path.join(DATA_DIR, f"product_list_{category}.csv")
+
+    # 제품 목록은 작으므로 한 번만 읽어서 dict로 보관
+    products = {}
+    if os.path.exists(product_path):
+        for row in pd.read_csv(product_path, encoding="utf-8").to_dict("records"):
+            products[row.get("name")] = row
+
+    for chunk in pd.read_csv(review_path, encoding="utf-8", chunksize=chunksize):
+        records = []
+        for row in chunk.to_dict("records"):
+            review = _clean(row.get("review"))
+            if not review:
+                continue
+            product_name = _clean(row.get("product_name"))
+            product = products.get(product_name, {})
+            records.append({
+                "id": review_vector_id(product_name, review),
+                "text": build_embedding_text(row.get("skin_type"), review),
+                "metadata": {
+                    "product_name": product_name,
+                    "review": review,
+                    "skin_type": _clean(row.get("skin_type")),
+                    "star": _clean(row.get("star")),
+                    "category": category,
+                    "link": _clean(product.get("link")),
+                    "image_url": _clean(product.get("image_url")),
+                    "price": _clean(product.get("price_discounted"))
+                }
+            })
+        yield records
+
+
+def iter_db_reviews(category: Optional[str] = None, chunksize: int = DEFAULT_READ_CHUNK) -> Iterator[List[Dict]]:
+    """crawled_reviews 테이블을 서버 사이드 커서로 스트리밍하여 레코드 리스트를 yield
+
+    category를 지정하면 제품과 연결된 리뷰 중 해당 카테고리만 읽음
+    """
+    from database import SessionLocal
+    from core.models.db_models import CrawledReview, Product
+
+    db = SessionLocal()
+    try:
+        query = db.query(CrawledReview, Product).outerjoin(Product, CrawledReview.product_id == Product.id)
+        if category:
+            query = query.filter(Product.category == CATEGORIES.get(category, category))
+        query = query.order_by(CrawledReview.id).execution_options(yield_per=chunksize)
+
+        records = []
+        for review, product in query:
+            if not review.content:
+                continue
+            records.append({
+                "id": review_vector_id(review.source_product_name, review.content),
+                "text": build_embedding_text(review.skin_type, review.content),
+                "metadata": {
+                    "product_name": review.source_product_name,
+                    "review": review.content,
+                    "skin_type": review.skin_type or "",
+                    "star": _clean(review.rating),
+                    "category": category or "",
+                    "link": "",
+                    "image_url": (product.image_url or "") if product else "",
+                    "price": str(product.price) if product else ""
+                }
+            })
+            if len(records) >= chunksize:
+                yield records
+                records = []
+        if records:
+            yield records
+    finally:
+        db.close()
+
+
+# ========== 워커 프로세스 인코딩 ==========
+def _init_worker(torch_threads: int):
+    """워커 프로세스마다 공용 임베딩 서비스의 모델을 한 번만 로딩 (EMBEDDING_BACKEND 설정을 따름)"""
+    try:
+        import torch
+        torch.set_num_threads(max(1, torch_threads))
+    except ImportError:
+        pass
+    from embedding_service import embedding_service
+    embedding_service.encoder
+
+
+def _encode_batch(texts: List[str]):
+    from embedding_service import embedding_service
+    return embedding_service.encode(texts, batched=False)
+
+
+def _iter_batches(chunks: Iterable[List[Dict]], batch_size: int) -> Iterator[List[Dict]]:
+    """청크 스트림을 고정 크기 인코딩 배치로 재구성"""
+    buffer = []
+    for chunk in chunks:
+        buffer.extend(chunk)
+        while len(buffer) >= batch_size:
+            yield buffer[:batch_size]
+            buffer = buffer[batch_size:]
+    if buffer:
+        yield buffer
+
+
+# ========== 업서트 ==========
+def upsert_with_retry(index, vectors: List[Dict], max_retries: int = DEFAULT_MAX_RETRIES, backoff: float = 1.0, namespace: Optional[str] = None):
+    """한 청크 업서트 (지수 백오프 재시도)"""
+    for attempt in range(1, max_retries + 1):
+        try:
+            if namespace:
+                index.upsert(vectors=vectors, namespace=namespace)
+            else:
+                index.upsert(vectors=vectors)
+            return
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            wait = backoff * (2 ** (attempt - 1))
+            print(f"⚠️ 업서트 실패 ({attempt}/{max_retries}): {e} - {wait:.1f}초 후 재시도")
+            time.sleep(wait)
+
+
+def upsert_in_chunks(index, vectors: List[Dict], chunk_size: int = DEFAULT_UPSERT_BATCH, **kwargs) -> int:
+    """벡터 리스트를 고정 크기 청크로 나눠 업서트"""
+    for start in range(0, len(vectors), chunk_size):
+        upsert_with_retry(index, vectors[start:start + chunk_size], **kwargs)
+    return len(vectors)
+
+
+# ========== 파이프라인 ==========
+def run_pipeline(
+    chunks: Iterable[List[Dict]],
+    index,
+    workers: Optional[int] = None,
+    encode_batch_size: int = DEFAULT_ENCODE_BATCH,
+    upsert_batch_size: int = DEFAULT_UPSERT_BATCH,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    namespace: Optional[str] = None,
+    on_uploaded: Optional[Callable[[List[Dict]], None]] = None
+) -> Dict:
+    """리뷰 스트림을 배치 인코딩 후 청크 업서트
+
+    chunks: iter_csv_reviews / iter_db_reviews 가 반환하는 레코드 리스트 스트림
+    index: upsert(vectors=...)를 지원하는 인덱스 (Pinecone Index 등)
+    on_uploaded: 배치 업서트가 끝날 때마다 해당 레코드 리스트로 호출 (manifest 갱신용)
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = workers or max(1, cpu_count // 2)
+    torch_threads = max(1, cpu_count // workers)
+
+    # 처리할 리뷰가 없으면 모델을 로딩하지 않음
+    batches = _iter_batches(chunks, encode_batch_size)
+    first_batch = next(batches, None)
+    if first_batch is None:
+        print("✅ 새로 임베딩할 리뷰가 없습니다")
+        return {"processed": 0, "elapsed_sec": 0.0, "docs_per_sec": 0.0}
+    batches = itertools.chain([first_batch], batches)
+
+    print(f"🚀 임베딩 파이프라인 시작 (workers={workers}, encode_batch={encode_batch_size}, upsert_batch={upsert_batch_size})")
+    started = time.perf_counter()
+    processed = 0
+
+    def upload(batch, embeddings):
+        vectors = [
+            {"id": record["id"], "values": embedding.tolist(), "metadata": record["metadata"]}
+            for record, embedding in zip(batch, embeddings)
+        ]
+        upsert_in_chunks(index, vectors, chunk_size=upsert_batch_size, max_retries=max_retries, namespace=namespace)
+        if on_uploaded:
+            on_uploaded(batch)
+        return len(vectors)
+
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=workers, initializer=_init_worker, initargs=(torch_threads,)) as pool:
+        # 동시에 진행 중인 배치 수를 제한해서 메모리 사용량을 일정하게 유지
+        in_flight = deque()
+        max_in_flight = workers * 2
+
+        for batch in batches:
+            texts = [record["text"] for record in batch]
+            in_flight.append((batch, pool.apply_async(_encode_batch, (texts,))))
+            if len(in_flight) < max_in_flight:
+                continue
+
+            done_batch, result = in_flight.popleft()
+            processed += upload(done_batch, result.get())
+            elapsed = time.perf_counter() - started
+            print(f"💾 진행 상황: {processed}개 업로드 ({processed / elapsed:.1f} docs/sec)")
+
+        while in_flight:
+            done_batch, result = in_flight.popleft()
+            processed += upload(done_batch, result.get())
+
+    elapsed = time.perf_counter() - started
+    docs_per_sec = processed / elapsed if elapsed > 0 else 0.0
+    print(f"✅ 총 {processed}개 벡터 업로드 완료 ({elapsed:.1f}초, {docs_per_sec:.1f} docs/sec)")
+    return {
+        "processed": processed,
+        "elapsed_sec": round(elapsed, 2),
+        "docs_per_sec": round(docs_per_sec, 1)
+    }
+
+
+# ========== 증분 동기화 ==========
+def default_manifest_path(index_name: str) -> str:
+    return os.path.join(DATA_DIR, f"embedding_manifest_{index_name}.json")
+
+
+def load_manifest(path: str) -> Dict:
+    """{"vectors": {id: content_hash}, "tombstones": {id: 삭제 일시}}"""
+    if not os.path.exists(path):
+        return {"vectors": {}, "tombstones": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("vectors", {})
+    manifest.setdefault("tombstones", {})
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict):
+    """임시 파일에 쓴 뒤 교체 (중간에 중단돼도 manifest가 깨지지 않도록)"""
+    manifest["updated_at"] = datetime.utcnow().isoformat()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def delete_in_chunks(index, ids: List[str], chunk_size: int = DEFAULT_UPSERT_BATCH, namespace: Optional[str] = None):
+    for start in range(0, len(ids), chunk_size):
+        batch = ids[start:start + chunk_size]
+        if namespace:
+            index.delete(ids=batch, namespace=namespace)
+        else:
+            index.delete(ids=batch)
+
+
+def purge_legacy_vectors(index, namespace: Optional[str] = None) -> int:
+    """내용 해시 ID(r_...)가 아닌 예전 업로더의 벡터 삭제, 삭제한 수 반환
+
+    예전 ID는 manifest에 없어서 증분 동기화가 tombstone으로 지우지 못하고
+    같은 리뷰가 두 번 검색된다. ID 목록 조회(list)를 지원하지 않는 인덱스(pod 기반)는
+    전체 삭제 후 다시 업로드한다 (호출한 쪽에서 전체 리뷰를 업로드하는 경우에만 사용).
+    """
+    kwargs = {"namespace": namespace} if namespace else {}
+    try:
+        deleted = 0
+        for ids in index.list(**kwargs):
+            legacy = [vector_id for vector_id in ids if not vector_id.startswith(VECTOR_ID_PREFIX)]
+            if legacy:
+                delete_in_chunks(index, legacy, namespace=namespace)
+                deleted += len(legacy)
+    except Exception as e:
+        print(f"⚠️ 벡터 ID 목록을 조회할 수 없어 인덱스 전체를 비웁니다: {e}")
+        index.delete(delete_all=True, **kwargs)
+        return -1
+    print(f"🗑️ 예전 ID 벡터 삭제: {deleted}개")
+    return deleted
+
+
+def run_incremental_sync(
+    chunks: Iterable[List[Dict]],
+    index,
+    manifest_path: str,
+    namespace: Optional[str] = None,
+    **pipeline_kwargs
+) -> Dict:
+    """manifest와 비교하여 신규/변경 리뷰만 임베딩하고, 사라진 리뷰는 삭제(tombstone)"""
+    if not os.path.exists(manifest_path):
+        # 첫 증분 동기화: 전체를 업로드하므로 예전 ID 벡터를 먼저 정리
+        purge_legacy_vectors(index, namespace=namespace)
+    manifest = load_manifest(manifest_path)
+    indexed = manifest["vectors"]
+    seen = set()
+    stats = {"unchanged": 0, "changed": 0, "new": 0}
+
+    def changed_only():
+        for chunk in chunks:
+            todo = []
+            for record in chunk:
+                if record["id"] in seen:
+                    continue  # 원본 안의 중복 리뷰
+                seen.add(record["id"])
+                record["content_hash"] = record_content_hash(record)
+                previous = indexed.get(record["id"])
+                if previous == record["content_hash"]:
+                    stats["unchanged"] += 1
+                    continue
+                stats["changed" if previous else "new"] += 1
+                todo.append(record)
+            if todo:
+                yield todo
+
+    def mark_uploaded(batch: List[Dict]):
+        for record in batch:
+            indexed[record["id"]] = record["content_hash"]
+            manifest["tombstones"].pop(record["id"], None)
+
+    try:
+        pipeline_stats = run_pipeline(changed_only(), index, namespace=namespace, on_uploaded=mark_uploaded, **pipeline_kwargs)
+    finally:
+        # 실패하더라도 이미 업로드된 배치는 manifest에 남김
+        save_manifest(manifest_path, manifest)
+
+    # 원본에서 사라진 리뷰 -> 인덱스에서 삭제 + tombstone 기록
+    removed = [vector_id for vector_id in indexed if vector_id not in seen]
+    if removed:
+        delete_in_chunks(index, removed, namespace=namespace)
+        deleted_at = datetime.utcnow().isoformat()
+        for vector_id in removed:
+            indexed.pop(vector_id, None)
+            manifest["tombstones"][vector_id] = deleted_at
+        save_manifest(manifest_path, manifest)
+
+    print(f"🔄 증분 동기화 완료: 신규 {stats['new']}개, 변경 {stats['changed']}개, 유지 {stats['unchanged']}개, 삭제 {len(removed)}개")
+    return {**pipeline_stats, **stats, "deleted": len(removed)}
+
+
+def _with_slim_metadata(chunks: Iterable[List[Dict]], store, slim) -> Iterator[List[Dict]]:
+    """전체 메타데이터는 로컬 저장소에 모으고, 업로드할 레코드에는 최소 메타데이터만 남김"""
+    for records in chunks:
+        store.add(records)
+        yield [{**record, "metadata": slim(record["metadata"])} for record in records]
+
+
+def get_pinecone_index(index_name: str):
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+    return pc.Index(index_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="리뷰 임베딩 배치 업로드")
+    parser.add_argument("--source", choices=["csv", "db"], default="csv")
+    parser.add_argument("--category", choices=list(CATEGORIES.keys()), required=True)
+    parser.add_argument("--index", default=None, help="업로드할 인덱스명 (기본값: 카테고리명)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--encode-batch", type=int, default=DEFAULT_ENCODE_BATCH)
+    parser.add_argument("--upsert-batch", type=int, default=DEFAULT_UPSERT_BATCH)
+    parser.add_argument("--read-chunk", type=int, default=DEFAULT_READ_CHUNK)
+    parser.add_argument("--incremental", action="store_true", help="manifest 기반 증분 동기화")
+    parser.add_argument("--manifest", default=None, help="manifest 파일 경로 (기본값: crawler/data/embedding_manifest_{index}.json)")
+    parser.add_argument("--slim-metadata", action="store_true",
+                        help="Pinecone에는 최소 메타데이터만 올리고 나머지는 로컬 메타데이터 저장소에 저장")
+    parser.add_argument("--purge-legacy-ids", action="store_true",
+                        help="업로드 전에 예전 업로더의 벡터 ID({제품명}_{i}, 행 번호) 삭제")
+    args = parser.parse_args()
+
+    if args.source == "csv":
+        chunks = iter_csv_reviews(args.category, chunksize=args.read_chunk)
+    else:
+        chunks = iter_db_reviews(args.category, chunksize=args.read_chunk)
+
+    store = None
+    if args.slim_metadata:
+        from metadata_store import MetadataStore, slim_metadata
+        store = MetadataStore()
+        chunks = _with_slim_metadata(chunks, store, slim_metadata)
+
+    index_name = args.index or args.category
+    index = get_pinecone_index(index_name)
+    if args.purge_legacy_ids and not args.incremental:
+        purge_legacy_vectors(index)
+    pipeline_kwargs = {
+        "workers": args.workers,
+        "encode_batch_size": args.encode_batch,
+        "upsert_batch_size": args.upsert_batch
+    }
+    if args.incremental:
+        run_incremental_sync(chunks, index, args.manifest or default_manifest_path(index_name), **pipeline_kwargs)
+    else:
+        run_pipeline(chunks, index, **pipeline_kwargs)
+
+    if store is not None:
+        from metadata_store import metadata_store_path
+        store.save(metadata_store_path(args.category))
+        print(f"✅ 메타데이터 저장소 저장: 리뷰 {len(store)}개, 제품 {len(store.products)}개")
+
+
+if __name__ == "__main__":
+    main()
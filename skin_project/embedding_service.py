@@ -0,0 +1,276 @@
+"""
+공용 문장 임베딩 서비스 (ko-sbert)
+
+- 모델은 처음 encode 할 때 한 번만 로딩되고 프로세스 전체에서 공유된다 (import 시 로딩하지 않음)
+- 여러 요청에서 동시에 들어온 encode 호출을 짧은 시간 모아 한 배치로 인코딩한다
+- 선택적으로 ONNX Runtime(+int8 동적 양자화) CPU 백엔드를 사용할 수 있다
+    EMBEDDING_BACKEND=onnx, EMBEDDING_ONNX_DIR=<export 경로>
+
+ONNX 모델 export 및 원본 벡터와의 일치도 확인:
+    python embedding_service.py --export-onnx --quantize --check-parity
+"""
+import os
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Union
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.env"))
+
+MODEL_NAME = "jhgan/ko-sbert-nli"
+MAX_SEQ_LENGTH = 128
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch | onnx
+ONNX_MODEL_DIR = os.getenv(
+    "EMBEDDING_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "ko-sbert-nli-onnx")
+)
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_FILE = "model_quantized.onnx"
+
+# 동시 요청 배치 설정
+MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+
+PARITY_SAMPLE_TEXTS = [
+    "지성 피부 / 민감도: 높음 / 상태: 여드름, 홍조",
+    "건성 | 건조한 계절에 사용했을땐 보습부분이 부족해서 만족스럽지 않았어요",
+    "복합성 피부인데 자극 없이 순하고 진정에 좋아요",
+    "색소침착 미백 주름 탄력"
+]
+
+
+# ========== 인코더 백엔드 ==========
+class SentenceTransformerEncoder:
+    """sentence-transformers(PyTorch) 원본 인코더"""
+    backend = "torch"
+
+    def __init__(self, model_name: str = MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+
+class OnnxEncoder:
+    """ONNX Runtime CPU 인코더 (mean pooling, sentence-transformers와 같은 출력)"""
+    backend = "onnx"
+
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR, quantized: bool = True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_file = ONNX_QUANTIZED_FILE if quantized and os.path.exists(os.path.join(model_dir, ONNX_QUANTIZED_FILE)) else ONNX_MODEL_FILE
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model_file = model_file
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                return_tensors="np"
+            )
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+            hidden = self.session.run(None, feeds)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            outputs.append((hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(outputs).astype(np.float32)
+
+
+def load_encoder(backend: str = EMBEDDING_BACKEND):
+    """백엔드 인코더 생성 (ONNX 로딩에 실패하면 원본 모델로 대체)"""
+    if backend == "onnx":
+        try:
+            encoder = OnnxEncoder()
+            print(f"✅ ONNX 임베딩 모델 로딩 완료 ({encoder.model_file})")
+            return encoder
+        except Exception as e:
+            print(f"⚠️ ONNX 임베딩 모델을 사용할 수 없습니다: {e} - 원본 모델을 사용합니다")
+    encoder = SentenceTransformerEncoder()
+    print(f"✅ 임베딩 모델 로딩 완료 ({MODEL_NAME})")
+    return encoder
+
+
+# ========== 공용 서비스 ==========
+class EmbeddingService:
+    """프로세스 전체에서 공유하는 지연 로딩 임베딩 서비스"""
+
+    def __init__(self, backend: str = EMBEDDING_BACKEND, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._encoder = None
+        self._load_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._encoder is not None
+
+    @property
+    def encoder(self):
+        if self._encoder is None:
+            with self._load_lock:
+                if self._encoder is None:
+                    self._encoder = load_encoder(self.backend)
+        return self._encoder
+
+    def encode(self, texts: Union[str, List[str]], batched: bool = True) -> np.ndarray:
+        """문장(또는 문장 리스트) 임베딩
+
+        batched=True면 다른 스레드의 동시 호출과 모아서 한 번에 인코딩한다.
+        오프라인 배치 작업처럼 이미 큰 배치를 넘기는 경우에는 batched=False로 직접 인코딩한다.
+        """
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        if batched:
+            future: Future = Future()
+            self._ensure_worker()
+            self._queue.put((items, future))
+            vectors = future.result()
+        else:
+            vectors = self.encoder.encode(items)
+        return vectors[0] if single else vectors
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            requests = [self._queue.get()]
+            size = len(requests[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            texts = [text for items, _ in requests for text in items]
+            try:
+                vectors = self.encoder.encode(texts)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for items, future in requests:
+                future.set_result(vectors[offset:offset + len(items)])
+                offset += len(items)
+
+
+embedding_service = EmbeddingService()
+
+
+def encode(texts: Union[str, List[str]], batched: bool = True) -> np.ndarray:
+    return embedding_service.encode(texts, batched=batched)
+
+
+# ========== ONNX export / 일치도 확인 ==========
+def export_onnx(output_dir: str = ONNX_MODEL_DIR, quantize: bool = True) -> str:
+    """ko-sbert 트랜스포머를 ONNX로 export (선택적으로 int8 동적 양자화)"""
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModel.from_pretrained(MODEL_NAME).eval()
+
+    dummy = tokenizer(PARITY_SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(dummy[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(output_dir)
+    print(f"✅ ONNX export 완료: {model_path}")
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(output_dir, ONNX_QUANTIZED_FILE)
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+        print(f"✅ int8 동적 양자화 완료: {quantized_path}")
+    return output_dir
+
+
+def check_parity(texts: Optional[List[str]] = None, model_dir: str = ONNX_MODEL_DIR, quantized: bool = True,
+                 min_cosine: float = 0.99) -> dict:
+    """ONNX 벡터와 원본 sentence-transformers 벡터의 코사인 유사도 비교"""
+    texts = texts or PARITY_SAMPLE_TEXTS
+    reference = SentenceTransformerEncoder().encode(texts)
+    candidate = OnnxEncoder(model_dir, quantized=quantized).encode(texts)
+
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = (reference * candidate).sum(axis=1)
+
+    report = {
+        "min_cosine": float(cosines.min()),
+        "mean_cosine": float(cosines.mean()),
+        "passed": bool(cosines.min() >= min_cosine)
+    }
+    status = "✅" if report["passed"] else "❌"
+    print(f"{status} ONNX 일치도: 최소 {report['min_cosine']:.4f}, 평균 {report['mean_cosine']:.4f} (기준 {min_cosine})")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ko-sbert ONNX export / 일치도 확인")
+    parser.add_argument("--export-onnx", action="store_true")
+    parser.add_argument("--quantize", action="store_true", help="int8 동적 양자화 모델도 생성")
+    parser.add_argument("--check-parity", action="store_true")
+    parser.add_argument("--output-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    if args.export_onnx:
+        export_onnx(args.output_dir, quantize=args.quantize)
+    if args.check_parity:
+        report = check_parity(model_dir=args.output_dir, quantized=args.quantize, min_cosine=args.min_cosine)
+        if not report["passed"]:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+추천 내역 write-behind 큐
+
+추천 응답 경로에서 DB 커밋을 기다리지 않도록 추천 내역을 메모리 큐에 넣고,
+백그라운드 스레드가 모아서 배치당 한 번의 트랜잭션으로
+RecommendationHistory / RecommendationProduct 행을 저장한다.
+배치 저장이 실패하면 한 건씩 다시 저장해서 실패한 내역만 버린다.
+서버 종료 시 남은 내역을 모두 저장한다.
+"""
+import time
+import queue
+import threading
+from typing import List, Dict, Optional, Callable
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 0.5   # 초
+DEFAULT_MAX_QUEUE_SIZE = 10000
+
+_STOP = object()
+
+
+class RecommendationHistoryWriter:
+    """추천 내역을 배치로 저장하는 백그라운드 writer"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"written": 0, "failed": 0, "batches": 0, "sync_fallback": 0}
+
+    @property
+    def session_factory(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    @property
+    def depth(self) -> int:
+        """아직 저장되지 않은 추천 내역 수"""
+        return self._queue.qsize()
+
+    def _record(self, name: str, count: int = 1):
+        # 워커 스레드와 요청 스레드(직접 저장)가 함께 갱신
+        with self._stats_lock:
+            self.stats[name] += count
+
+    def status(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {
+            "queue_depth": self.depth,
+            "running": self._worker is not None and self._worker.is_alive(),
+            **stats
+        }
+
+    # ========== 제출 ==========
+    def submit(self, recommendation_data: Dict):
+        """추천 내역을 큐에 넣고 바로 반환 (큐가 가득 차면 호출한 스레드에서 직접 저장)"""
+        self.start()
+        try:
+            self._queue.put_nowait(recommendation_data)
+        except queue.Full:
+            print("⚠️ 추천 내역 큐가 가득 찼습니다. 직접 저장합니다.")
+            self._record("sync_fallback")
+            self.write_batch([recommendation_data])
+
+    def start(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="recommendation-history-writer", daemon=True)
+                self._worker.start()
+
+    def stop(self, timeout: float = 10.0):
+        """남은 내역을 모두 저장하고 백그라운드 스레드 종료"""
+        if self._worker is None:
+            return
+        self._queue.put(_STOP)
+        self._worker.join(timeout)
+        self._worker = None
+        print(f"✅ 추천 내역 writer 종료 (저장 {self.stats['written']}건, 실패 {self.stats['failed']}건)")
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """큐에 있는 내역이 모두 저장될 때까지 대기"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    # ========== 백그라운드 저장 ==========
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self.write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        # 종료 신호 이후에 남아 있는 내역도 저장
+        remaining_items = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                remaining_items.append(item)
+        for start in range(0, len(remaining_items), self.batch_size):
+            self.write_batch(remaining_items[start:start + self.batch_size])
+
+    def write_batch(self, batch: List[Dict]):
+        """배치 전체를 한 트랜잭션으로 저장 (실패하면 한 건씩 다시 저장)"""
+        try:
+            self._write(batch)
+            self._record("batches")
+            return
+        except Exception as e:
+            print(f"⚠️ 추천 내역 배치 저장 실패 ({len(batch)}건): {e}")
+        if len(batch) == 1:
+            self._record("failed")
+            return
+
+        # 문제가 되는 내역만 버리도록 한 건씩 저장
+        for data in batch:
+            try:
+                self._write([data])
+            except Exception as e:
+                self._record("failed")
+                print(f"⚠️ 추천 내역 저장 실패 (user_id={data.get('user_id')}): {e}")
+
+    def _write(self, batch: List[Dict]):
+        db = self.session_factory()
+        try:
+            from crud import build_recommendation_history
+            from user_profiles import apply_recommended, invalidate
+
+            db.add_all([build_recommendation_history(data) for data in batch])
+
+            # 같은 트랜잭션에서 사용자 프로필의 "이미 추천한 제품" 목록도 갱신
+            recommended: Dict[int, List[str]] = {}
+            for data in batch:
+                names = [p.get("product_name") or p.get("제품명") for p in data["recommended_products"]]
+                recommended[data["user_id"]] = names + recommended.get(data["user_id"], [])
+            try:
+                with db.begin_nested():
+                    apply_recommended(db, recommended)
+            except Exception as e:
+                print(f"⚠️ 추천 제품 프로필 기록 실패: {e}")
+
+            db.commit()
+            invalidate(recommended.keys())
+            self._record("written", len(batch))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+history_writer = RecommendationHistoryWriter()
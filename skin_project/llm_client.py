@@ -0,0 +1,303 @@
+"""
+OpenAI 호출 안정화 레이어
+
+- 호출별 전체 마감 시간(deadline)과 시도별 타임아웃
+- 재시도 (지수 백오프 + jitter, 잘못된 요청/인증 오류는 재시도하지 않음)
+- 헤징: 응답이 LLM_HEDGE_AFTER_MS 보다 늦으면 같은 요청을 하나 더 보내 먼저 온 응답 사용
+- 서킷 브레이커: 연속 실패가 쌓이면 일정 시간 호출하지 않고 바로 LLMUnavailableError
+  (추천 API는 이때 검색 결과만으로 응답한다)
+- 호출 용도(tag)별 프롬프트/응답 토큰 수와 지연 시간 기록
+- stream_chat: 스트리밍 응답을 텍스트 조각 단위로 전달 (스트림을 여는 단계까지 재시도)
+
+환경변수: LLM_TIMEOUT, LLM_DEADLINE, LLM_MAX_RETRIES, LLM_HEDGE_AFTER_MS,
+         LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET
+"""
+import os
+import time
+import random
+import inspect
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional, Iterator
+
+from dotenv import load_dotenv
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.env"))
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+ATTEMPT_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "8"))       # 시도 1회 타임아웃 (초)
+CALL_DEADLINE = float(os.getenv("LLM_DEADLINE", "15"))       # 재시도 포함 전체 마감 (초)
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.3                                           # 초
+HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", "0"))  # 0이면 헤징 안 함
+BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))  # 초
+RECENT_CALLS = 200                                           # 최근 호출 기록 수
+
+# 재시도해도 결과가 같은 오류 (openai 예외 클래스 이름)
+# 요청 자체의 문제이므로 서킷 브레이커 실패로도 세지 않는다
+NON_RETRYABLE_ERRORS = {
+    "BadRequestError", "AuthenticationError", "PermissionDeniedError",
+    "NotFoundError", "UnprocessableEntityError"
+}
+# SDK가 호출 전에 인자를 검사하며 내는 오류 (지원하지 않는 키워드 등)
+REQUEST_ERRORS = (TypeError, ValueError)
+
+
+class LLMUnavailableError(Exception):
+    """LLM 호출 실패 (재시도 소진, 마감 초과, 서킷 오픈)"""
+    pass
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """연속 실패 threshold회 이상이면 reset_timeout 동안 호출 차단 (이후 1회 시험 호출)"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """성공/실패로 세지 않는 호출 종료 (시험 호출 자리만 반납)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"⚠️ LLM 서킷 브레이커 열림 (연속 실패 {self.failures}회, {self.reset_timeout:.0f}초 차단)")
+                self.opened_at = time.monotonic()
+
+
+class ResilientLLMClient:
+    """타임아웃/재시도/헤징/서킷 브레이커를 적용한 chat completion 클라이언트"""
+
+    def __init__(self, client=None, attempt_timeout: float = ATTEMPT_TIMEOUT, deadline: float = CALL_DEADLINE,
+                 max_retries: int = MAX_RETRIES, hedge_after_ms: float = HEDGE_AFTER_MS,
+                 breaker: Optional[CircuitBreaker] = None):
+        self._client = client
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.hedge_after = hedge_after_ms / 1000.0 if hedge_after_ms else None
+        self.breaker = breaker or CircuitBreaker()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "failures": 0, "rejected": 0, "bad_requests": 0}
+        self._stream_options: Optional[bool] = None
+        self.usage: Dict[str, Dict] = {}
+        self.recent = deque(maxlen=RECENT_CALLS)
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            # 재시도는 이 레이어에서 처리하므로 SDK 자체 재시도는 끔
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    @property
+    def supports_stream_options(self) -> bool:
+        """설치된 SDK가 stream_options(스트림 usage)를 지원하는지 (openai 1.26 이상)"""
+        if self._stream_options is None:
+            try:
+                parameters = inspect.signature(self.client.chat.completions.create).parameters
+                self._stream_options = "stream_options" in parameters
+            except (TypeError, ValueError):
+                self._stream_options = False
+        return self._stream_options
+
+    def status(self) -> Dict:
+        usage = {
+            tag: {
+                **totals,
+                "avg_prompt_tokens": round(totals["prompt_tokens"] / totals["calls"], 1),
+                "avg_completion_tokens": round(totals["completion_tokens"] / totals["calls"], 1),
+                "avg_latency_ms": round(totals["latency_ms"] / totals["calls"], 1)
+            }
+            for tag, totals in self.usage.items()
+        }
+        return {
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            **self.stats,
+            "usage": usage,
+            "recent": list(self.recent)[-20:]
+        }
+
+    def _record_usage(self, tag: str, messages: List[Dict], usage, completion_text: str, latency_ms: float):
+        """호출별 토큰 수/지연 시간 기록 (응답에 usage가 없으면 추정치)"""
+        from prompt_builder import messages_tokens, estimate_tokens
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if prompt_tokens is None:
+            prompt_tokens = messages_tokens(messages)
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(completion_text or "")
+
+        with self._lock:
+            totals = self.usage.setdefault(tag, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                                 "latency_ms": 0.0, "max_latency_ms": 0.0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["latency_ms"] += latency_ms
+            totals["max_latency_ms"] = max(totals["max_latency_ms"], latency_ms)
+            self.recent.append({"tag": tag, "prompt_tokens": prompt_tokens,
+                                "completion_tokens": completion_tokens, "latency_ms": round(latency_ms, 1)})
+        print(f"🧮 LLM {tag}: 프롬프트 {prompt_tokens} / 응답 {completion_tokens} 토큰, {latency_ms:.0f}ms")
+
+    # ========== 호출 ==========
+    def chat(self, messages: List[Dict], model: str = DEFAULT_MODEL, deadline: Optional[float] = None,
+             tag: str = "default", **kwargs):
+        """chat.completions.create와 같은 응답 반환, 실패 시 LLMUnavailableError
+
+        tag: 토큰/지연 시간 집계에 사용할 호출 용도 이름
+        """
+        started = time.monotonic()
+        response = self._call(messages, model, deadline, **kwargs)
+        try:
+            content = response.choices[0].message.content or ""
+        except Exception:
+            content = ""
+        self._record_usage(tag, messages, getattr(response, "usage", None), content, (time.monotonic() - started) * 1000)
+        return response
+
+    def stream_chat(self, messages: List[Dict], model: str = DEFAULT_MODEL, deadline: Optional[float] = None,
+                    tag: str = "default", **kwargs) -> Iterator[str]:
+        """스트리밍 응답의 텍스트 조각을 순서대로 yield
+
+        재시도/서킷 브레이커는 스트림을 여는 단계까지 적용하고,
+        스트림 도중 끊기면 LLMUnavailableError (이미 전달한 조각은 호출 측에서 사용 가능)
+        SDK가 stream_options를 지원하지 않으면 토큰 수는 추정치로 기록한다.
+        """
+        started = time.monotonic()
+        if self.supports_stream_options:
+            kwargs["stream_options"] = {"include_usage": True}
+        stream = self._call(messages, model, deadline, stream=True, **kwargs)
+        parts: List[str] = []
+        usage = None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            self.stats["failures"] += 1
+            self.breaker.record_failure()
+            raise LLMUnavailableError(f"LLM 스트림 중단: {e}")
+        self._record_usage(tag, messages, usage, "".join(parts), (time.monotonic() - started) * 1000)
+
+    def _call(self, messages: List[Dict], model: str, deadline: Optional[float], **kwargs):
+        if not self.breaker.allow():
+            self.stats["rejected"] += 1
+            raise CircuitOpenError("LLM 서킷 브레이커가 열려 있습니다")
+
+        self.stats["calls"] += 1
+        ends_at = time.monotonic() + (deadline or self.deadline)
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.max_retries + 1):
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response = self._attempt(messages, model, min(self.attempt_timeout, remaining), **kwargs)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                if isinstance(e, REQUEST_ERRORS) or type(e).__name__ in NON_RETRYABLE_ERRORS:
+                    # 잘못된 요청은 upstream 장애가 아니므로 재시도/브레이커 실패 없이 바로 실패
+                    self.stats["bad_requests"] += 1
+                    self.breaker.release()
+                    raise LLMUnavailableError(f"LLM 요청 오류: {e}")
+                last_error = e
+                if attempt < self.max_retries:
+                    self.stats["retries"] += 1
+                    # full jitter 백오프 (남은 시간 안에서만)
+                    time.sleep(min(random.uniform(0, BACKOFF_BASE * (2 ** attempt)), max(0.0, ends_at - time.monotonic())))
+
+        self.stats["failures"] += 1
+        self.breaker.record_failure()
+        raise LLMUnavailableError(f"LLM 호출 실패: {last_error or '마감 시간 초과'}")
+
+    def _create(self, messages, model, timeout, **kwargs):
+        return self.client.chat.completions.create(model=model, messages=messages, timeout=timeout, **kwargs)
+
+    def _attempt(self, messages, model, timeout, **kwargs):
+        # 스트림은 헤징하지 않음 (늦게 열린 쪽 스트림을 정리할 수 없음)
+        if not self.hedge_after or self.hedge_after >= timeout or kwargs.get("stream"):
+            return self._create(messages, model, timeout, **kwargs)
+
+        executor = self._get_executor()
+        started = time.monotonic()
+        primary = executor.submit(self._create, messages, model, timeout, **kwargs)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        # 느린 요청: 남은 시간으로 헤지 요청을 하나 더 보내고 먼저 성공한 응답 사용
+        self.stats["hedges"] += 1
+        hedge_timeout = max(0.1, timeout - (time.monotonic() - started))
+        pending = {primary, executor.submit(self._create, messages, model, hedge_timeout, **kwargs)}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, started + timeout - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error or TimeoutError("LLM 응답 시간 초과")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+        return self._executor
+
+
+llm_client = ResilientLLMClient()
@@ -3,7 +3,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from fastapi import FastAPI, Depends, HTTPException, status, Body, Request, File, UploadFile
+from fastapi import FastAPI, Depends, HTTPException, status, Body, Request, Response, File, UploadFile, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -13,7 +13,8 @@ from datetime import datetime, timedelta, time, date as date_cls
 from sqlalchemy.sql import text
 
 # 데이터베이스 및 모델 import
-from database import SessionLocal, Base, engine
+from database import SessionLocal, Base, engine, get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.models import db_models
 from core.models.medical_models import Hospital, Doctor, Appointment
 from core.models.db_models import (
@@ -28,7 +29,8 @@ from crud import create_product
 from medical_crud import (
     get_hospitals, get_hospital, create_hospital,
     get_doctors, get_doctor, create_doctor,
-    get_appointments, get_appointment, create_appointment, cancel_appointment, update_appointment,
+    get_appointments, get_appointment, create_appointment, create_appointment_async, cancel_appointment, update_appointment,
+    get_doctor_patient_roster,
     get_medical_records, create_medical_record,
     get_doctor_reviews, create_doctor_review,
     get_available_times
@@ -37,15 +39,24 @@ from medical_crud import (
 # AI 모델 서비스 import
 from ai_model_service import skin_analysis_service
 
+from pagination import InvalidCursorError, NEXT_CURSOR_HEADER, set_next_cursor
+from product_matching import clean_product_name, link_crawled_reviews, unlink_crawled_reviews
+from product_search import invalidate_product_search
+from crawled_import import import_product_csvs, import_review_csvs
+
 # AI 피부 분석 CRUD import
 from skin_analysis_crud import (
     create_skin_analysis_result,
+    create_skin_analysis_result_async,
     get_user_skin_analysis_history,
     get_skin_analysis_by_id,
     delete_skin_analysis_result,
     format_analysis_for_api
 )
 
+# 사용자 피부 프로필 (추천 개인화)
+from user_profiles import update_from_analysis, update_from_review
+
 # 추천 시스템 import (임시 주석 처리)
 from product_description.crawler import crawl_olive_young_reviews
 # from recommendation import recommend_endpoint, RecommendQuery  # 존재하지 않는 import 제거
@@ -57,6 +68,9 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "default-key")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
+DEFAULT_PATIENT_PAGE_SIZE = 100  # cursor만 주고 limit이 없을 때 한 페이지 인원
+MAX_PATIENT_PAGE_SIZE = 500  # 환자 목록 한 페이지 최대 인원
+
 # 데이터베이스 연결 테스트
 try:
     # 데이터베이스 연결 테스트
@@ -104,6 +118,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # 목록 API의 다음 페이지 커서 (브라우저에서 읽을 수 있도록)
 )
 
 # 의존성 주입을 위한 데이터베이스 세션
@@ -293,7 +308,7 @@ def update_user_profile(user_id: int, data: dict, db: Session = Depends(get_db))
 
 # ========== 리뷰 API ==========
 @app.post("/api/reviews")
-def create_review(data: dict, db: Session = Depends(get_db)):
+def create_review(data: dict, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """리뷰 작성"""
     try:
         from crud import create_product_review
@@ -316,6 +331,11 @@ def create_review(data: dict, db: Session = Depends(get_db)):
         
         review = create_product_review(db, user_id, product_id, review_data)
         
+        # 응답 후 사용자 프로필 벡터 갱신 (추천 개인화)
+        background_tasks.add_task(
+            update_from_review, user_id, product_id, review_data["content"], review_data["rating"], review_data["skin_type"]
+        )
+        
         return {
             "success": True,
             "reviewId": review.id,
@@ -326,13 +346,14 @@ def create_review(data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"리뷰 작성 실패: {str(e)}")
 
 @app.get("/api/reviews")
-def get_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_reviews(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """리뷰 목록 조회"""
     try:
         from crud import get_crawled_reviews
         
         # 크롤링된 리뷰와 사용자 작성 리뷰를 혼합해서 반환
-        crawled_reviews = get_crawled_reviews(db, skip, limit)
+        crawled_reviews = get_crawled_reviews(db, skip, limit, cursor=cursor)
+        set_next_cursor(response, crawled_reviews)
         
         if not crawled_reviews:
             raise HTTPException(status_code=404, detail="등록된 리뷰가 없습니다")
@@ -353,6 +374,8 @@ def get_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
             })
         
         return {"success": True, "data": formatted_reviews}
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except HTTPException:
         raise
     except Exception as e:
@@ -360,12 +383,13 @@ def get_reviews(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"리뷰 목록 조회 중 오류가 발생했습니다: {str(e)}")
 
 @app.get("/api/reviews/user/{user_id}")
-def get_user_reviews(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_user_reviews(user_id: int, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """사용자 리뷰 목록 조회"""
     try:
         from crud import get_user_reviews as get_user_reviews_crud
         
-        user_reviews = get_user_reviews_crud(db, user_id, skip, limit)
+        user_reviews = get_user_reviews_crud(db, user_id, skip, limit, cursor=cursor)
+        set_next_cursor(response, user_reviews)
         
         if not user_reviews:
             raise HTTPException(status_code=404, detail=f"사용자 {user_id}의 리뷰가 없습니다")
@@ -392,6 +416,8 @@ def get_user_reviews(user_id: int, skip: int = 0, limit: int = 100, db: Session
             "success": True,
             "data": formatted_reviews
         }
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except HTTPException:
         raise
     except Exception as e:
@@ -428,16 +454,10 @@ def get_product_reviews(product_id: int, db: Session = Depends(get_db)):
                 "type": "user_review"
             })
         
-        # 2. 크롤링된 리뷰 가져오기 (제품명으로 매칭)
-        # product_id 컬럼이 없으므로 제품명이나 다른 방식으로 매칭
-        crawled_reviews = []
-        
-        # 먼저 제품명으로 매칭 시도
-        if hasattr(CrawledReview, 'source_product_name'):
-            # source_product_name이 있는 경우
-            crawled_reviews = db.query(CrawledReview).filter(
-                CrawledReview.source_product_name.ilike(f"%{product.name}%")
-            ).limit(10).all()
+        # 2. 크롤링된 리뷰 가져오기 (import 시 매칭해 둔 product_id, 인덱스 조회)
+        crawled_reviews = db.query(CrawledReview).filter(
+            CrawledReview.product_id == product_id
+        ).order_by(CrawledReview.id).limit(10).all()
         
         # 매칭된 리뷰가 적으면 랜덤으로 일부 추가
         if len(crawled_reviews) < 5:
@@ -623,11 +643,12 @@ def get_new_products_api(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"신제품 조회 중 오류가 발생했습니다: {str(e)}")
 
 @app.get("/api/products/category/{category}")
-def get_products_by_category_api(category: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_products_by_category_api(category: str, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """카테고리별 제품 조회"""
     try:
         from crud import get_products
-        products = get_products(db, skip=skip, limit=limit, category=category)
+        products = get_products(db, skip=skip, limit=limit, category=category, cursor=cursor)
+        set_next_cursor(response, products)
         
         if not products:
             raise HTTPException(status_code=404, detail=f"카테고리 '{category}'에 해당하는 제품이 없습니다")
@@ -645,6 +666,8 @@ def get_products_by_category_api(category: str, skip: int = 0, limit: int = 100,
             }
             for product in products
         ]
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except HTTPException:
         raise
     except Exception as e:
@@ -652,15 +675,16 @@ def get_products_by_category_api(category: str, skip: int = 0, limit: int = 100,
         raise HTTPException(status_code=500, detail=f"카테고리 '{category}' 제품 조회 중 오류가 발생했습니다: {str(e)}")
 
 @app.get("/api/products")
-def get_products_api(skip: int = 0, limit: int = 100, search: str = None, db: Session = Depends(get_db)):
+def get_products_api(response: Response, skip: int = 0, limit: int = 100, search: str = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """제품 목록 조회"""
     try:
         from crud import get_products, search_products
         
         if search:
-            products = search_products(db, search, skip=skip, limit=limit)
+            products = search_products(db, search, skip=skip, limit=limit, cursor=cursor)
         else:
-            products = get_products(db, skip=skip, limit=limit)
+            products = get_products(db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, products)
         
         if not products:
             if search:
@@ -684,6 +708,8 @@ def get_products_api(skip: int = 0, limit: int = 100, search: str = None, db: Se
                 for product in products
             ]
         }
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except HTTPException:
         raise
     except Exception as e:
@@ -836,7 +862,7 @@ def get_product_shops_api(product_id: int, db: Session = Depends(get_db)):
 
 # ========== 진료 요청서 API ==========
 @app.post("/api/medical/diagnosis-requests")
-async def create_diagnosis_request(request: Request, db: Session = Depends(get_db)):
+async def create_diagnosis_request(request: Request, db: AsyncSession = Depends(get_async_db)):
     """진료 요청서 제출"""
     try:
         # Raw request body 읽기
@@ -860,8 +886,7 @@ async def create_diagnosis_request(request: Request, db: Session = Depends(get_d
         )
         
         db.add(diagnosis_request)
-        db.commit()
-        db.refresh(diagnosis_request)
+        await db.commit()
         
         print(f"✅ 진료 요청서 생성 성공: {diagnosis_request.id}")
         
@@ -1075,10 +1100,11 @@ def get_nearby_pharmacies(lat: float, lng: float, radius: int = 5):
 
 # ========== 병원 API ==========
 @app.get("/api/medical/hospitals")
-def get_hospitals_api(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_hospitals_api(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """병원 목록 조회"""
     try:
-        hospitals = get_hospitals(db, skip=skip, limit=limit)
+        hospitals = get_hospitals(db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, hospitals)
         return [
             {
                 "id": hospital.id,
@@ -1091,6 +1117,8 @@ def get_hospitals_api(skip: int = 0, limit: int = 100, db: Session = Depends(get
             }
             for hospital in hospitals
         ]
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except Exception as e:
         print(f"❌ 병원 목록 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="병원 목록 조회 중 오류가 발생했습니다")
@@ -1127,10 +1155,11 @@ def get_hospital_api(hospital_id: int, db: Session = Depends(get_db)):
 
 # ========== 의사 API ==========
 @app.get("/api/medical/doctors")
-def get_doctors_api(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_doctors_api(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """의사 목록 조회"""
     try:
-        doctors = get_doctors(db, skip=skip, limit=limit)
+        doctors = get_doctors(db, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, doctors)
         return [
             {
                 "id": doctor.id,
@@ -1145,6 +1174,8 @@ def get_doctors_api(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
             }
             for doctor in doctors
         ]
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except Exception as e:
         print(f"❌ 의사 목록 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="의사 목록 조회 중 오류가 발생했습니다")
@@ -1302,12 +1333,10 @@ def get_doctor_available_times(doctor_id: int, date: str, db: Session = Depends(
         raise HTTPException(status_code=500, detail="가능 시간 조회 중 오류가 발생했습니다")
 
 @app.get("/api/medical/appointments")
-def get_appointments_api(user_id: Optional[int] = None, doctor_id: Optional[int] = None, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_appointments_api(response: Response, user_id: Optional[int] = None, doctor_id: Optional[int] = None, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """예약 목록 조회"""
     try:
         from medical_schemas import AppointmentSearchParams
-        from core.models.medical_models import MedicalRecord
-        from core.models.db_models import User
         
         # user_id 또는 doctor_id 기반으로 검색 파라미터 설정
         search_params = None
@@ -1316,18 +1345,18 @@ def get_appointments_api(user_id: Optional[int] = None, doctor_id: Optional[int]
         elif doctor_id:
             search_params = AppointmentSearchParams(doctor_id=doctor_id)
         
-        appointments = get_appointments(db, skip=skip, limit=limit, search_params=search_params)
+        # 의사/병원/진료 기록/사용자 정보까지 한 번의 쿼리로 조회
+        appointments = get_appointments(db, skip=skip, limit=limit, search_params=search_params, cursor=cursor)
+        set_next_cursor(response, appointments)
         
         result = []
         for appointment in appointments:
             # 진료 기록 존재 여부 확인
-            medical_record = db.query(MedicalRecord).filter(
-                MedicalRecord.appointment_id == appointment.id
-            ).first()
+            medical_record = appointment.medical_record
             has_medical_record = medical_record is not None
             
-            # 사용자 정보 조회
-            user = db.query(User).filter(User.id == appointment.user_id).first()
+            # 사용자 정보
+            user = appointment.user
             
             result.append({
                 "id": appointment.id,
@@ -1357,12 +1386,14 @@ def get_appointments_api(user_id: Optional[int] = None, doctor_id: Optional[int]
             })
         
         return result
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except Exception as e:
         print(f"❌ 예약 목록 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="예약 목록 조회 중 오류가 발생했습니다")
 
 @app.post("/api/medical/appointments")
-async def create_appointment_api(request: Request, db: Session = Depends(get_db)):
+async def create_appointment_api(request: Request, db: AsyncSession = Depends(get_async_db)):
     """예약 생성"""
     try:
         # Raw request body 읽기
@@ -1395,7 +1426,7 @@ async def create_appointment_api(request: Request, db: Session = Depends(get_db)
         appointment_data = AppointmentCreate(**appointment_data_dict)
         print(f"🔍 AppointmentCreate 객체 생성 성공")
         
-        appointment = create_appointment(db, appointment_data)
+        appointment = await create_appointment_async(db, appointment_data)
         print(f"🔍 예약 생성 성공: {appointment.id}")
         
         return {
@@ -1560,69 +1591,14 @@ def update_appointment_status_api(appointment_id: int, data: dict, db: Session =
 def import_crawled_reviews(db: Session = Depends(get_db)):
     """크롤링된 리뷰 데이터를 DB에 저장 (중복 방지)"""
     try:
-        import pandas as pd
-        import os
-        from crud import bulk_create_crawled_reviews
-        
-        # CSV 파일들 경로
-        csv_files = [
-            ("./crawler/data/reviews_bulk_toner.csv", "토너"),
-            ("./crawler/data/reviews_bulk_cream.csv", "크림"), 
-            ("./crawler/data/reviews_bulk_ampoule.csv", "앰플")
-        ]
+        # CSV를 청크 단위로 읽어 저장 (중복은 ON CONFLICT DO NOTHING으로 제외)
+        file_results = import_review_csvs(db)
         
+        # 총합 계산
         total_stats = {"created": 0, "duplicates": 0, "total": 0}
-        file_results = []
-        
-        for csv_file, category in csv_files:
-            if not os.path.exists(csv_file):
-                print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
-                continue
-            
-            try:
-                df = pd.read_csv(csv_file)
-                print(f"📄 {category} 파일: {len(df)}개 리뷰 발견")
-                
-                # 데이터 변환
-                reviews_data = []
-                for _, row in df.iterrows():
-                    review_data = {
-                        "source": "oliveyoung",
-                        "source_product_name": str(row.get('product_name', f'{category} 제품')),
-                        "source_product_id": str(row.get('product_id', '')),
-                        "reviewer_name": None,  # 익명 처리
-                        "rating": float(row.get('star', 4.0)) if pd.notna(row.get('star')) else 4.0,
-                        "content": str(row.get('review', '좋은 제품입니다.')),
-                        "skin_type": str(row.get('skin_type', '')) if pd.notna(row.get('skin_type')) else None,
-                        "age_group": str(row.get('age', '')) if pd.notna(row.get('age')) else None,
-                        "review_date": str(row.get('date', '')) if pd.notna(row.get('date')) else None,
-                        "helpful_count": int(row.get('helpful', 0)) if pd.notna(row.get('helpful')) else 0
-                    }
-                    reviews_data.append(review_data)
-                
-                # DB에 저장 (중복 방지)
-                stats = bulk_create_crawled_reviews(db, reviews_data)
-                
-                file_results.append({
-                    "file": csv_file,
-                    "category": category,
-                    "stats": stats
-                })
-                
-                # 총합 계산
-                total_stats["created"] += stats["created"]
-                total_stats["duplicates"] += stats["duplicates"]
-                total_stats["total"] += stats["total"]
-                
-                print(f"✅ {category}: {stats['created']}개 저장, {stats['duplicates']}개 중복")
-                
-            except Exception as file_error:
-                print(f"❌ {csv_file} 처리 실패: {file_error}")
-                file_results.append({
-                    "file": csv_file,
-                    "category": category,
-                    "error": str(file_error)
-                })
+        for result in file_results:
+            for key in total_stats:
+                total_stats[key] += result.get("stats", {}).get(key, 0)
         
         return {
             "success": True,
@@ -2377,162 +2353,28 @@ def init_database():
         print("📦 4단계: 실제 제품 데이터 import 중...")
         db = SessionLocal()
         try:
-            import pandas as pd
-            import os
-            import re
-            
             # 1. 기존 샘플 제품 데이터 완전 삭제
             print("🗑️ 기존 샘플 제품 데이터 삭제 중...")
             db.execute(text("DELETE FROM product_benefits"))
             db.execute(text("DELETE FROM product_skin_types"))
             db.execute(text("DELETE FROM product_ingredients"))
             db.execute(text("DELETE FROM product_shops"))
+            unlink_crawled_reviews(db)  # 리뷰 -> 제품 연결은 import 후 다시 매칭
             db.execute(text("DELETE FROM products"))
             db.commit()
+            invalidate_product_search()
             print("✅ 기존 데이터 삭제 완료")
             
-            # 2. 크롤링된 제품 데이터 CSV 파일들
-            csv_files = [
-                ("./crawler/data/product_list_toner.csv", "토너"),
-                ("./crawler/data/product_list_cream.csv", "크림"), 
-                ("./crawler/data/product_list_ampoule.csv", "앰플")
-            ]
+            # 2. 크롤링된 제품 데이터 CSV 파일들 (청크 단위로 읽어 테이블별 bulk insert)
+            try:
+                import_results = import_product_csvs(db)
+            finally:
+                # import 도중 검색으로 만들어진 일부 제품 색인도 버리고 다음 검색에서 재빌드 (실패 시 포함)
+                invalidate_product_search()
+            total_imported = sum(result.get("imported", 0) for result in import_results)
             
-            total_imported = 0
-            import_results = []
-            
-            for csv_file, category in csv_files:
-                if not os.path.exists(csv_file):
-                    print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
-                    import_results.append({
-                        "category": category,
-                        "error": "파일 없음"
-                    })
-                    continue
-                
-                try:
-                    df = pd.read_csv(csv_file)
-                    print(f"📄 {category} 파일: {len(df)}개 제품 발견")
-                    
-                    imported_count = 0
-                    for _, row in df.iterrows():
-                        # 가격 문자열 파싱 ("49,000" -> 49000)
-                        price_str = str(row.get('price_discounted', '0')).replace(',', '').replace('"', '')
-                        try:
-                            price = int(price_str)
-                        except:
-                            price = 0
-                        
-                        # 제품명에서 브랜드명 제거하여 깔끔하게 만들기
-                        brand = str(row.get('brand', 'Unknown'))
-                        full_name = str(row.get('name', ''))
-                        
-                        # 제품명에서 브랜드명이 포함되어 있으면 제거
-                        if brand.lower() in full_name.lower():
-                            name = full_name.replace(brand, '').strip()
-                            # 앞뒤 콤마나 공백 제거
-                            name = re.sub(r'^[,\s]+|[,\s]+$', '', name)
-                        else:
-                            name = full_name
-                        
-                        # 너무 긴 이름 줄이기 (괄호 부분 제거)
-                        if '(' in name:
-                            name = name.split('(')[0].strip()
-                        if '[' in name and ']' in name:
-                            # [기획] 같은 부분만 제거하고 나머지는 유지
-                            name = re.sub(r'\[[^\]]*기획[^\]]*\]', '', name).strip()
-                        
-                        # 빈 이름이면 기본값 설정
-                        if not name or name.strip() == '':
-                            name = f"{brand} {category}"
-                        
-                        # Product 객체 생성
-                        product = Product(
-                            name=name[:100],  # 이름 길이 제한
-                            brand=brand,
-                            category=category,
-                            price=price,
-                            original_price=price + int(price * 0.1),  # 원가는 10% 높게 설정
-                            rating=4.0 + (hash(name) % 10) / 10,  # 4.0~4.9 랜덤 평점
-                            review_count=20 + (hash(brand + name) % 50),  # 20~70 랜덤 리뷰 수
-                            description=f"{brand}의 {category} 제품입니다. 고품질 원료로 만든 프리미엄 화장품입니다.",
-                            volume="50ml",  # 기본 용량
-                            is_popular=imported_count < 5,  # 처음 5개만 인기 제품
-                            is_new=imported_count < 3,  # 처음 3개만 신제품
-                            image_url=row.get('image_url', '')
-                        )
-                        
-                        db.add(product)
-                        db.flush()  # ID 생성을 위해 flush
-                        
-                        # 기본 성분 추가
-                        if category == "토너":
-                            ingredients = ["히알루론산", "나이아신아마이드", "글리세린"]
-                        elif category == "크림":
-                            ingredients = ["세라마이드", "시어버터", "판테놀"]
-                        else:  # 앰플
-                            ingredients = ["비타민C", "펩타이드", "레티놀"]
-                        
-                        for ingredient in ingredients:
-                            db.add(ProductIngredient(product_id=product.id, ingredient=ingredient))
-                        
-                        # 기본 피부타입 추가
-                        skin_types = ["건성", "지성", "복합성"]
-                        for skin_type in skin_types:
-                            db.add(ProductSkinType(product_id=product.id, skin_type=skin_type))
-                        
-                        # 기본 효능 추가
-                        if category == "토너":
-                            benefits = ["수분공급", "각질제거", "진정"]
-                        elif category == "크림":
-                            benefits = ["보습", "영양공급", "탄력"]
-                        else:  # 앰플
-                            benefits = ["미백", "주름개선", "트러블케어"]
-                        
-                        for benefit in benefits:
-                            db.add(ProductBenefit(product_id=product.id, benefit=benefit))
-                        
-                        # 기본 쇼핑몰 판매정보 추가 (ProductShop)
-                        # 올리브영, 쿠팡, 네이버쇼핑에서 판매한다고 가정
-                        shops = db.query(Shop).limit(4).all()  # 앞에서 생성한 4개 쇼핑몰
-                        
-                        for i, shop in enumerate(shops):
-                            # 쇼핑몰별로 약간 다른 가격 설정
-                            shop_price = price + (i * 1000)  # 쇼핑몰별로 1000원씩 차이
-                            is_lowest = (i == 0)  # 첫 번째 쇼핑몰이 최저가
-                            shipping_fee = 0 if shop_price >= 30000 or i == 0 else 2500  # 3만원 이상 또는 첫 번째 쇼핑몰은 무료배송
-                            
-                            db.add(ProductShop(
-                                product_id=product.id,
-                                shop_id=shop.id,
-                                price=shop_price,
-                                shipping="무료배송" if shipping_fee == 0 else "유료배송",
-                                shipping_fee=shipping_fee,
-                                installment=f"{2+i}개월" if shop_price >= 20000 else None,
-                                is_free_shipping=(shipping_fee == 0),
-                                is_lowest_price=is_lowest,
-                                is_card_discount=(i % 2 == 1)  # 홀수 번째 쇼핑몰은 카드할인
-                            ))
-                        
-                        imported_count += 1
-                    
-                    db.commit()
-                    total_imported += imported_count
-                    
-                    import_results.append({
-                        "category": category,
-                        "imported": imported_count,
-                        "file": csv_file
-                    })
-                    
-                    print(f"✅ {category}: {imported_count}개 제품 import 완료")
-                    
-                except Exception as file_error:
-                    print(f"❌ {csv_file} 처리 실패: {file_error}")
-                    import_results.append({
-                        "category": category,
-                        "error": str(file_error)
-                    })
+            # 기존 크롤링 리뷰를 새 제품 ID에 다시 연결
+            link_crawled_reviews(db)
             
             import_response = {
                 "success": True,
@@ -2549,49 +2391,12 @@ def init_database():
         
         # 5. 크롤링된 리뷰 데이터 import
         print("📊 5단계: 크롤링 리뷰 데이터 import 중...")
+        total_reviews = 0
         db = SessionLocal()
         try:
-            from crud import bulk_create_crawled_reviews
-            
-            csv_files_reviews = [
-                ("./crawler/data/reviews_bulk_toner.csv", "토너"),
-                ("./crawler/data/reviews_bulk_cream.csv", "크림"), 
-                ("./crawler/data/reviews_bulk_ampoule.csv", "앰플")
-            ]
-            
-            total_reviews = 0
-            for csv_file, category in csv_files_reviews:
-                if not os.path.exists(csv_file):
-                    print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
-                    continue
-                
-                try:
-                    df = pd.read_csv(csv_file)
-                    print(f"📄 {category} 파일: {len(df)}개 리뷰 발견")
-                    
-                    reviews_data = []
-                    for _, row in df.iterrows():
-                        review_data = {
-                            "source": "oliveyoung",
-                            "source_product_name": str(row.get('product_name', f'{category} 제품')),
-                            "source_product_id": str(row.get('product_id', '')),
-                            "reviewer_name": None,
-                            "rating": row.get('star', 4.0),
-                            "content": str(row.get('review', '좋은 제품입니다.')),
-                            "skin_type": row.get('skin_type') if pd.notna(row.get('skin_type')) else None,
-                            "age_group": row.get('age') if pd.notna(row.get('age')) else None,
-                            "review_date": row.get('date') if pd.notna(row.get('date')) else None,
-                            "helpful_count": row.get('helpful', 0)
-                        }
-                        reviews_data.append(review_data)
-                    
-                    stats = bulk_create_crawled_reviews(db, reviews_data)
-                    total_reviews += stats["created"]
-                    print(f"✅ {category}: {stats['created']}개 새로 저장, {stats['duplicates']}개 중복 제외")
-                    
-                except Exception as file_error:
-                    print(f"❌ {category} 리뷰 파일 처리 실패: {file_error}")
-                    
+            # 청크 단위로 읽어 ON CONFLICT DO NOTHING으로 저장
+            review_results = import_review_csvs(db)
+            total_reviews = sum(result["stats"]["created"] for result in review_results if "stats" in result)
         except Exception as e:
             print(f"❌ 리뷰 데이터 import 중 오류: {e}")
         finally:
@@ -2798,169 +2603,36 @@ def init_database():
 def import_crawled_products(db: Session = Depends(get_db)):
     """크롤링된 제품 데이터를 DB에 저장 (기존 샘플 데이터 대체)"""
     try:
-        import pandas as pd
-        import os
-        import re
-        
         # 1. 기존 샘플 제품 데이터 완전 삭제
         print("🗑️ 기존 샘플 제품 데이터 삭제 중...")
         db.execute(text("DELETE FROM product_benefits"))
         db.execute(text("DELETE FROM product_skin_types"))
         db.execute(text("DELETE FROM product_ingredients"))
         db.execute(text("DELETE FROM product_shops"))
+        unlink_crawled_reviews(db)  # 리뷰 -> 제품 연결은 import 후 다시 매칭
         db.execute(text("DELETE FROM products"))
         db.commit()
+        invalidate_product_search()
         print("✅ 기존 데이터 삭제 완료")
         
-        # 2. 크롤링된 제품 데이터 CSV 파일들
-        csv_files = [
-            ("./crawler/data/product_list_toner.csv", "토너"),
-            ("./crawler/data/product_list_cream.csv", "크림"), 
-            ("./crawler/data/product_list_ampoule.csv", "앰플")
-        ]
+        # 2. 크롤링된 제품 데이터 CSV 파일들 (청크 단위로 읽어 테이블별 bulk insert)
+        try:
+            import_results = import_product_csvs(db)
+        finally:
+            # import 도중 검색으로 만들어진 일부 제품 색인도 버리고 다음 검색에서 재빌드 (실패 시 포함)
+            invalidate_product_search()
+        total_imported = sum(result.get("imported", 0) for result in import_results)
         
-        total_imported = 0
-        import_results = []
-        
-        for csv_file, category in csv_files:
-            if not os.path.exists(csv_file):
-                print(f"⚠️ 파일을 찾을 수 없습니다: {csv_file}")
-                import_results.append({
-                    "category": category,
-                    "error": "파일 없음"
-                })
-                continue
-            
-            try:
-                df = pd.read_csv(csv_file)
-                print(f"📄 {category} 파일: {len(df)}개 제품 발견")
-                
-                imported_count = 0
-                for _, row in df.iterrows():
-                    # 가격 문자열 파싱 ("49,000" -> 49000)
-                    price_str = str(row.get('price_discounted', '0')).replace(',', '').replace('"', '')
-                    try:
-                        price = int(price_str)
-                    except:
-                        price = 0
-                    
-                    # 제품명에서 브랜드명 제거하여 깔끔하게 만들기
-                    brand = str(row.get('brand', 'Unknown'))
-                    full_name = str(row.get('name', ''))
-                    
-                    # 제품명에서 브랜드명이 포함되어 있으면 제거
-                    if brand.lower() in full_name.lower():
-                        name = full_name.replace(brand, '').strip()
-                        # 앞뒤 콤마나 공백 제거
-                        name = re.sub(r'^[,\s]+|[,\s]+$', '', name)
-                    else:
-                        name = full_name
-                    
-                    # 너무 긴 이름 줄이기 (괄호 부분 제거)
-                    if '(' in name:
-                        name = name.split('(')[0].strip()
-                    if '[' in name and ']' in name:
-                        # [기획] 같은 부분만 제거하고 나머지는 유지
-                        name = re.sub(r'\[[^\]]*기획[^\]]*\]', '', name).strip()
-                    
-                    # 빈 이름이면 기본값 설정
-                    if not name or name.strip() == '':
-                        name = f"{brand} {category}"
-                    
-                    # Product 객체 생성
-                    product = Product(
-                        name=name[:100],  # 이름 길이 제한
-                        brand=brand,
-                        category=category,
-                        price=price,
-                        original_price=price + int(price * 0.1),  # 원가는 10% 높게 설정
-                        rating=4.0 + (hash(name) % 10) / 10,  # 4.0~4.9 랜덤 평점
-                        review_count=20 + (hash(brand + name) % 50),  # 20~70 랜덤 리뷰 수
-                        description=f"{brand}의 {category} 제품입니다. 고품질 원료로 만든 프리미엄 화장품입니다.",
-                        volume="50ml",  # 기본 용량
-                        is_popular=imported_count < 5,  # 처음 5개만 인기 제품
-                        is_new=imported_count < 3,  # 처음 3개만 신제품
-                        image_url=row.get('image_url', '')
-                    )
-                    
-                    db.add(product)
-                    db.flush()  # ID 생성을 위해 flush
-                    
-                    # 기본 성분 추가
-                    if category == "토너":
-                        ingredients = ["히알루론산", "나이아신아마이드", "글리세린"]
-                    elif category == "크림":
-                        ingredients = ["세라마이드", "시어버터", "판테놀"]
-                    else:  # 앰플
-                        ingredients = ["비타민C", "펩타이드", "레티놀"]
-                    
-                    for ingredient in ingredients:
-                        db.add(ProductIngredient(product_id=product.id, ingredient=ingredient))
-                    
-                    # 기본 피부타입 추가
-                    skin_types = ["건성", "지성", "복합성"]
-                    for skin_type in skin_types:
-                        db.add(ProductSkinType(product_id=product.id, skin_type=skin_type))
-                    
-                    # 기본 효능 추가
-                    if category == "토너":
-                        benefits = ["수분공급", "각질제거", "진정"]
-                    elif category == "크림":
-                        benefits = ["보습", "영양공급", "탄력"]
-                    else:  # 앰플
-                        benefits = ["미백", "주름개선", "트러블케어"]
-                    
-                    for benefit in benefits:
-                        db.add(ProductBenefit(product_id=product.id, benefit=benefit))
-                    
-                    # 기본 쇼핑몰 판매정보 추가 (ProductShop)
-                    # 올리브영, 쿠팡, 네이버쇼핑에서 판매한다고 가정
-                    shops = db.query(Shop).limit(4).all()  # 앞에서 생성한 4개 쇼핑몰
-                    
-                    for i, shop in enumerate(shops):
-                        # 쇼핑몰별로 약간 다른 가격 설정
-                        shop_price = price + (i * 1000)  # 쇼핑몰별로 1000원씩 차이
-                        is_lowest = (i == 0)  # 첫 번째 쇼핑몰이 최저가
-                        shipping_fee = 0 if shop_price >= 30000 or i == 0 else 2500  # 3만원 이상 또는 첫 번째 쇼핑몰은 무료배송
-                        
-                        db.add(ProductShop(
-                            product_id=product.id,
-                            shop_id=shop.id,
-                            price=shop_price,
-                            shipping="무료배송" if shipping_fee == 0 else "유료배송",
-                            shipping_fee=shipping_fee,
-                            installment=f"{2+i}개월" if shop_price >= 20000 else None,
-                            is_free_shipping=(shipping_fee == 0),
-                            is_lowest_price=is_lowest,
-                            is_card_discount=(i % 2 == 1)  # 홀수 번째 쇼핑몰은 카드할인
-                        ))
-                    
-                    imported_count += 1
-                
-                db.commit()
-                total_imported += imported_count
-                
-                import_results.append({
-                    "category": category,
-                    "imported": imported_count,
-                    "file": csv_file
-                })
-                
-                print(f"✅ {category}: {imported_count}개 제품 import 완료")
-                
-            except Exception as file_error:
-                print(f"❌ {csv_file} 처리 실패: {file_error}")
-                import_results.append({
-                    "category": category,
-                    "error": str(file_error)
-                })
+        # 기존 크롤링 리뷰를 새 제품 ID에 다시 연결
+        link_stats = link_crawled_reviews(db)
         
         return {
             "success": True,
             "message": f"✅ 크롤링된 제품 데이터 import 완료!",
             "summary": {
                 "총_제품": total_imported,
-                "카테고리": len([r for r in import_results if "imported" in r])
+                "카테고리": len([r for r in import_results if "imported" in r]),
+                "리뷰_연결": link_stats["linked_reviews"]
             },
             "details": import_results
         }
@@ -2971,13 +2643,14 @@ def import_crawled_products(db: Session = Depends(get_db)):
 
 # ========== 진단 내역 API ==========
 @app.get("/api/medical/diagnoses/user/{user_id}")
-def get_user_medical_diagnoses(user_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def get_user_medical_diagnoses(user_id: int, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """사용자 진단 내역 조회"""
     try:
         from medical_crud import get_medical_records
         
         # 진료 기록을 가져와서 진단 내역으로 변환
-        medical_records = get_medical_records(db, user_id=user_id, skip=skip, limit=limit)
+        medical_records = get_medical_records(db, user_id=user_id, skip=skip, limit=limit, cursor=cursor)
+        set_next_cursor(response, medical_records)
         
         if not medical_records:
             raise HTTPException(status_code=404, detail=f"사용자 {user_id}의 진단 내역이 없습니다")
@@ -3007,6 +2680,8 @@ def get_user_medical_diagnoses(user_id: int, skip: int = 0, limit: int = 100, db
             "success": True,
             "data": formatted_diagnoses
         }
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except HTTPException:
         raise
     except Exception as e:
@@ -3099,12 +2774,13 @@ def save_recommendation_history(data: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"추천 내역 저장 실패: {str(e)}")
 
 @app.get("/api/recommendations/history/{user_id}")
-def get_user_recommendation_history(user_id: int, skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+def get_user_recommendation_history(user_id: int, response: Response, skip: int = 0, limit: int = 20, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """사용자의 추천 내역 조회"""
     try:
         from crud import get_recommendation_history
         
-        histories = get_recommendation_history(db, user_id, skip, limit)
+        histories = get_recommendation_history(db, user_id, skip, limit, cursor=cursor)
+        set_next_cursor(response, histories)
         
         # 응답 데이터 포맷팅
         formatted_histories = []
@@ -3133,6 +2809,8 @@ def get_user_recommendation_history(user_id: int, skip: int = 0, limit: int = 20
             "success": True,
             "data": formatted_histories
         }
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except Exception as e:
         print(f"❌ 추천 내역 조회 실패: {e}")
         raise HTTPException(status_code=500, detail=f"추천 내역 조회 실패: {str(e)}")
@@ -3156,7 +2834,7 @@ def delete_user_recommendation_history(history_id: int, db: Session = Depends(ge
         raise HTTPException(status_code=500, detail=f"추천 내역 삭제 실패: {str(e)}")
 
 @app.post("/api/medical/medical-records")
-async def create_medical_record(request: Request, db: Session = Depends(get_db)):
+async def create_medical_record(request: Request, db: AsyncSession = Depends(get_async_db)):
     """진료 기록 생성"""
     try:
         print(f"🔥 진료 기록 생성 API 호출됨")
@@ -3236,24 +2914,24 @@ async def create_medical_record(request: Request, db: Session = Depends(get_db))
             db.add(medical_record)
             print(f"✅ DB에 추가 성공")
             
-            db.commit()
+            await db.commit()
             print(f"✅ DB 커밋 성공")
             
-            db.refresh(medical_record)
+            await db.refresh(medical_record)
             print(f"✅ 객체 새로고침 성공: ID {medical_record.id}")
             
         except Exception as db_error:
             print(f"❌ DB 작업 중 상세 에러: {db_error}")
             print(f"❌ 에러 타입: {type(db_error)}")
-            db.rollback()
+            await db.rollback()
             raise db_error
         
         # 예약 상태를 'completed'로 업데이트
         from core.models.medical_models import Appointment
-        appointment = db.query(Appointment).filter(Appointment.id == data.get("appointment_id")).first()
+        appointment = await db.get(Appointment, data.get("appointment_id"))
         if appointment:
             appointment.status = 'completed'
-            db.commit()
+            await db.commit()
         
         print(f"✅ 진료 기록 생성 성공: {medical_record.id}")
         
@@ -3398,52 +3076,22 @@ def check_medical_record_by_appointment(appointment_id: int, db: Session = Depen
         raise HTTPException(status_code=500, detail="진료 기록 확인 중 오류가 발생했습니다")
 
 @app.get("/api/medical/doctors/{doctor_id}/patients")
-def get_doctor_patients(doctor_id: int, db: Session = Depends(get_db)):
-    """의사의 환자 목록 조회"""
+def get_doctor_patients(doctor_id: int, response: Response, limit: Optional[int] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+    """의사의 환자 목록 조회
+
+    limit/cursor가 없으면 기존처럼 전체 목록을 반환한다.
+    limit 또는 cursor를 주면 limit개씩 반환하고, 다음 페이지가 있으면 X-Next-Cursor 헤더로 커서를 내려준다.
+    """
     try:
-        from core.models.medical_models import Appointment, MedicalRecord
-        from core.models.db_models import User
-        from sqlalchemy import desc, func
-        
-        # 의사의 모든 예약에서 고유한 환자들을 찾음
-        # 서브쿼리: 각 환자의 최신 예약 ID 찾기
-        latest_appointments_subquery = (
-            db.query(
-                Appointment.user_id,
-                func.max(Appointment.id).label('latest_appointment_id')
-            )
-            .filter(Appointment.doctor_id == doctor_id)
-            .group_by(Appointment.user_id)
-            .subquery()
-        )
+        if limit is not None or cursor:
+            limit = max(1, min(limit or DEFAULT_PATIENT_PAGE_SIZE, MAX_PATIENT_PAGE_SIZE))
         
-        # 최신 예약 정보와 사용자 정보 조인
-        patients_query = (
-            db.query(
-                Appointment,
-                User,
-                MedicalRecord
-            )
-            .join(
-                latest_appointments_subquery,
-                Appointment.id == latest_appointments_subquery.c.latest_appointment_id
-            )
-            .join(User, Appointment.user_id == User.id)
-            .outerjoin(MedicalRecord, MedicalRecord.appointment_id == Appointment.id)
-            .order_by(desc(Appointment.appointment_date), desc(Appointment.appointment_time))
-        )
-        
-        patients = patients_query.all()
+        # 최신 예약, 완료된 진료 횟수, 최신 진료 기록을 한 번의 쿼리로 조회
+        patients = get_doctor_patient_roster(db, doctor_id, limit=limit, cursor=cursor)
+        set_next_cursor(response, patients)
         
         result = []
-        for appointment, user, medical_record in patients:
-            # 환자의 총 진료 횟수 계산 (완료된 예약만)
-            total_appointments = db.query(Appointment).filter(
-                Appointment.user_id == user.id,
-                Appointment.doctor_id == doctor_id,
-                Appointment.status == 'completed'  # 완료된 예약만 세기
-            ).count()
-            
+        for appointment, user, medical_record, total_appointments in patients:
             # 치료 상태 결정
             # 1. 최근 진료에서 다음 방문일이 없으면 완치 (치료 완료)
             # 2. 다음 방문일이 있으면 치료 중
@@ -3458,7 +3106,7 @@ def get_doctor_patients(doctor_id: int, db: Session = Depends(get_db)):
                 "phone": user.phone_number or "정보 없음",
                 "lastVisit": appointment.appointment_date.strftime("%Y-%m-%d"),
                 "diagnosis": medical_record.diagnosis if medical_record else "진료 기록 없음",
-                "totalVisits": total_appointments,
+                "totalVisits": int(total_appointments or 0),
                 "status": status,
                 "latestAppointmentId": appointment.id,
                 "hasDiagnosisRequest": appointment.diagnosis_request_id is not None,
@@ -3469,6 +3117,10 @@ def get_doctor_patients(doctor_id: int, db: Session = Depends(get_db)):
         print(f"🔍 의사 {doctor_id}의 환자 목록: {len(result)}명")
         return result
         
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ 환자 목록 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="환자 목록 조회 중 오류가 발생했습니다")
@@ -3539,7 +3191,7 @@ def complete_appointment(appointment_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="진료 완료 중 오류가 발생했습니다")
 
 @app.patch("/api/medical/appointments/{appointment_id}/cancel")
-async def cancel_appointment_with_reason(appointment_id: int, request: Request, db: Session = Depends(get_db)):
+async def cancel_appointment_with_reason(appointment_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """예약 취소 (의사 측)"""
     try:
         from core.models.medical_models import Appointment
@@ -3550,7 +3202,7 @@ async def cancel_appointment_with_reason(appointment_id: int, request: Request,
         
         print(f"🔄 예약 취소 요청: appointment_id={appointment_id}, reason={data.get('reason')}")
         
-        appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+        appointment = await db.get(Appointment, appointment_id)
         if not appointment:
             raise HTTPException(status_code=404, detail="예약을 찾을 수 없습니다")
         
@@ -3563,7 +3215,7 @@ async def cancel_appointment_with_reason(appointment_id: int, request: Request,
         appointment.cancelled_by = 'doctor'
         appointment.updated_at = datetime.now()
         
-        db.commit()
+        await db.commit()
         print(f"✅ 예약 취소 완료: appointment_id={appointment_id}, reason={appointment.cancellation_reason}")
         
         return {
@@ -3581,7 +3233,7 @@ async def cancel_appointment_with_reason(appointment_id: int, request: Request,
         raise
     except Exception as e:
         print(f"❌ 예약 취소 실패: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="예약 취소 중 오류가 발생했습니다")
 
 # ========== 알림 관리 API ==========
@@ -3846,9 +3498,16 @@ async def startup_event():
         print(f"❌ 시작 시 AI 모델 로딩 실패: {e}")
         print("⚠️ AI 분석 기능을 사용할 수 없습니다.")
 
+@app.on_event("shutdown")
+def shutdown_event():
+    """서버 종료 시 대기 중인 추천 내역 저장"""
+    from history_writer import history_writer
+    print(f"🛑 서버 종료 - 대기 중인 추천 내역 {history_writer.depth}건 저장 중...")
+    history_writer.stop()
+
 # ========== AI 피부 분석 내역 저장/조회 API ==========
 @app.post("/api/skin-analysis/save")
-async def save_skin_analysis_result(request: Request, db: Session = Depends(get_db)):
+async def save_skin_analysis_result(request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
     """AI 피부 분석 결과 저장"""
     try:
         data = await request.json()
@@ -3861,7 +3520,7 @@ async def save_skin_analysis_result(request: Request, db: Session = Depends(get_
                 raise HTTPException(status_code=400, detail=f"필수 필드가 누락되었습니다: {field}")
         
         # 데이터베이스에 저장
-        analysis = create_skin_analysis_result(
+        analysis = await create_skin_analysis_result_async(
             db=db,
             user_id=data['user_id'],
             image_url=data['image_url'],
@@ -3884,6 +3543,9 @@ async def save_skin_analysis_result(request: Request, db: Session = Depends(get_
         
         print(f"✅ AI 피부 분석 결과 저장 완료: ID {analysis.id}")
         
+        # 응답 후 사용자 프로필 벡터 갱신 (추천 개인화)
+        background_tasks.add_task(update_from_analysis, data['user_id'], data['skin_type'], data['concerns'])
+        
         return {
             "success": True,
             "data": {
@@ -3899,13 +3561,14 @@ async def save_skin_analysis_result(request: Request, db: Session = Depends(get_
         raise HTTPException(status_code=500, detail="AI 피부 분석 결과 저장 중 오류가 발생했습니다.")
 
 @app.get("/api/skin-analysis/history/{user_id}")
-def get_skin_analysis_history_api(user_id: int, skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+def get_skin_analysis_history_api(user_id: int, response: Response, skip: int = 0, limit: int = 20, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     """사용자의 AI 피부 분석 내역 조회"""
     try:
         print(f"📋 사용자 {user_id}의 AI 피부 분석 내역 조회 (skip={skip}, limit={limit})")
         
         # 데이터베이스에서 분석 내역 조회
-        analyses = get_user_skin_analysis_history(db, user_id, skip, limit)
+        analyses = get_user_skin_analysis_history(db, user_id, skip, limit, cursor=cursor)
+        set_next_cursor(response, analyses)
         
         # API 응답 형식으로 변환
         formatted_analyses = [format_analysis_for_api(analysis) for analysis in analyses]
@@ -3917,6 +3580,8 @@ def get_skin_analysis_history_api(user_id: int, skip: int = 0, limit: int = 20,
             "data": formatted_analyses
         }
         
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
     except Exception as e:
         print(f"❌ AI 피부 분석 내역 조회 실패: {e}")
         raise HTTPException(status_code=500, detail="AI 피부 분석 내역 조회 중 오류가 발생했습니다.")
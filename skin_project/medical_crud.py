@@ -2,11 +2,16 @@
 # 의료진/예약 시스템 CRUD 함수들
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
+from sqlalchemy.orm.attributes import get_history
+from sqlalchemy import and_, or_, select, func, case, desc, distinct, event, exists, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import threading
+import time as time_module
 from datetime import date, time
 from typing import List, Optional
 from core.models.medical_models import Hospital, Doctor, Appointment, MedicalRecord, DoctorReview, DoctorSchedule
 from core.models.db_models import User  # User 모델 추가
+from pagination import Page, paginate
 from medical_schemas import (
     HospitalCreate, HospitalUpdate,
     DoctorCreate, DoctorUpdate, DoctorSearchParams,
@@ -17,8 +22,8 @@ from medical_schemas import (
 )
 
 # ========== 병원 CRUD ==========
-def get_hospitals(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Hospital).offset(skip).limit(limit).all()
+def get_hospitals(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return paginate(db.query(Hospital), [Hospital.id], limit, cursor=cursor, skip=skip)
 
 def get_hospital(db: Session, hospital_id: int):
     return db.query(Hospital).filter(Hospital.id == hospital_id).first()
@@ -47,7 +52,7 @@ def delete_hospital(db: Session, hospital_id: int):
     return db_hospital
 
 # ========== 의사 CRUD ==========
-def get_doctors(db: Session, skip: int = 0, limit: int = 100, search_params: Optional[DoctorSearchParams] = None):
+def get_doctors(db: Session, skip: int = 0, limit: int = 100, search_params: Optional[DoctorSearchParams] = None, cursor: Optional[str] = None):
     query = db.query(Doctor)  # is_active 필터 임시 제거
     
     if search_params:
@@ -60,7 +65,7 @@ def get_doctors(db: Session, skip: int = 0, limit: int = 100, search_params: Opt
         if search_params.max_consultation_fee:
             query = query.filter(Doctor.consultation_fee <= search_params.max_consultation_fee)
     
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, [Doctor.id], limit, cursor=cursor, skip=skip)
 
 def get_doctor(db: Session, doctor_id: int):
     return db.query(Doctor).filter(Doctor.id == doctor_id).first()
@@ -82,10 +87,15 @@ def update_doctor(db: Session, doctor_id: int, doctor: DoctorUpdate):
     return db_doctor
 
 # ========== 예약 CRUD ==========
-def get_appointments(db: Session, skip: int = 0, limit: int = 100, search_params: Optional[AppointmentSearchParams] = None):
-    query = db.query(Appointment).options(
+def get_appointments(db: Session, skip: int = 0, limit: int = 100, search_params: Optional[AppointmentSearchParams] = None, cursor: Optional[str] = None):
+    """예약 목록 조회 (의사/병원/진료 기록/사용자를 한 번의 쿼리로 함께 로드)
+
+    users 테이블은 관계가 없으므로 조인해서 같이 조회하고 appointment.user로 붙인다.
+    """
+    query = db.query(Appointment, User).options(
         joinedload(Appointment.doctor).joinedload(Doctor.hospital),
-        joinedload(Appointment.hospital)
+        joinedload(Appointment.hospital),
+        joinedload(Appointment.medical_record)
     ).join(User, Appointment.user_id == User.id)
     
     if search_params:
@@ -102,13 +112,13 @@ def get_appointments(db: Session, skip: int = 0, limit: int = 100, search_params
         if search_params.date_to:
             query = query.filter(Appointment.appointment_date <= search_params.date_to)
     
-    appointments = query.order_by(Appointment.appointment_date.desc()).offset(skip).limit(limit).all()
+    rows = paginate(query, [Appointment.appointment_date, Appointment.id], limit,
+                    cursor=cursor, skip=skip, descending=True)
     
-    # User 정보를 수동으로 추가
-    for appointment in appointments:
-        user = db.query(User).filter(User.id == appointment.user_id).first()
-        if user:
-            appointment.user = user
+    appointments = Page(next_cursor=rows.next_cursor)
+    for appointment, user in rows:
+        appointment.user = user
+        appointments.append(appointment)
     
     return appointments
 
@@ -149,6 +159,27 @@ def create_appointment(db: Session, appointment: AppointmentCreate):
     db.refresh(db_appointment)
     return db_appointment
 
+async def create_appointment_async(db: AsyncSession, appointment: AppointmentCreate):
+    """예약 생성 (AsyncSession용)"""
+    # 중복 예약 체크
+    existing = await db.scalar(
+        select(Appointment.id).where(
+            Appointment.doctor_id == appointment.doctor_id,
+            Appointment.appointment_date == appointment.appointment_date,
+            Appointment.appointment_time == appointment.appointment_time,
+            Appointment.status != 'cancelled'
+        ).limit(1)
+    )
+    
+    if existing:
+        raise ValueError("해당 시간에 이미 예약이 있습니다.")
+    
+    db_appointment = Appointment(**appointment.dict())
+    db.add(db_appointment)
+    await db.commit()
+    await db.refresh(db_appointment)
+    return db_appointment
+
 def update_appointment(db: Session, appointment_id: int, appointment: AppointmentUpdate):
     db_appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
     if db_appointment:
@@ -168,9 +199,136 @@ def cancel_appointment(db: Session, appointment_id: int, cancellation_reason: st
         db.refresh(db_appointment)
     return db_appointment
 
+def get_doctor_patient_roster(db: Session, doctor_id: int, limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+    """의사의 환자 목록 (한 번의 쿼리)
+
+    환자별 최신 예약 + 완료된 진료 횟수(집계) + 최신 진료 기록(row_number)을 함께 조회한다.
+    최신 예약의 (날짜, 시간, id) 내림차순으로 정렬하고 cursor 다음부터 limit개 반환 (키셋 페이지네이션).
+    limit이 없으면 전체 환자를 반환한다.
+    반환: [(Appointment, User, MedicalRecord | None, 완료 횟수), ...]
+    """
+    # 환자별 최신 예약 ID + 완료된 예약 수
+    visits = (
+        db.query(
+            Appointment.user_id.label("user_id"),
+            func.max(Appointment.id).label("latest_appointment_id"),
+            func.sum(case((Appointment.status == 'completed', 1), else_=0)).label("completed_visits")
+        )
+        .filter(Appointment.doctor_id == doctor_id)
+        .group_by(Appointment.user_id)
+        .subquery()
+    )
+    
+    # 환자별 진료 기록 순위 (최신 기록이 1)
+    ranked_records = (
+        db.query(
+            MedicalRecord.id.label("record_id"),
+            Appointment.user_id.label("user_id"),
+            func.row_number().over(
+                partition_by=Appointment.user_id,
+                order_by=(desc(MedicalRecord.created_at), desc(MedicalRecord.id))
+            ).label("record_rank")
+        )
+        .join(Appointment, MedicalRecord.appointment_id == Appointment.id)
+        .filter(Appointment.doctor_id == doctor_id)
+        .subquery()
+    )
+    
+    query = (
+        db.query(Appointment, User, MedicalRecord, visits.c.completed_visits)
+        .join(visits, Appointment.id == visits.c.latest_appointment_id)
+        .join(User, Appointment.user_id == User.id)
+        .outerjoin(ranked_records, and_(
+            ranked_records.c.user_id == Appointment.user_id,
+            ranked_records.c.record_rank == 1
+        ))
+        .outerjoin(MedicalRecord, MedicalRecord.id == ranked_records.c.record_id)
+    )
+    
+    order_by = [Appointment.appointment_date, Appointment.appointment_time, Appointment.id]
+    if limit is None:
+        return Page(query.order_by(*[column.desc() for column in order_by]).all())
+    return paginate(query, order_by, limit, cursor=cursor, descending=True)
+
+# ========== 의사 대시보드 통계 ==========
+DASHBOARD_CACHE_TTL = 60  # 초 (예약 변경 시에는 바로 무효화)
+PENDING_STATUSES = ('scheduled', 'pending', 'confirmed')
+
+_dashboard_cache = {}  # doctor_id -> (계산 시각, 기준 날짜, 통계)
+_dashboard_generations = {}  # doctor_id -> 무효화 횟수 (전체 무효화는 None 키)
+_dashboard_lock = threading.Lock()
+
+def _dashboard_generation(doctor_id: int) -> tuple:
+    return _dashboard_generations.get(None, 0), _dashboard_generations.get(doctor_id, 0)
+
+def get_doctor_dashboard_stats(db: Session, doctor_id: int) -> dict:
+    """의사 대시보드 통계 (오늘/대기/완료 예약 수, 환자 수)
+
+    한 번의 집계 쿼리로 계산하고 의사별로 캐시한다 (예약이 바뀌면 커밋 시점에 무효화).
+    """
+    today = date.today()
+    with _dashboard_lock:
+        cached = _dashboard_cache.get(doctor_id)
+        generation = _dashboard_generation(doctor_id)
+    if cached and cached[1] == today and time_module.monotonic() - cached[0] < DASHBOARD_CACHE_TTL:
+        return cached[2]
+    
+    row = db.query(
+        func.count(Appointment.id).filter(Appointment.appointment_date == today).label("today_appointments"),
+        func.count(Appointment.id).filter(Appointment.status.in_(PENDING_STATUSES)).label("pending_appointments"),
+        func.count(Appointment.id).filter(Appointment.status == 'completed').label("completed_appointments"),
+        func.count(distinct(Appointment.user_id)).label("total_patients")
+    ).filter(Appointment.doctor_id == doctor_id).one()
+    
+    stats = {
+        "today_appointments": row.today_appointments or 0,
+        "pending_appointments": row.pending_appointments or 0,
+        "completed_appointments": row.completed_appointments or 0,
+        "total_patients": row.total_patients or 0
+    }
+    with _dashboard_lock:
+        # 집계하는 동안 예약이 바뀌어 무효화됐으면 이전 데이터로 계산한 통계는 캐시하지 않음
+        if _dashboard_generation(doctor_id) == generation:
+            _dashboard_cache[doctor_id] = (time_module.monotonic(), today, stats)
+    return stats
+
+def invalidate_dashboard_stats(doctor_id: Optional[int] = None):
+    """의사 대시보드 통계 캐시 무효화 (doctor_id가 없으면 전체)"""
+    with _dashboard_lock:
+        _dashboard_generations[doctor_id] = _dashboard_generations.get(doctor_id, 0) + 1
+        if doctor_id is None:
+            _dashboard_cache.clear()
+        else:
+            _dashboard_cache.pop(doctor_id, None)
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_doctors(session, flush_context):
+    """flush된 예약(생성/수정/삭제)의 의사 ID를 모아 둠 (AsyncSession도 내부 Session을 거침)
+
+    담당 의사가 바뀐 예약은 이전 의사 ID(get_history().deleted)도 함께 무효화한다.
+    """
+    doctor_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Appointment):
+            doctor_ids.add(obj.doctor_id)
+            doctor_ids.update(get_history(obj, "doctor_id").deleted)
+    doctor_ids.discard(None)
+    if doctor_ids:
+        session.info.setdefault("dashboard_doctor_ids", set()).update(doctor_ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_doctors(session):
+    for doctor_id in session.info.pop("dashboard_doctor_ids", ()):
+        invalidate_dashboard_stats(doctor_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_doctors(session):
+    session.info.pop("dashboard_doctor_ids", None)
+
 # ========== 진료 기록 CRUD ==========
-def get_medical_records(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    return db.query(MedicalRecord).join(Appointment).filter(Appointment.user_id == user_id).order_by(MedicalRecord.created_at.desc()).offset(skip).limit(limit).all()
+def get_medical_records(db: Session, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = db.query(MedicalRecord).join(Appointment).filter(Appointment.user_id == user_id)
+    return paginate(query, [MedicalRecord.created_at, MedicalRecord.id], limit, cursor=cursor, skip=skip, descending=True)
 
 def get_medical_record(db: Session, record_id: int):
     return db.query(MedicalRecord).filter(MedicalRecord.id == record_id).first()
@@ -192,8 +350,9 @@ def update_medical_record(db: Session, record_id: int, record: MedicalRecordUpda
     return db_record
 
 # ========== 의사 리뷰 CRUD ==========
-def get_doctor_reviews(db: Session, doctor_id: int, skip: int = 0, limit: int = 100):
-    return db.query(DoctorReview).filter(DoctorReview.doctor_id == doctor_id).order_by(DoctorReview.created_at.desc()).offset(skip).limit(limit).all()
+def get_doctor_reviews(db: Session, doctor_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = db.query(DoctorReview).filter(DoctorReview.doctor_id == doctor_id)
+    return paginate(query, [DoctorReview.created_at, DoctorReview.id], limit, cursor=cursor, skip=skip, descending=True)
 
 def create_doctor_review(db: Session, review: DoctorReviewCreate):
     # 이미 리뷰가 있는지 체크
@@ -203,30 +362,59 @@ def create_doctor_review(db: Session, review: DoctorReviewCreate):
     
     db_review = DoctorReview(**review.dict())
     db.add(db_review)
-    db.commit()
+    db.flush()
     
-    # 의사 평점 업데이트
-    update_doctor_rating(db, review.doctor_id)
+    # 의사 평점 업데이트 (리뷰 저장과 같은 트랜잭션)
+    apply_doctor_rating_delta(db, review.doctor_id, review.rating, 1)
+    db.commit()
     
     db.refresh(db_review)
     return db_review
 
+def _doctor_average(rating_sum, review_count):
+    # 정수 나눗셈 방지, 소수 둘째 자리 반올림 (DECIMAL(3, 2))
+    return case((review_count > 0, func.round(rating_sum * 1.0 / review_count, 2)), else_=0.0)
+
+def apply_doctor_rating_delta(db: Session, doctor_id: int, rating_delta: int, count_delta: int):
+    """의사 평점 합계/리뷰 수를 UPDATE 한 번으로 증분 반영 (커밋은 호출한 쪽에서)
+
+    아직 집계 전(rating_sum NULL)인 의사는 한 번 전체 집계한다.
+    """
+    new_count = Doctor.review_count + count_delta
+    new_sum = Doctor.rating_sum + rating_delta
+    result = db.execute(
+        update(Doctor)
+        .where(Doctor.id == doctor_id, Doctor.rating_sum.isnot(None))
+        .values(rating_sum=new_sum, review_count=new_count, rating=_doctor_average(new_sum, new_count))
+    )
+    if not result.rowcount:
+        reconcile_doctor_ratings(db, doctor_id)
+
+def reconcile_doctor_ratings(db: Session, doctor_id: Optional[int] = None) -> int:
+    """의사 평점 집계를 리뷰 테이블 기준으로 다시 계산 (커밋은 호출한 쪽에서), 바뀐 의사 수 반환"""
+    review_count = select(func.count(DoctorReview.id)).where(DoctorReview.doctor_id == Doctor.id).scalar_subquery()
+    rating_sum = select(func.coalesce(func.sum(DoctorReview.rating), 0)).where(DoctorReview.doctor_id == Doctor.id).scalar_subquery()
+    target = Doctor.id == doctor_id if doctor_id is not None else or_(
+        Doctor.rating_sum.isnot(None),
+        exists().where(DoctorReview.doctor_id == Doctor.id)
+    )
+    drifted = or_(
+        Doctor.rating_sum.is_(None),
+        Doctor.review_count.is_(None),
+        Doctor.review_count != review_count,
+        Doctor.rating_sum != rating_sum
+    )
+    result = db.execute(
+        update(Doctor)
+        .where(target, drifted)
+        .values(rating_sum=rating_sum, review_count=review_count, rating=_doctor_average(rating_sum, review_count))
+    )
+    return result.rowcount or 0
+
 def update_doctor_rating(db: Session, doctor_id: int):
-    """의사의 평점과 리뷰 수를 업데이트"""
-    reviews = db.query(DoctorReview).filter(DoctorReview.doctor_id == doctor_id).all()
-    
-    if reviews:
-        avg_rating = sum(review.rating for review in reviews) / len(reviews)
-        review_count = len(reviews)
-    else:
-        avg_rating = 0.0
-        review_count = 0
-    
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
-    if doctor:
-        doctor.rating = round(avg_rating, 2)
-        doctor.review_count = review_count
-        db.commit()
+    """의사의 평점과 리뷰 수를 리뷰 테이블 기준으로 다시 계산"""
+    reconcile_doctor_ratings(db, doctor_id)
+    db.commit()
 
 # ========== 의사 스케줄 CRUD ==========
 def get_doctor_schedule(db: Session, doctor_id: int, date: date):
@@ -1,7 +1,7 @@
 # medical_routes.py
 # 의료진/예약 시스템 API 라우터
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
@@ -17,45 +17,18 @@ from medical_schemas import (
     DoctorSchedule, DoctorScheduleCreate
 )
 import medical_crud as crud
+from pagination import InvalidCursorError, set_next_cursor
 
 router = APIRouter()
 
 # ========== 의사 대시보드 통계 API ==========
 @router.get("/doctors/{doctor_id}/dashboard-stats")
 def get_doctor_dashboard_stats(doctor_id: int, db: Session = Depends(get_db)):
-    """의사 대시보드용 통계 데이터 조회"""
+    """의사 대시보드용 통계 데이터 조회 (집계 쿼리 1회, 의사별 캐시)"""
     try:
-        # 오늘 날짜
-        today = date.today()
-        
-        # 해당 의사의 모든 예약 조회
-        all_appointments = crud.get_appointments(
-            db, 
-            search_params=AppointmentSearchParams(doctor_id=doctor_id),
-            limit=1000  # 충분히 큰 수로 모든 데이터 조회
-        )
-        
-        # 오늘 예약 수
-        today_appointments = [apt for apt in all_appointments if apt.appointment_date == today]
-        
-        # 대기 중 예약 수 (scheduled/pending/confirmed 상태)
-        pending_appointments = [apt for apt in all_appointments if apt.status in ['scheduled', 'pending', 'confirmed']]
-        
-        # 완료된 예약 수
-        completed_appointments = [apt for apt in all_appointments if apt.status == 'completed']
-        
-        # 총 환자 수 (고유 user_id 개수)
-        unique_patients = set(apt.user_id for apt in all_appointments)
-        total_patients = len(unique_patients)
-        
         return {
             "success": True,
-            "data": {
-                "today_appointments": len(today_appointments),
-                "pending_appointments": len(pending_appointments), 
-                "completed_appointments": len(completed_appointments),
-                "total_patients": total_patients
-            }
+            "data": crud.get_doctor_dashboard_stats(db, doctor_id)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"통계 조회 중 오류가 발생했습니다: {str(e)}")
@@ -63,12 +36,18 @@ def get_doctor_dashboard_stats(doctor_id: int, db: Session = Depends(get_db)):
 # ========== 병원 API ==========
 @router.get("/hospitals", response_model=List[Hospital])
 def get_hospitals(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """모든 병원 목록 조회"""
-    hospitals = crud.get_hospitals(db, skip=skip, limit=limit)
+    try:
+        hospitals = crud.get_hospitals(db, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    set_next_cursor(response, hospitals)
     return hospitals
 
 @router.get("/hospitals/{hospital_id}", response_model=Hospital)
@@ -107,8 +86,10 @@ def delete_hospital(hospital_id: int, db: Session = Depends(get_db)):
 # ========== 의사 API ==========
 @router.get("/doctors", response_model=List[Doctor])
 def get_doctors(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     hospital_id: Optional[int] = Query(None),
     specialization: Optional[str] = Query(None),
     min_rating: Optional[float] = Query(None),
@@ -122,7 +103,11 @@ def get_doctors(
         min_rating=min_rating,
         max_consultation_fee=max_consultation_fee
     )
-    doctors = crud.get_doctors(db, skip=skip, limit=limit, search_params=search_params)
+    try:
+        doctors = crud.get_doctors(db, skip=skip, limit=limit, cursor=cursor, search_params=search_params)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    set_next_cursor(response, doctors)
     return doctors
 
 @router.get("/doctors/{doctor_id}", response_model=Doctor)
@@ -153,8 +138,10 @@ def update_doctor(
 # ========== 예약 API ==========
 @router.get("/appointments", response_model=List[Appointment])
 def get_appointments(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     user_id: Optional[int] = Query(None),
     doctor_id: Optional[int] = Query(None),
     hospital_id: Optional[int] = Query(None),
@@ -172,7 +159,11 @@ def get_appointments(
         date_from=date_from,
         date_to=date_to
     )
-    appointments = crud.get_appointments(db, skip=skip, limit=limit, search_params=search_params)
+    try:
+        appointments = crud.get_appointments(db, skip=skip, limit=limit, cursor=cursor, search_params=search_params)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    set_next_cursor(response, appointments)
     return appointments
 
 @router.get("/appointments/{appointment_id}", response_model=Appointment)
@@ -281,12 +272,18 @@ async def cancel_appointment(
 @router.get("/medical-records", response_model=List[MedicalRecord])
 def get_medical_records(
     user_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """사용자의 진료 기록 조회"""
-    records = crud.get_medical_records(db, user_id=user_id, skip=skip, limit=limit)
+    try:
+        records = crud.get_medical_records(db, user_id=user_id, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    set_next_cursor(response, records)
     return records
 
 @router.get("/medical-records/{record_id}", response_model=MedicalRecord)
@@ -318,12 +315,18 @@ def update_medical_record(
 @router.get("/doctors/{doctor_id}/reviews", response_model=List[DoctorReview])
 def get_doctor_reviews(
     doctor_id: int,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """의사 리뷰 목록 조회"""
-    reviews = crud.get_doctor_reviews(db, doctor_id=doctor_id, skip=skip, limit=limit)
+    try:
+        reviews = crud.get_doctor_reviews(db, doctor_id=doctor_id, skip=skip, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="잘못된 커서입니다")
+    set_next_cursor(response, reviews)
     return reviews
 
 @router.post("/reviews", response_model=DoctorReview)
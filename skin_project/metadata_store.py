@@ -0,0 +1,193 @@
+"""
+리뷰 벡터 메타데이터 로컬 저장소
+
+Pinecone 질의에서 include_metadata=True를 쓰면 매치마다 리뷰 본문, 이미지, 링크가
+네트워크로 전달되지만 실제로는 최고 점수 매치만 사용한다.
+벡터 인덱스는 id/점수만 반환하고, 메타데이터는 이 저장소에서 한 번에 채운다.
+
+- 리뷰 컬럼(review, skin_type, star)은 리뷰별로,
+  제품 컬럼(product_name, link, image_url, price, category)은 제품별로 한 번만 저장한다 (columnar)
+- 리뷰 CSV만 읽어서 만들 수 있다 (임베딩 불필요)
+    python metadata_store.py --category cream
+"""
+import os
+import sys
+import argparse
+from typing import List, Dict, Optional, Iterable
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from product_index import DATA_DIR
+
+REVIEW_FIELDS = ("review", "skin_type", "star")
+PRODUCT_FIELDS = ("product_name", "category", "link", "image_url", "price")
+
+# 메타데이터 저장소를 쓸 때 Pinecone에 올리는 최소 메타데이터
+SLIM_METADATA_FIELDS = ("product_name",)
+
+_stores: Dict[str, Optional["MetadataStore"]] = {}
+
+
+def metadata_store_path(category: str) -> str:
+    return os.path.join(DATA_DIR, f"review_metadata_{category}.npz")
+
+
+def slim_metadata(metadata: Dict) -> Dict:
+    return {field: metadata.get(field, "") for field in SLIM_METADATA_FIELDS}
+
+
+class MetadataStore:
+    """벡터 id -> 메타데이터 columnar 저장소"""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.product_codes: List[int] = []
+        self.columns: Dict[str, List] = {field: [] for field in REVIEW_FIELDS}
+        self.products: List[Dict] = []
+        self._product_positions: Dict[tuple, int] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, records: Iterable[Dict]):
+        """{"id", "metadata"} 레코드 추가 (같은 id는 덮어씀)"""
+        for record in records:
+            meta = record["metadata"]
+            product = tuple(meta.get(field, "") for field in PRODUCT_FIELDS)
+            code = self._product_positions.get(product)
+            if code is None:
+                code = self._product_positions[product] = len(self.products)
+                self.products.append(dict(zip(PRODUCT_FIELDS, product)))
+
+            position = self._positions.get(record["id"])
+            if position is None:
+                self._positions[record["id"]] = len(self.ids)
+                self.ids.append(record["id"])
+                self.product_codes.append(code)
+                for field in REVIEW_FIELDS:
+                    self.columns[field].append(meta.get(field, ""))
+            else:
+                self.product_codes[position] = code
+                for field in REVIEW_FIELDS:
+                    self.columns[field][position] = meta.get(field, "")
+
+    # ========== 조회 ==========
+    def get_many(self, ids: List[str]) -> List[Optional[Dict]]:
+        """여러 id의 메타데이터를 한 번에 조회 (없는 id는 None)"""
+        results = []
+        for vector_id in ids:
+            position = self._positions.get(vector_id)
+            if position is None:
+                results.append(None)
+                continue
+            meta = dict(self.products[self.product_codes[position]])
+            for field in REVIEW_FIELDS:
+                meta[field] = self.columns[field][position]
+            results.append(meta)
+        return results
+
+    # ========== 저장/로드 ==========
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        arrays = {
+            "ids": np.array(self.ids, dtype=object),
+            "product_codes": np.array(self.product_codes, dtype=np.int32),
+            **{f"review_{field}": np.array(self.columns[field], dtype=object) for field in REVIEW_FIELDS},
+            **{f"product_{field}": np.array([p[field] for p in self.products], dtype=object) for field in PRODUCT_FIELDS}
+        }
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataStore":
+        data = np.load(path, allow_pickle=True)
+        store = cls()
+        store.ids = [str(vector_id) for vector_id in data["ids"]]
+        store._positions = {vector_id: i for i, vector_id in enumerate(store.ids)}
+        store.product_codes = data["product_codes"].tolist()
+        store.columns = {field: data[f"review_{field}"].tolist() for field in REVIEW_FIELDS}
+        product_columns = {field: data[f"product_{field}"].tolist() for field in PRODUCT_FIELDS}
+        store.products = [
+            {field: product_columns[field][i] for field in PRODUCT_FIELDS}
+            for i in range(len(product_columns["product_name"]))
+        ]
+        store._product_positions = {
+            tuple(p[field] for field in PRODUCT_FIELDS): i for i, p in enumerate(store.products)
+        }
+        return store
+
+
+def build_metadata_store(category: str, chunks: Optional[Iterable[List[Dict]]] = None) -> MetadataStore:
+    """리뷰 CSV(또는 주어진 레코드 스트림)로 메타데이터 저장소를 만들어 저장"""
+    from embedding_pipeline import iter_csv_reviews
+
+    store = MetadataStore()
+    for records in (chunks if chunks is not None else iter_csv_reviews(category)):
+        store.add(records)
+    store.save(metadata_store_path(category))
+    _stores.pop(category, None)
+    print(f"✅ {category}: 리뷰 {len(store)}개, 제품 {len(store.products)}개 메타데이터 저장")
+    return store
+
+
+def get_metadata_store(category: str) -> Optional[MetadataStore]:
+    """카테고리 메타데이터 저장소 (처음 사용할 때 로드, 파일이 없으면 None)"""
+    if category not in _stores:
+        path = metadata_store_path(category)
+        _stores[category] = MetadataStore.load(path) if os.path.exists(path) else None
+    return _stores[category]
+
+
+def query_matches(index, query_vector, category: str, top_k: int = 10, hydrate_top: Optional[int] = None) -> List[Dict]:
+    """점수 순 매치 목록 조회
+
+    메타데이터 저장소가 있으면 id/점수만 질의하고 상위 hydrate_top개(기본: 전체)의
+    메타데이터를 저장소에서 한 번에 채운다. 저장소가 없으면 기존처럼 메타데이터를 함께 받는다.
+    저장소에 없는 id(예전 업로더가 만든 {제품명}_{i}, 행 번호 ID 등)가 있으면
+    메타데이터를 포함해 다시 질의해서 채운다.
+    """
+    store = get_metadata_store(category)
+    result = index.query(vector=query_vector, top_k=top_k, include_metadata=store is None)
+    matches = sorted(result.get("matches", []), key=lambda x: x["score"], reverse=True)
+    matches = [
+        {"id": m["id"], "score": m["score"], "metadata": (m["metadata"] if store is None else None) or {}}
+        for m in matches
+    ]
+    if store is None:
+        return matches
+
+    targets = matches[:hydrate_top] if hydrate_top else matches
+    metas = store.get_many([match["id"] for match in targets])
+    missing = []
+    for match, meta in zip(targets, metas):
+        if meta is None:
+            missing.append(match)
+        else:
+            match["metadata"] = meta
+    if missing:
+        print(f"⚠️ 메타데이터 저장소에 없는 벡터 {len(missing)}개 ({category}) - 메타데이터 포함 재질의")
+        result = index.query(vector=query_vector, top_k=top_k, include_metadata=True)
+        fetched = {m["id"]: m["metadata"] or {} for m in result.get("matches", [])}
+        for match in missing:
+            match["metadata"] = fetched.get(match["id"], {})
+    return matches
+
+
+def main():
+    from embedding_pipeline import CATEGORIES
+
+    parser = argparse.ArgumentParser(description="리뷰 메타데이터 저장소 빌드")
+    parser.add_argument("--category", choices=list(CATEGORIES.keys()), default=None)
+    args = parser.parse_args()
+
+    categories = [args.category] if args.category else list(CATEGORIES.keys())
+    for category in categories:
+        build_metadata_store(category)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+crawled_reviews 중복 방지 해시 컬럼 마이그레이션
+
+1. content_hash 컬럼 추가
+2. 기존 리뷰의 해시 채우기 (id 순서로 배치 처리)
+3. 이미 들어간 중복 리뷰 삭제 (같은 출처/해시 중 가장 먼저 저장된 리뷰만 유지)
+4. (source, content_hash) 유니크 인덱스 생성
+
+    python migrate_crawled_review_hash.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text, update
+
+from database import engine, SessionLocal
+from core.models.db_models import CrawledReview
+from crud import crawled_review_hash
+
+BATCH_SIZE = 5000
+
+
+def add_hash_column():
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE crawled_reviews ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+    print("✅ content_hash 컬럼 확인 완료")
+
+
+def backfill_hashes() -> int:
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(CrawledReview.id, CrawledReview.source_product_name, CrawledReview.content)\
+                .filter(CrawledReview.id > last_id, CrawledReview.content_hash.is_(None))\
+                .order_by(CrawledReview.id)\
+                .limit(BATCH_SIZE)\
+                .all()
+            if not rows:
+                break
+            db.execute(update(CrawledReview), [
+                {"id": review_id, "content_hash": crawled_review_hash(product_name, content)}
+                for review_id, product_name, content in rows
+            ])
+            db.commit()
+            updated += len(rows)
+            last_id = rows[-1][0]
+            print(f"💾 해시 채우는 중: {updated}개")
+    finally:
+        db.close()
+    print(f"✅ 해시 채우기 완료: {updated}개")
+    return updated
+
+
+def delete_duplicates() -> int:
+    with engine.begin() as conn:
+        result = conn.execute(text("""
+            DELETE FROM crawled_reviews a
+            USING crawled_reviews b
+            WHERE a.source = b.source
+              AND a.content_hash = b.content_hash
+              AND a.id > b.id
+        """))
+    print(f"🗑️ 중복 리뷰 삭제: {result.rowcount}개")
+    return result.rowcount
+
+
+def create_unique_index():
+    for index in CrawledReview.__table__.indexes:
+        if index.name == "uq_crawled_reviews_source_hash":
+            index.create(bind=engine, checkfirst=True)
+    print("✅ (source, content_hash) 유니크 인덱스 생성 완료")
+
+
+if __name__ == "__main__":
+    print("🔧 crawled_reviews 해시 마이그레이션 시작...")
+    add_hash_column()
+    backfill_hashes()
+    delete_duplicates()
+    create_unique_index()
+    print("🚀 마이그레이션 완료")
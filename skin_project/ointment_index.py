@@ -0,0 +1,230 @@
+"""
+연고 로컬 인덱스 (식약처 e약은요 DrbEasyDrugInfoService)
+
+- XML 응답을 스트리밍 파서(iterparse)로 읽어 item 단위로 처리
+- 첫 페이지의 totalCount로 전체 페이지 수를 계산해 나머지 페이지를 동시에 요청
+- 연고 설명을 한 번에 배치 인코딩해 로컬 인덱스 파일(ointment_index.npz)로 저장
+- 추천 시에는 원격 ointment 인덱스 대신 메모리에 올린 로컬 인덱스에 질의
+
+빌드:
+    python ointment_index.py                          # MEDICINE_API_KEY 사용
+    python ointment_index.py --record fixtures/ointment  # 응답 XML을 파일로 기록
+    python ointment_index.py --fixture fixtures/ointment # 기록된 응답으로 오프라인 빌드
+"""
+import io
+import os
+import sys
+import math
+import glob
+import argparse
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, Tuple, BinaryIO
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vector_store import LocalVectorIndex
+from product_index import DATA_DIR
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.env"))
+
+API_URL = "http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList"
+DEFAULT_KEYWORD = "연고"
+DEFAULT_ROWS = 100
+DEFAULT_WORKERS = 4
+REQUEST_TIMEOUT = 10
+DEFAULT_SKIN_TYPE = "지성"
+
+# XML 태그(소문자) -> 필드명
+ITEM_FIELDS = {
+    "itemseq": "item_seq",
+    "itemname": "product_name",
+    "entpname": "company",
+    "efcyqesitm": "effect",
+    "usemethodqesitm": "how_to",
+    "itemimage": "image_url"
+}
+
+_ointment_index: Dict[str, Optional[LocalVectorIndex]] = {}
+
+PageSource = Callable[[int], BinaryIO]
+
+
+def ointment_index_path() -> str:
+    return os.path.join(DATA_DIR, "ointment_index.npz")
+
+
+# ========== 응답 소스 ==========
+def http_page_source(service_key: str, keyword: str = DEFAULT_KEYWORD, num_rows: int = DEFAULT_ROWS,
+                     record_dir: Optional[str] = None) -> PageSource:
+    """API에서 페이지를 가져오는 소스 (record_dir를 주면 응답을 fixture 파일로 기록)"""
+    import requests
+
+    session = requests.Session()
+
+    def fetch(page_no: int) -> BinaryIO:
+        params = {
+            "serviceKey": service_key,
+            "pageNo": str(page_no),
+            "numOfRows": str(num_rows),
+            "itemName": keyword,
+            "type": "xml"
+        }
+        res = session.get(API_URL, params=params, timeout=REQUEST_TIMEOUT, stream=record_dir is None)
+        res.raise_for_status()
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+            with open(os.path.join(record_dir, f"page_{page_no:04d}.xml"), "wb") as f:
+                f.write(res.content)
+            return io.BytesIO(res.content)
+        res.raw.decode_content = True
+        return res.raw
+
+    return fetch
+
+
+def fixture_page_source(fixture_dir: str, max_pages: Optional[int] = None) -> Tuple[PageSource, int]:
+    """--record로 기록한 응답 파일을 읽는 소스 (오프라인 테스트용)
+
+    (소스, 읽을 페이지 수) 반환. --max-pages나 다른 --rows로 기록했으면 totalCount로 계산한
+    페이지 수가 기록된 파일 수보다 많으므로, 읽을 페이지 수를 기록된 파일 수로 제한한다.
+    """
+    recorded = len(glob.glob(os.path.join(fixture_dir, "page_*.xml")))
+    if not recorded:
+        raise FileNotFoundError(f"기록된 응답이 없습니다: {fixture_dir}")
+
+    def fetch(page_no: int) -> BinaryIO:
+        return open(os.path.join(fixture_dir, f"page_{page_no:04d}.xml"), "rb")
+    return fetch, min(max_pages or recorded, recorded)
+
+
+# ========== 스트리밍 파싱 ==========
+def parse_page(stream: BinaryIO) -> Tuple[List[Dict], int]:
+    """응답 XML을 iterparse로 읽어 (연고 목록, totalCount) 반환"""
+    items: List[Dict] = []
+    total_count = 0
+    current: Optional[Dict] = None
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1].lower()
+            if event == "start":
+                if tag == "item":
+                    current = {}
+                continue
+
+            if tag == "item" and current is not None:
+                if current.get("product_name"):
+                    items.append(current)
+                current = None
+                elem.clear()
+            elif tag == "totalcount":
+                total_count = int((elem.text or "0").strip() or 0)
+            elif current is not None and tag in ITEM_FIELDS:
+                current[ITEM_FIELDS[tag]] = (elem.text or "").strip()
+    finally:
+        stream.close()
+    return items, total_count
+
+
+def fetch_all_ointments(source: PageSource, num_rows: int = DEFAULT_ROWS, workers: int = DEFAULT_WORKERS,
+                        max_pages: Optional[int] = None) -> List[Dict]:
+    """첫 페이지로 전체 페이지 수를 확인하고 나머지 페이지는 동시에 가져옴"""
+    items, total_count = parse_page(source(1))
+    pages = max(1, math.ceil(total_count / num_rows)) if total_count else 1
+    if max_pages:
+        pages = min(pages, max_pages)
+    print(f"📄 연고 검색 결과 {total_count}개, {pages}페이지")
+
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for page_items, _ in executor.map(lambda page: parse_page(source(page)), range(2, pages + 1)):
+                items.extend(page_items)
+    return items
+
+
+def to_records(items: List[Dict]) -> List[Dict]:
+    """API item -> 인덱스 레코드 (itemSeq를 id로 사용해 재빌드해도 id 유지)"""
+    records = []
+    seen = set()
+    for i, item in enumerate(items):
+        vector_id = f"ointment_{item.get('item_seq') or i}"
+        if vector_id in seen:
+            continue
+        seen.add(vector_id)
+        effect = item.get("effect", "")
+        records.append({
+            "id": vector_id,
+            "text": f"{DEFAULT_SKIN_TYPE} | {effect}",
+            "metadata": {
+                "product_name": item["product_name"],
+                "review": effect,
+                "effect": effect,
+                "how_to": item.get("how_to", ""),
+                "company": item.get("company", ""),
+                "skin_type": DEFAULT_SKIN_TYPE,
+                "category": "ointment",
+                "image_url": item.get("image_url", ""),
+                "link": ""
+            }
+        })
+    return records
+
+
+# ========== 빌드 / 조회 ==========
+def build_ointment_index(source: PageSource, num_rows: int = DEFAULT_ROWS, workers: int = DEFAULT_WORKERS,
+                         max_pages: Optional[int] = None) -> Tuple[LocalVectorIndex, List[Dict]]:
+    """연고 데이터를 모두 가져와 배치 인코딩 후 로컬 인덱스로 저장"""
+    from embedding_service import encode
+
+    records = to_records(fetch_all_ointments(source, num_rows, workers, max_pages))
+    index = LocalVectorIndex()
+    if records:
+        embeddings = encode([record["text"] for record in records], batched=False)
+        index.upsert([
+            {"id": record["id"], "values": embedding, "metadata": record["metadata"]}
+            for record, embedding in zip(records, embeddings)
+        ])
+    index.save(ointment_index_path())
+    _ointment_index.pop("ointment", None)
+    print(f"✅ 연고 {len(index)}개 로컬 인덱스 저장: {ointment_index_path()}")
+    return index, records
+
+
+def get_ointment_index() -> Optional[LocalVectorIndex]:
+    """로컬 연고 인덱스 (처음 사용할 때 로드, 파일이 없으면 None)"""
+    if "ointment" not in _ointment_index:
+        path = ointment_index_path()
+        _ointment_index["ointment"] = LocalVectorIndex.load(path) if os.path.exists(path) else None
+    return _ointment_index["ointment"]
+
+
+def search_ointments(query_vector, top_k: int = 5) -> Optional[List[Dict]]:
+    """로컬 연고 인덱스 검색 (인덱스가 빌드되지 않았으면 None)"""
+    index = get_ointment_index()
+    if index is None:
+        return None
+    return index.query(query_vector, top_k=top_k)["matches"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="연고 로컬 인덱스 빌드")
+    parser.add_argument("--keyword", default=DEFAULT_KEYWORD)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="페이지당 항목 수")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="동시에 요청할 페이지 수")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--record", default=None, help="API 응답을 기록할 fixture 디렉터리")
+    parser.add_argument("--fixture", default=None, help="기록된 응답으로 빌드 (네트워크 사용 안 함)")
+    args = parser.parse_args()
+
+    if args.fixture:
+        source, max_pages = fixture_page_source(args.fixture, args.max_pages)
+    else:
+        source = http_page_source(os.getenv("MEDICINE_API_KEY", ""), args.keyword, args.rows, record_dir=args.record)
+        max_pages = args.max_pages
+    build_ointment_index(source, num_rows=args.rows, workers=args.workers, max_pages=max_pages)
+
+
+if __name__ == "__main__":
+    main()
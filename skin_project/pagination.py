@@ -0,0 +1,220 @@
+"""
+키셋(커서) 페이지네이션
+
+offset(skip)은 앞 페이지의 행을 모두 읽고 버리므로 뒤 페이지일수록 느리고,
+조회 도중 행이 추가/삭제되면 중복되거나 빠지는 행이 생긴다.
+여기서는 (정렬 키..., id) 튜플로 "마지막으로 받은 행 다음"부터 조회하므로
+(정렬 키, id) 인덱스만 있으면 몇 번째 페이지든 첫 페이지와 비용이 같다.
+
+- 커서: 마지막 행의 정렬 키 값들을 JSON -> base64로 감싼 불투명 문자열
+- 목록 API는 다음 커서를 X-Next-Cursor 응답 헤더로 내려준다 (응답 본문 형식은 그대로)
+- cursor가 없으면 기존처럼 skip(offset)을 사용 (같은 순서로 정렬하므로 이어서 커서 사용 가능)
+
+- 정렬 키는 NULL이 될 수 없는 컬럼만 허용 (NULL 키가 커서에 들어가면 이후 비교가 모두 NULL이 되어 남은 행이 빠짐)
+
+기존 DB에 페이지네이션용 인덱스 추가 / 정렬 키 NULL 채우고 NOT NULL 설정:
+    python pagination.py --create-indexes
+    python pagination.py --backfill-sort-keys
+"""
+import os
+import sys
+import json
+import base64
+import argparse
+from decimal import Decimal
+from datetime import date, datetime, time
+from bisect import bisect_right
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.engine import Row
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class Page(list):
+    """조회 결과 목록 + 다음 페이지 커서 (마지막 페이지면 None)"""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def _to_json(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _from_json(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is time:
+        return time.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([_to_json(value) for value in values], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_values(cursor: str, count: int) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError("정렬 키 개수가 다릅니다")
+    return values
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> tuple:
+    """커서 -> 정렬 키 값 튜플 (컬럼 타입으로 복원)"""
+    try:
+        values = _decode_values(cursor, len(columns))
+        return tuple(_from_json(value, column) for value, column in zip(values, columns))
+    except Exception as e:
+        raise InvalidCursorError(f"잘못된 커서입니다: {e}")
+
+
+def _sort_values(row, columns: Sequence) -> tuple:
+    # 여러 엔티티를 함께 조회한 경우 첫 번째 엔티티가 정렬 기준
+    entity = row[0] if isinstance(row, (Row, tuple)) else row
+    return tuple(getattr(entity, column.key) for column in columns)
+
+
+def paginate(query, order_by: Sequence, limit: int, cursor: Optional[str] = None, skip: int = 0,
+             descending: bool = False) -> Page:
+    """(정렬 키..., id) 기준 키셋 페이지네이션
+
+    order_by: 정렬 컬럼 목록 (마지막은 고유한 id 컬럼, nullable=False 컬럼만 사용)
+    cursor가 있으면 그 다음 행부터, 없으면 skip(offset)부터 limit개를 조회한다.
+    """
+    columns = list(order_by)
+    nullable = [str(column) for column in columns if getattr(column, "nullable", False)]
+    if nullable:
+        raise ValueError(f"NULL이 될 수 있는 컬럼은 페이지네이션 정렬 키로 쓸 수 없습니다: {', '.join(nullable)}")
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if not cursor and skip:
+        query = query.offset(skip)
+
+    # 다음 페이지 존재 여부 확인용으로 1개 더 조회
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    return Page(rows, encode_cursor(_sort_values(rows[-1], columns)))
+
+
+def paginate_sequence(items: Sequence, key: Callable, limit: int, cursor: Optional[str] = None,
+                      skip: int = 0) -> Page:
+    """이미 key 오름차순으로 정렬된 목록(검색 결과 등)을 같은 커서 형식으로 페이지네이션
+
+    key(item)는 JSON으로 표현 가능한 값(숫자/문자열)의 튜플이어야 한다.
+    """
+    if not items:
+        return Page()
+    start = skip
+    if cursor:
+        try:
+            after = tuple(_decode_values(cursor, len(key(items[0]))))
+            start = bisect_right([key(item) for item in items], after)
+        except Exception as e:
+            raise InvalidCursorError(f"잘못된 커서입니다: {e}")
+
+    rows = items[start:start + limit]
+    if start + limit >= len(items):
+        return Page(rows)
+    return Page(rows, encode_cursor(key(rows[-1])))
+
+
+def set_next_cursor(response, page) -> None:
+    """다음 페이지 커서를 응답 헤더에 설정"""
+    next_cursor = getattr(page, "next_cursor", None)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+# ========== 인덱스 ==========
+def pagination_indexes() -> List:
+    """목록 API 정렬 키에 맞춘 (필터, 정렬 키, id) 복합 인덱스"""
+    from core.models.db_models import Product, ProductReview, RecommendationHistory, SkinAnalysisResult
+    from core.models.medical_models import Appointment
+
+    return [
+        index
+        for model in (Product, ProductReview, RecommendationHistory, SkinAnalysisResult, Appointment)
+        for index in model.__table__.indexes
+        if index.name and index.name.endswith("_page")
+    ]
+
+
+def sort_key_columns() -> List:
+    """목록 API 정렬 키 중 기존 DB에서 NULL을 허용하던 컬럼 (모델에서는 nullable=False)"""
+    from core.models.db_models import RecommendationHistory
+    from core.models.medical_models import MedicalRecord, DoctorReview
+
+    return [MedicalRecord.created_at, DoctorReview.created_at, RecommendationHistory.created_at]
+
+
+def backfill_sort_keys(engine=None) -> int:
+    """기존 DB의 NULL 정렬 키를 채우고 NOT NULL 제약 추가 (채운 행 수 반환)
+
+    PostgreSQL 내림차순 정렬에서 NULL은 맨 앞에 오므로, 현재 시각으로 채워 목록 순서를 유지한다.
+    """
+    if engine is None:
+        from database import engine
+    filled = 0
+    with engine.begin() as conn:
+        for column in sort_key_columns():
+            table, name = column.class_.__tablename__, column.key
+            result = conn.execute(text(f"UPDATE {table} SET {name} = CURRENT_TIMESTAMP WHERE {name} IS NULL"))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {name} SET NOT NULL"))
+            filled += result.rowcount
+            print(f"✅ {table}.{name}: NULL {result.rowcount}개 채움, NOT NULL 설정")
+    return filled
+
+
+def create_pagination_indexes(engine=None) -> int:
+    """기존 DB에 페이지네이션 인덱스 추가 (이미 있으면 건너뜀)"""
+    if engine is None:
+        from database import engine
+    created = 0
+    for index in pagination_indexes():
+        index.create(bind=engine, checkfirst=True)
+        created += 1
+        print(f"✅ 인덱스 확인/생성: {index.name}")
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="키셋 페이지네이션 인덱스 관리")
+    parser.add_argument("--create-indexes", action="store_true", help="페이지네이션용 복합 인덱스 생성")
+    parser.add_argument("--backfill-sort-keys", action="store_true", help="정렬 키 NULL 채우고 NOT NULL 설정")
+    args = parser.parse_args()
+    if args.backfill_sort_keys:
+        backfill_sort_keys()
+    if args.create_indexes:
+        create_pagination_indexes()
+    if not (args.create_indexes or args.backfill_sort_keys):
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    main()
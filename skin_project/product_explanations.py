@@ -0,0 +1,211 @@
+"""
+제품별 추천 이유 캐시
+
+인기 제품은 요청마다 같은 리뷰로 같은 추천 이유를 GPT로 다시 만들게 되므로,
+제품 인덱스의 제품(및 피부타입별 centroid)마다 공통 이유 + 피부 고민별 이유를
+오프라인에서 한 번에 생성해 product_explanations 테이블에 저장한다.
+추천 시에는 테이블에서 이유를 조회하고, GPT는 개인화된 부분에만 사용한다.
+
+생성:
+    python product_explanations.py                  # 전체 카테고리
+    python product_explanations.py --category cream --only-missing
+"""
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.models.db_models import ProductExplanation
+from product_index import normalize_skin_type
+from profile_recommendations import CONCERNS
+from prompt_builder import compact_review
+
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.env"))
+
+COMMON_KEY = "공통"
+DEFAULT_WORKERS = 4
+
+
+# ========== 조회 ==========
+def get_cached_reasons(product_names: List[str], skin_type: str, concerns: List[str], db=None) -> Dict[str, str]:
+    """제품명 -> 캐시된 추천 이유 (한 번의 쿼리로 조회)
+
+    우선순위: 피부타입+고민 > 고민 > 피부타입 공통 > 전체 공통
+    """
+    names = [name for name in product_names if name]
+    if not names:
+        return {}
+
+    standard = normalize_skin_type(skin_type)
+    concern_list = [concern for concern in concerns if concern]
+    priority = (
+        [(standard, concern) for concern in concern_list if standard]
+        + [("", concern) for concern in concern_list]
+        + ([(standard, "")] if standard else [])
+        + [("", "")]
+    )
+
+    own_session = db is None
+    if own_session:
+        from database import SessionLocal
+        db = SessionLocal()
+    try:
+        rows = db.query(ProductExplanation).filter(
+            ProductExplanation.product_name.in_(names),
+            ProductExplanation.skin_type.in_({standard, ""}),
+            ProductExplanation.concern.in_(set(concern_list) | {""})
+        ).all()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 추천 이유 캐시 조회 실패: {e}")
+        return {}
+    finally:
+        if own_session:
+            db.close()
+
+    found: Dict[Tuple[str, str, str], str] = {
+        (row.product_name, row.skin_type, row.concern): row.reason for row in rows
+    }
+    reasons = {}
+    for name in names:
+        for skin, concern in priority:
+            reason = found.get((name, skin, concern))
+            if reason:
+                reasons[name] = reason
+                break
+    return reasons
+
+
+# ========== 오프라인 생성 ==========
+def build_explanation_prompt(product_name: str, category: str, review: str, skin_type: str) -> str:
+    return (
+        f"제품: {product_name} ({category})\n"
+        f"대표 리뷰: {compact_review(review)}\n"
+        f"대상 피부 타입: {skin_type or '전체'}\n"
+        "리뷰를 바탕으로 이 제품의 추천 이유를 한 문장씩 작성해줘.\n"
+        f"첫 줄은 '{COMMON_KEY}: 이유', 다음 줄부터 아래 피부 고민마다 '고민: 이유' 형식으로 작성해.\n"
+        f"피부 고민: {', '.join(CONCERNS)}\n"
+        "이모지, 말투 없이 전문가처럼."
+    )
+
+
+def parse_explanations(text: str) -> Dict[str, str]:
+    """"공통: ...", "여드름: ..." 줄을 {concern: reason}으로 변환 (공통은 "")"""
+    reasons = {}
+    for line in text.split("\n"):
+        line = re.sub(r"^[\s\-*\d.)]+", "", line).strip()
+        if ":" not in line:
+            continue
+        key, reason = (part.strip() for part in line.split(":", 1))
+        if not reason:
+            continue
+        if key == COMMON_KEY:
+            reasons[""] = reason
+        elif key in CONCERNS:
+            reasons[key] = reason
+    return reasons
+
+
+def generate_explanations(meta: Dict, category_label: str) -> Dict[str, str]:
+    from llm_client import llm_client
+
+    prompt = build_explanation_prompt(
+        meta.get("product_name", ""), category_label, meta.get("review", ""), meta.get("skin_type", "")
+    )
+    response = llm_client.chat(
+        messages=[{"role": "user", "content": prompt}],
+        tag="explanation_batch",
+        temperature=0.3,
+        max_tokens=600
+    )
+    return parse_explanations(response.choices[0].message.content.strip())
+
+
+def refresh_product_explanations(categories: Optional[List[str]] = None, workers: int = DEFAULT_WORKERS,
+                                 only_missing: bool = False) -> Dict:
+    """제품 인덱스의 모든 (제품, 피부타입) 항목에 대해 추천 이유를 생성해 저장"""
+    from database import SessionLocal, engine
+    from embedding_pipeline import CATEGORIES
+    from product_index import get_product_index
+
+    ProductExplanation.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        existing = {
+            (row.product_name, row.skin_type, row.concern): row
+            for row in db.query(ProductExplanation).all()
+        }
+        existing_targets = {(name, skin) for name, skin, _ in existing}
+
+        targets = []
+        for category in (categories or list(CATEGORIES.keys())):
+            index = get_product_index(category)
+            if index is None:
+                print(f"⚠️ {category} 제품 인덱스가 없습니다. product_index.py를 먼저 실행하세요.")
+                continue
+            for meta in index.metadata:
+                if only_missing and (meta.get("product_name", ""), meta.get("skin_type", "")) in existing_targets:
+                    continue
+                targets.append((meta, CATEGORIES[category]))
+        print(f"🔧 추천 이유 생성 시작: {len(targets)}개 (workers={workers})")
+
+        stats = {"total": len(targets), "saved": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(generate_explanations, meta, label): (meta, label)
+                for meta, label in targets
+            }
+            for future in as_completed(futures):
+                meta, label = futures[future]
+                try:
+                    reasons = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"⚠️ {meta.get('product_name')} 추천 이유 생성 실패: {e}")
+                    continue
+
+                product_name, skin_type = meta.get("product_name", ""), meta.get("skin_type", "")
+                for concern, reason in reasons.items():
+                    key = (product_name, skin_type, concern)
+                    row = existing.get(key)
+                    if row is None:
+                        row = ProductExplanation(product_name=product_name, category=label,
+                                                 skin_type=skin_type, concern=concern, reason=reason)
+                        db.add(row)
+                        existing[key] = row
+                    else:
+                        row.reason = reason
+                stats["saved"] += 1
+                if stats["saved"] % 20 == 0:
+                    db.commit()
+                    print(f"  - {stats['saved']}/{stats['total']} 저장")
+
+        db.commit()
+        print(f"✅ 추천 이유 생성 완료: 저장 {stats['saved']}개, 실패 {stats['failed']}개")
+        return stats
+    finally:
+        db.close()
+
+
+def main():
+    from embedding_pipeline import CATEGORIES
+
+    parser = argparse.ArgumentParser(description="제품별 추천 이유 캐시 생성")
+    parser.add_argument("--category", choices=list(CATEGORIES.keys()), default=None)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--only-missing", action="store_true", help="이유가 없는 항목만 생성")
+    args = parser.parse_args()
+
+    categories = [args.category] if args.category else None
+    refresh_product_explanations(categories, workers=args.workers, only_missing=args.only_missing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+제품 수준 centroid 인덱스
+
+오프라인 빌드:
+    리뷰 임베딩을 제품별로 평균(centroid)내어 작은 제품 인덱스로 저장한다.
+    리뷰 수가 충분하면 피부타입별 centroid도 함께 저장한다.
+    python product_index.py                 # 전체 카테고리
+    python product_index.py --category cream
+
+추천 시에는 요청마다 리뷰를 모아 그룹핑하지 않고, 이 인덱스에 한 번 질의해서
+순위가 매겨진 제품 목록을 바로 얻는다.
+"""
+import os
+import re
+import sys
+import argparse
+from typing import List, Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vector_store import LocalVectorIndex
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "crawler", "data")
+
+# 제품 인덱스에서 사용하는 표준 피부타입
+SKIN_TYPES = ["건성", "지성", "복합성", "민감성", "중성"]
+
+MIN_REVIEWS_PER_SKIN_TYPE = 3
+
+_product_indexes: Dict[str, Optional[LocalVectorIndex]] = {}
+
+
+def product_index_path(category: str) -> str:
+    return os.path.join(DATA_DIR, f"product_index_{category}.npz")
+
+
+def review_index_path(category: str) -> str:
+    return os.path.join(DATA_DIR, f"review_index_{category}.npz")
+
+
+def normalize_skin_type(skin_type: Optional[str]) -> str:
+    """"복합성(정상)" -> "복합성" 처럼 표준 피부타입으로 변환 (해당 없으면 빈 문자열)"""
+    if not skin_type:
+        return ""
+    for standard in SKIN_TYPES:
+        if standard in skin_type:
+            return standard
+    return ""
+
+
+def parse_skin_types(value: Optional[str]) -> List[str]:
+    """"['지성', '웜톤', '모공']" 형태의 문자열에서 표준 피부타입만 추출"""
+    if not value:
+        return []
+    tokens = re.findall(r"[가-힣]+", str(value))
+    return [token for token in tokens if token in SKIN_TYPES]
+
+
+# ========== 오프라인 빌드 ==========
+def aggregate_centroids(review_index: LocalVectorIndex, category: str, with_skin_types: bool = True,
+                        min_reviews_per_skin_type: int = MIN_REVIEWS_PER_SKIN_TYPE) -> LocalVectorIndex:
+    """리뷰 인덱스를 제품별 centroid 인덱스로 집계"""
+    matrix = review_index.matrix
+    groups: Dict[str, List[int]] = {}
+    for position, meta in enumerate(review_index.metadata):
+        groups.setdefault(meta.get("product_name", ""), []).append(position)
+
+    product_index = LocalVectorIndex(dimension=matrix.shape[1])
+    vectors = []
+    for product_name, positions in groups.items():
+        if not product_name:
+            continue
+        rows = matrix[positions]
+        centroid = rows.mean(axis=0)
+
+        # centroid와 가장 가까운 리뷰를 대표 리뷰로 사용
+        representative = positions[int(np.argmax(rows @ centroid))]
+        first = review_index.metadata[positions[0]]
+        stars = [float(review_index.metadata[p].get("star") or 0) for p in positions]
+        base_meta = {
+            "product_name": product_name,
+            "category": category,
+            "link": first.get("link", ""),
+            "image_url": first.get("image_url", ""),
+            "price": first.get("price", ""),
+            "review": review_index.metadata[representative].get("review", ""),
+            "review_count": len(positions),
+            "avg_star": round(sum(stars) / len(stars), 2) if stars else 0.0,
+            "skin_type": ""
+        }
+        vectors.append({"id": product_name, "values": centroid, "metadata": base_meta})
+
+        if not with_skin_types:
+            continue
+
+        by_skin_type: Dict[str, List[int]] = {}
+        for p in positions:
+            for skin_type in parse_skin_types(review_index.metadata[p].get("skin_type")):
+                by_skin_type.setdefault(skin_type, []).append(p)
+
+        for skin_type, skin_positions in by_skin_type.items():
+            if len(skin_positions) < min_reviews_per_skin_type:
+                continue
+            vectors.append({
+                "id": f"{product_name}::{skin_type}",
+                "values": matrix[skin_positions].mean(axis=0),
+                "metadata": {**base_meta, "skin_type": skin_type, "review_count": len(skin_positions)}
+            })
+
+    product_index.upsert(vectors)
+    return product_index
+
+
+def build_product_index(category: str, workers: Optional[int] = None, with_skin_types: bool = True) -> LocalVectorIndex:
+    """리뷰 CSV를 임베딩해 리뷰 인덱스와 제품 centroid 인덱스를 만들어 저장"""
+    from embedding_pipeline import iter_csv_reviews, run_pipeline
+
+    print(f"🔧 {category} 제품 인덱스 빌드 시작")
+    review_index = LocalVectorIndex()
+    run_pipeline(iter_csv_reviews(category), review_index, workers=workers)
+    review_index.save(review_index_path(category))
+
+    product_index = aggregate_centroids(review_index, category, with_skin_types=with_skin_types)
+    product_index.save(product_index_path(category))
+    _product_indexes.pop(category, None)
+
+    # 같은 리뷰 인덱스로 키워드/태그 역색인도 함께 빌드
+    from review_search import build_review_search_index
+    build_review_search_index(category, review_index)
+
+    product_count = len(product_index.filter_mask({"skin_type": ""}).nonzero()[0])
+    print(f"✅ {category}: 리뷰 {len(review_index)}개 -> 제품 {product_count}개 (centroid {len(product_index)}개)")
+    return product_index
+
+
+# ========== 조회 ==========
+def get_product_index(category: str) -> Optional[LocalVectorIndex]:
+    """카테고리 제품 인덱스 (처음 사용할 때 로드, 파일이 없으면 None)"""
+    if category not in _product_indexes:
+        path = product_index_path(category)
+        _product_indexes[category] = LocalVectorIndex.load(path) if os.path.exists(path) else None
+    return _product_indexes[category]
+
+
+def product_index_available(category: str) -> bool:
+    return get_product_index(category) is not None
+
+
+def search_products(query_vector, category: str, skin_type: Optional[str] = None, top_k: int = 5) -> Optional[List[Dict]]:
+    """제품 인덱스에서 순위가 매겨진 제품 목록 조회
+
+    피부타입별 centroid가 있으면 그것을 우선 사용하고, top_k에 못 미치는 자리는
+    전체 centroid 결과(이미 나온 제품 제외)로 채운다.
+    제품 인덱스가 빌드되지 않았으면 None을 반환한다.
+    """
+    index = get_product_index(category)
+    if index is None:
+        return None
+
+    matches = []
+    standard = normalize_skin_type(skin_type)
+    if standard:
+        matches = index.query(query_vector, top_k=top_k, filter={"skin_type": standard})["matches"]
+        if len(matches) >= top_k:
+            return matches
+
+    # 이미 나온 제품을 건너뛸 수 있도록 부족한 수만큼 더 조회
+    general = index.query(query_vector, top_k=top_k + len(matches), filter={"skin_type": ""})["matches"]
+    seen = {match["metadata"].get("product_name") for match in matches}
+    for match in general:
+        if len(matches) >= top_k:
+            break
+        if match["metadata"].get("product_name") not in seen:
+            matches.append(match)
+    return matches
+
+
+def main():
+    from embedding_pipeline import CATEGORIES
+
+    parser = argparse.ArgumentParser(description="제품 centroid 인덱스 빌드")
+    parser.add_argument("--category", choices=list(CATEGORIES.keys()), default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-skin-types", action="store_true", help="피부타입별 centroid 생략")
+    args = parser.parse_args()
+
+    categories = [args.category] if args.category else list(CATEGORIES.keys())
+    for category in categories:
+        build_product_index(category, workers=args.workers, with_skin_types=not args.no_skin_types)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+크롤링 리뷰 -> 제품 매칭
+
+크롤링 리뷰에는 원본 사이트 제품명(source_product_name)만 있어서 제품 페이지마다
+ILIKE '%제품명%'으로 crawled_reviews 전체를 스캔했다.
+import 시점에 리뷰를 Product에 매칭해 crawled_reviews.product_id를 채워 두고
+조회는 인덱스를 타는 product_id 동등 비교로 한다.
+
+제품명 정리는 import_crawled_products와 같은 규칙(clean_product_name)을 사용한다.
+    1. 브랜드명 제거  2. 괄호 이후 제거  3. [..기획..] 태그 제거
+
+기존 리뷰 매칭(백필):
+    python product_matching.py
+"""
+import os
+import re
+import sys
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.models.db_models import Product, CrawledReview
+
+_NON_WORD = re.compile(r"[\s\W_]+")
+
+
+def clean_product_name(full_name: str, brand: str) -> str:
+    """크롤링 제품명 정리 (브랜드명, 괄호, 기획 태그 제거)"""
+    # 제품명에서 브랜드명이 포함되어 있으면 제거
+    if brand and brand.lower() in full_name.lower():
+        name = full_name.replace(brand, '').strip()
+        # 앞뒤 콤마나 공백 제거
+        name = re.sub(r'^[,\s]+|[,\s]+$', '', name)
+    else:
+        name = full_name
+
+    # 너무 긴 이름 줄이기 (괄호 부분 제거)
+    if '(' in name:
+        name = name.split('(')[0].strip()
+    if '[' in name and ']' in name:
+        # [기획] 같은 부분만 제거하고 나머지는 유지
+        name = re.sub(r'\[[^\]]*기획[^\]]*\]', '', name).strip()
+    return name
+
+
+def match_key(text: Optional[str]) -> str:
+    """매칭용 키 (소문자, 공백/기호 제거)"""
+    return _NON_WORD.sub("", (text or "").lower())
+
+
+class ProductMatcher:
+    """제품 목록으로 만든 이름 -> 제품 ID 매처 (원본 제품명별 결과 캐시)"""
+
+    def __init__(self, products: List[Tuple[int, str, str]]):
+        self.by_brand: Dict[str, Dict[str, int]] = {}
+        self.by_name: Dict[str, Optional[int]] = {}
+        self.brand_names: Dict[str, str] = {}
+        for product_id, name, brand in products:
+            brand_key = match_key(brand)
+            name_key = match_key(name)
+            if not name_key:
+                continue
+            self.brand_names.setdefault(brand_key, brand)
+            self.by_brand.setdefault(brand_key, {}).setdefault(name_key, product_id)
+            # 브랜드 없이 이름만으로는 유일할 때만 매칭
+            self.by_name[name_key] = None if name_key in self.by_name else product_id
+        self._cache: Dict[str, Optional[int]] = {}
+
+    @classmethod
+    def from_db(cls, db: Session) -> "ProductMatcher":
+        return cls(db.query(Product.id, Product.name, Product.brand).all())
+
+    def __len__(self):
+        return sum(len(names) for names in self.by_brand.values())
+
+    def _resolve(self, source_name: str) -> Optional[int]:
+        source_key = match_key(source_name)
+        if not source_key:
+            return None
+
+        # 1. 원본 제품명에 포함된 브랜드로 정리한 이름이 같은 제품
+        brands = [brand_key for brand_key in self.by_brand if brand_key and brand_key in source_key]
+        for brand_key in sorted(brands, key=len, reverse=True):
+            name_key = match_key(clean_product_name(source_name, self.brand_names[brand_key]))
+            product_id = self.by_brand[brand_key].get(name_key)
+            if product_id is not None:
+                return product_id
+
+        # 2. 브랜드를 못 찾았으면 정리한 이름이 유일하게 같은 제품
+        product_id = self.by_name.get(match_key(clean_product_name(source_name, "")))
+        if product_id is not None:
+            return product_id
+
+        # 3. 같은 브랜드 안에서 제품명이 원본 제품명에 포함된 제품 (가장 긴 이름)
+        for brand_key in sorted(brands, key=len, reverse=True):
+            contained = [name_key for name_key in self.by_brand[brand_key] if name_key in source_key]
+            if contained:
+                return self.by_brand[brand_key][max(contained, key=len)]
+        return None
+
+    def resolve(self, source_name: Optional[str]) -> Optional[int]:
+        if not source_name:
+            return None
+        if source_name not in self._cache:
+            self._cache[source_name] = self._resolve(source_name)
+        return self._cache[source_name]
+
+
+def link_crawled_reviews(db: Session, relink: bool = False) -> Dict[str, int]:
+    """product_id가 없는 크롤링 리뷰를 제품에 매칭 (relink면 전체 다시 매칭)
+
+    원본 제품명 단위로 한 번씩만 매칭하고 UPDATE도 제품명 단위로 실행한다.
+    """
+    matcher = ProductMatcher.from_db(db)
+    query = db.query(CrawledReview.source_product_name).distinct()
+    if not relink:
+        query = query.filter(CrawledReview.product_id.is_(None))
+    source_names = [name for (name,) in query.all()]
+
+    linked_names = 0
+    linked_reviews = 0
+    for source_name in source_names:
+        product_id = matcher.resolve(source_name)
+        if product_id is None and not relink:
+            continue
+        statement = update(CrawledReview).where(CrawledReview.source_product_name == source_name)
+        if not relink:
+            statement = statement.where(CrawledReview.product_id.is_(None))
+        result = db.execute(statement.values(product_id=product_id))
+        if product_id is not None:
+            linked_names += 1
+            linked_reviews += result.rowcount or 0
+    db.commit()
+
+    print(f"✅ 크롤링 리뷰 매칭: 제품명 {linked_names}/{len(source_names)}개, 리뷰 {linked_reviews}개 연결")
+    return {"source_names": len(source_names), "linked_names": linked_names, "linked_reviews": linked_reviews}
+
+
+def unlink_crawled_reviews(db: Session):
+    """제품 전체 재생성 전에 리뷰의 제품 연결 해제 (외래키)"""
+    db.execute(update(CrawledReview).where(CrawledReview.product_id.isnot(None)).values(product_id=None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="크롤링 리뷰 -> 제품 매칭 (product_id 백필)")
+    parser.add_argument("--relink", action="store_true", help="이미 연결된 리뷰도 다시 매칭")
+    args = parser.parse_args()
+
+    from database import SessionLocal, engine
+
+    # 기존 DB에 product_id 인덱스 추가 (이미 있으면 건너뜀)
+    for index in CrawledReview.__table__.indexes:
+        if index.name == "ix_crawled_reviews_product_id":
+            index.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        link_crawled_reviews(db, relink=args.relink)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+제품 텍스트 검색 (문자 bigram 역색인)
+
+기존 검색은 name/brand/description에 '%검색어%' LIKE를 걸어 검색할 때마다
+products 테이블 전체를 순차 스캔했다. 여기서는 프로세스 안에
+문자 bigram -> 제품 ID 역색인을 만들어 두고 후보만 골라 확인한다.
+
+- 한국어는 띄어쓰기가 제각각이므로 공백을 제거하고 문자 bigram으로 색인
+  ("수분 크림" 검색 -> "수분크림" 제품도 매칭)
+- 1글자 검색어는 unigram 색인 사용
+- 검색어의 단어마다 bigram 색인 교집합으로 후보를 구하고 실제 포함 여부를 확인
+- 관련도: 제품명 > 브랜드 > 설명 가중치 + 제품명 시작/일치 가산점
+- 제품 생성/수정/삭제(ORM)는 커밋 시 색인에 바로 반영,
+  벌크 import 등 ORM을 거치지 않는 변경은 invalidate_product_search()로 재빌드
+  (PRODUCT_SEARCH_REFRESH초마다 전체 재빌드도 수행)
+- 검색은 잠금 없이 현재 색인 스냅샷을 읽는다. 색인은 한 번 공개되면 바꾸지 않고,
+  재빌드는 잠금 밖에서 새로 만들어 참조만 교체한다
+- 커밋 반영은 공유하는 기본 색인 위에 작은 변경분(delta) 층만 새로 만들어 교체하므로
+  제품 수와 관계없이 변경분 크기만큼만 비용이 든다. 변경분이 PRODUCT_SEARCH_DELTA_MAX개를
+  넘으면 다음 검색에서 전체 재빌드로 기본 색인에 합친다
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.models.db_models import Product
+
+SEARCH_REFRESH_SECONDS = int(os.getenv("PRODUCT_SEARCH_REFRESH", "600"))
+DELTA_MAX_PRODUCTS = int(os.getenv("PRODUCT_SEARCH_DELTA_MAX", "500"))  # 변경분이 이보다 많으면 재빌드로 합침
+
+# 필드별 가중치 (name, brand, description 순서)
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)
+NAME_PREFIX_BONUS = 1.0
+NAME_EXACT_BONUS = 2.0
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """소문자 + 공백 제거"""
+    if not text:
+        return ""
+    return _WHITESPACE.sub("", text.lower())
+
+
+def ngrams(text: str) -> Set[str]:
+    """문자 unigram + bigram"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_terms(query: str) -> List[str]:
+    return [term for term in (normalize(word) for word in query.split()) if term]
+
+
+Fields = Tuple[str, str, str]
+
+
+class ProductSearchIndex:
+    def __init__(self):
+        # 기본 색인 (빌드할 때만 채우고, 공개된 뒤에는 여러 스냅샷이 공유하므로 바꾸지 않음)
+        self.documents: Dict[int, Fields] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        # 변경분: 제품 ID -> 새 필드 (삭제면 None), 새 필드의 gram -> 제품 ID
+        # 기본 posting에 남은 이전 값은 검색 시 실제 필드로 다시 확인하므로 지우지 않는다
+        self.changed: Dict[int, Optional[Fields]] = {}
+        self.changed_postings: Dict[str, Set[int]] = {}
+
+    def __len__(self):
+        added = sum(1 for product_id, fields in self.changed.items() if fields is not None and product_id not in self.documents)
+        removed = sum(1 for product_id, fields in self.changed.items() if fields is None and product_id in self.documents)
+        return len(self.documents) + added - removed
+
+    def document(self, product_id: int) -> Optional[Fields]:
+        if product_id in self.changed:
+            return self.changed[product_id]
+        return self.documents.get(product_id)
+
+    def add(self, product_id: int, name: Optional[str], brand: Optional[str], description: Optional[str]):
+        if product_id in self.documents:
+            self.remove(product_id)
+        fields = (normalize(name), normalize(brand), normalize(description))
+        self.documents[product_id] = fields
+        for gram in set().union(*(ngrams(field) for field in fields)):
+            self.postings.setdefault(gram, set()).add(product_id)
+
+    def remove(self, product_id: int):
+        fields = self.documents.pop(product_id, None)
+        if fields is None:
+            return
+        for gram in set().union(*(ngrams(field) for field in fields)):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(product_id)
+                if not posting:
+                    del self.postings[gram]
+
+    def with_changes(self, changes: Dict[int, Optional[Tuple[Optional[str], Optional[str], Optional[str]]]]) -> "ProductSearchIndex":
+        """변경을 반영한 새 색인 (기본 색인은 공유하고 변경분 층만 복사, 기존 색인은 그대로)
+
+        changes: {제품 ID: (name, brand, description) 또는 삭제 시 None}
+        """
+        index = ProductSearchIndex()
+        index.documents = self.documents
+        index.postings = self.postings
+        index.changed = dict(self.changed)
+        index.changed_postings = dict(self.changed_postings)
+        copied: Set[str] = set()
+
+        for product_id, fields in changes.items():
+            if fields is None:
+                index.changed[product_id] = None
+                continue
+            new_fields = tuple(normalize(field) for field in fields)
+            index.changed[product_id] = new_fields
+            for gram in set().union(*(ngrams(field) for field in new_fields)):
+                # 바뀌는 posting만 새 set으로 복사 (나머지는 이전 스냅샷과 공유)
+                if gram not in copied:
+                    copied.add(gram)
+                    index.changed_postings[gram] = set(index.changed_postings.get(gram, ()))
+                index.changed_postings[gram].add(product_id)
+        return index
+
+    def _candidates(self, term: str) -> Set[int]:
+        grams = [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+        postings = []
+        for gram in set(grams):
+            posting = self.postings.get(gram, set())
+            changed = self.changed_postings.get(gram)
+            postings.append(posting | changed if changed else posting)
+        postings.sort(key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, query: str) -> List[Tuple[float, int]]:
+        """관련도 내림차순 [(점수, 제품 ID), ...] (모든 단어가 어느 필드에든 포함된 제품만)"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        candidates = None
+        for term in sorted(terms, key=len, reverse=True):
+            term_candidates = self._candidates(term)
+            candidates = term_candidates if candidates is None else candidates & term_candidates
+            if not candidates:
+                return []
+
+        compact_query = "".join(terms)
+        results = []
+        for product_id in candidates:
+            fields = self.document(product_id)
+            if fields is None:
+                continue
+            name = fields[0]
+            score = 0.0
+            for term in terms:
+                term_score = max((weight for weight, field in zip(FIELD_WEIGHTS, fields) if term in field), default=0.0)
+                if not term_score:
+                    break
+                score += term_score
+            else:
+                if name == compact_query:
+                    score += NAME_EXACT_BONUS
+                elif name.startswith(compact_query):
+                    score += NAME_PREFIX_BONUS
+                results.append((score, product_id))
+
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return results
+
+
+# ========== 전역 색인 ==========
+# (색인, 빌드 시각) 스냅샷. 검색은 이 참조를 한 번 읽어 잠금 없이 사용한다.
+_snapshot: Tuple[Optional[ProductSearchIndex], float] = (None, 0.0)
+_generation = 0  # 색인 교체/무효화 때마다 증가 (빌드 중 변경이 있었는지 확인용)
+_lock = threading.Lock()  # 스냅샷 교체 (짧게만 잡음)
+_build_lock = threading.Lock()  # 재빌드는 한 스레드만
+
+
+def build_product_search_index(db: Session) -> ProductSearchIndex:
+    index = ProductSearchIndex()
+    rows = db.query(Product.id, Product.name, Product.brand, Product.description).all()
+    for product_id, name, brand, description in rows:
+        index.add(product_id, name, brand, description)
+    return index
+
+
+def _is_fresh(snapshot: Tuple[Optional[ProductSearchIndex], float]) -> bool:
+    index, built_at = snapshot
+    return index is not None and time.time() - built_at <= SEARCH_REFRESH_SECONDS
+
+
+def get_product_search_index(db: Session) -> ProductSearchIndex:
+    """현재 색인 스냅샷 (없거나 오래됐으면 DB에서 다시 빌드)
+
+    빌드는 잠금 밖에서 하고 끝나면 참조만 교체한다. 오래된 색인이 있으면
+    다른 스레드가 재빌드하는 동안 기다리지 않고 기존 스냅샷을 사용한다.
+    """
+    global _snapshot, _generation
+    snapshot = _snapshot
+    if _is_fresh(snapshot):
+        return snapshot[0]
+    if not _build_lock.acquire(blocking=snapshot[0] is None):
+        return snapshot[0]
+    try:
+        snapshot = _snapshot
+        if _is_fresh(snapshot):
+            return snapshot[0]
+        generation = _generation
+        started = time.time()
+        index = build_product_search_index(db)
+        built_at = time.time()
+        with _lock:
+            # 빌드 중 무효화/커밋 반영이 있었으면 이번 결과는 이 요청에만 쓰고 다음 요청에서 다시 빌드
+            if _generation == generation:
+                _snapshot = (index, built_at)
+                _generation += 1
+        print(f"🔍 제품 검색 색인 빌드 완료: {len(index)}개 ({(built_at - started) * 1000:.0f}ms)")
+        return index
+    finally:
+        _build_lock.release()
+
+
+def search_product_ids(db: Session, query: str) -> List[Tuple[float, int]]:
+    return get_product_search_index(db).search(query)
+
+
+def invalidate_product_search():
+    """ORM을 거치지 않은 제품 변경(벌크 import 등) 후 호출 -> 다음 검색 시 재빌드"""
+    global _snapshot, _generation
+    with _lock:
+        _snapshot = (None, 0.0)
+        _generation += 1
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_products(session, flush_context):
+    """flush된 제품 변경을 모아 둠 (커밋되면 색인에 반영)"""
+    changes = {
+        obj.id: (obj.name, obj.brand, obj.description)
+        for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Product)
+    }
+    changes.update({obj.id: None for obj in session.deleted if isinstance(obj, Product)})
+    if changes:
+        session.info.setdefault("product_search_changes", {}).update(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changed_products(session):
+    global _snapshot, _generation
+    changes = session.info.pop("product_search_changes", None)
+    if not changes:
+        return
+    with _lock:
+        _generation += 1
+        index, built_at = _snapshot
+        if index is None:
+            return
+        index = index.with_changes(changes)
+        if len(index.changed) > DELTA_MAX_PRODUCTS:
+            # 변경분이 커지면 오래된 색인으로 표시 -> 다음 검색에서 잠금 밖 재빌드로 기본 색인에 합침
+            built_at = 0.0
+        _snapshot = (index, built_at)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_products(session):
+    session.info.pop("product_search_changes", None)
@@ -0,0 +1,135 @@
+"""
+피부 프로필별 사전 계산 추천
+
+피부 타입 / 민감도 / 피부 고민은 고정된 선택지에서 고르므로,
+가능한 (skin_type, sensitivity, 고민 조합)을 오프라인에서 모두 추천해 두고
+/recommend/ai 는 profile_recommendations 테이블에서 한 번 조회해서 응답한다.
+테이블에 없는 프로필은 기존처럼 요청 시 생성한다.
+
+갱신:
+    python profile_recommendations.py                      # 고민 최대 2개 조합
+    python profile_recommendations.py --max-concerns 3 --workers 8
+"""
+import os
+import sys
+import argparse
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional, Iterator, Tuple
+
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.models.db_models import ProfileRecommendation
+
+# /api/skin-options, 화장품 찾기 화면과 같은 선택지
+SKIN_TYPES = ["건성", "지성", "복합성(정상)"]
+SENSITIVITIES = ["낮음", "보통", "높음"]
+CONCERNS = ["여드름", "홍조", "각질", "주름", "미백", "모공", "탄력"]
+
+DEFAULT_MAX_CONCERNS = 2
+DEFAULT_WORKERS = 4
+COMMIT_EVERY = 20
+
+
+def canonical_concerns(concerns: List[str]) -> List[str]:
+    """중복 제거 + 선택지 순서로 정렬"""
+    unique = {concern.strip() for concern in concerns if concern and concern.strip()}
+    order = {concern: i for i, concern in enumerate(CONCERNS)}
+    return sorted(unique, key=lambda concern: (order.get(concern, len(order)), concern))
+
+
+def profile_key(skin_type: str, sensitivity: str, concerns: List[str]) -> str:
+    return f"{skin_type.strip()}|{sensitivity.strip()}|{','.join(canonical_concerns(concerns))}"
+
+
+def iter_profiles(max_concerns: int = DEFAULT_MAX_CONCERNS) -> Iterator[Tuple[str, str, List[str]]]:
+    """모든 표준 프로필 (고민 1개 ~ max_concerns개 조합)"""
+    for skin_type in SKIN_TYPES:
+        for sensitivity in SENSITIVITIES:
+            for size in range(1, max_concerns + 1):
+                for concerns in combinations(CONCERNS, size):
+                    yield skin_type, sensitivity, list(concerns)
+
+
+# ========== 조회 ==========
+def get_profile_recommendation(db: Session, skin_type: str, sensitivity: str, concerns: List[str]) -> Optional[Dict]:
+    """사전 계산된 추천 결과 (없거나 테이블이 아직 없으면 None)"""
+    try:
+        row = db.query(ProfileRecommendation.result).filter(
+            ProfileRecommendation.profile_key == profile_key(skin_type, sensitivity, concerns)
+        ).first()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 사전 계산 추천 조회 실패: {e}")
+        return None
+    return row.result if row else None
+
+
+# ========== 오프라인 갱신 ==========
+def refresh_profile_recommendations(max_concerns: int = DEFAULT_MAX_CONCERNS, workers: int = DEFAULT_WORKERS,
+                                    only_missing: bool = False) -> Dict:
+    """모든 표준 프로필의 추천을 병렬로 생성해 테이블에 저장"""
+    from database import SessionLocal, engine
+    from recommendation import generate_recommendation
+
+    ProfileRecommendation.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        existing = {row.profile_key: row for row in db.query(ProfileRecommendation).all()}
+        profiles = [
+            (profile_key(*profile), profile) for profile in iter_profiles(max_concerns)
+        ]
+        if only_missing:
+            profiles = [(key, profile) for key, profile in profiles if key not in existing]
+        print(f"🔧 프로필 추천 갱신 시작: {len(profiles)}개 (workers={workers})")
+
+        stats = {"total": len(profiles), "saved": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(generate_recommendation, *profile, allow_fallback=False): (key, profile)
+                for key, profile in profiles
+            }
+            for future in as_completed(futures):
+                key, (skin_type, sensitivity, concerns) = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"⚠️ {key} 추천 생성 실패: {e}")
+                    continue
+
+                row = existing.get(key)
+                if row is None:
+                    row = ProfileRecommendation(profile_key=key, skin_type=skin_type,
+                                                sensitivity=sensitivity, concerns=concerns, result=result)
+                    db.add(row)
+                    existing[key] = row
+                else:
+                    row.result = result
+                stats["saved"] += 1
+                if stats["saved"] % COMMIT_EVERY == 0:
+                    db.commit()
+                    print(f"  - {stats['saved']}/{stats['total']} 저장")
+
+        db.commit()
+        print(f"✅ 프로필 추천 갱신 완료: 저장 {stats['saved']}개, 실패 {stats['failed']}개")
+        return stats
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="피부 프로필별 추천 사전 계산")
+    parser.add_argument("--max-concerns", type=int, default=DEFAULT_MAX_CONCERNS, help="조합할 최대 피부 고민 수")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="동시에 생성할 프로필 수")
+    parser.add_argument("--only-missing", action="store_true", help="테이블에 없는 프로필만 생성")
+    args = parser.parse_args()
+
+    refresh_profile_recommendations(args.max_concerns, args.workers, only_missing=args.only_missing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+LLM 프롬프트 압축 / 토큰 추정
+
+리뷰 원문을 그대로 프롬프트에 붙이면 리뷰 길이에 따라 토큰 수(= 지연 시간, 비용)가 크게 달라지므로
+제품별 토큰 예산 안에서 중복 문장/구절을 제거하고 앞쪽 문장부터 잘라서 사용한다.
+
+토큰 수는 tiktoken이 설치되어 있으면 정확히 세고, 없으면 글자 수로 추정한다.
+환경변수: LLM_PRODUCT_TOKEN_BUDGET (제품당 리뷰 토큰 예산, 기본 120)
+"""
+import os
+import re
+from typing import List, Optional
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+PRODUCT_TOKEN_BUDGET = int(os.getenv("LLM_PRODUCT_TOKEN_BUDGET", "120"))
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?~])\s+|(?<=[요다음함])\s+|\n+")
+_HANGUL = re.compile(r"[가-힣]")
+_REPEATED_WORDS = re.compile(r"(\b\S+(?:\s+\S+){0,2})(?:\s+\1\b)+")
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 (tiktoken 없으면 한글 1글자 ≈ 1토큰, 그 외 4글자 ≈ 1토큰으로 추정)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    hangul = len(_HANGUL.findall(text))
+    return hangul + max(0, len(text) - hangul) // 4 + 1
+
+
+def split_sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(str(text)) if sentence and sentence.strip()]
+
+
+def dedupe_phrases(sentences: List[str]) -> List[str]:
+    """같은 문장(공백/문장부호 무시) 제거 + 문장 안에서 연달아 반복되는 구절 축약"""
+    seen = set()
+    result = []
+    for sentence in sentences:
+        sentence = _REPEATED_WORDS.sub(r"\1", re.sub(r"\s+", " ", sentence))
+        key = re.sub(r"[\s.!?~,]+", "", sentence)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        result.append(sentence)
+    return result
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    if _encoding is not None:
+        return _encoding.decode(_encoding.encode(text)[:budget]).rstrip() + "…"
+    # 추정치 기준으로 이분 탐색
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + "…"
+
+
+def compact_review(text: Optional[str], budget: int = PRODUCT_TOKEN_BUDGET) -> str:
+    """리뷰를 토큰 예산 안으로 압축 (중복 제거 후 앞 문장부터 채움)"""
+    if not text:
+        return ""
+    parts = []
+    used = 0
+    for sentence in dedupe_phrases(split_sentences(text)):
+        tokens = estimate_tokens(sentence)
+        if used + tokens > budget:
+            if not parts:
+                parts.append(truncate_to_tokens(sentence, budget))
+            break
+        parts.append(sentence)
+        used += tokens + 1
+    return " ".join(parts)
+
+
+def messages_tokens(messages: List[dict]) -> int:
+    """chat 메시지 목록의 대략적인 프롬프트 토큰 수 (메시지당 오버헤드 4토큰)"""
+    return sum(estimate_tokens(message.get("content", "")) + 4 for message in messages)
@@ -3,18 +3,19 @@ from pydantic import BaseModel
 from typing import List
 import os
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
 from pinecone import Pinecone
-import openai
+from product_index import search_products
+from metadata_store import query_matches
+from ointment_index import search_ointments
+from embedding_service import encode
+from llm_client import llm_client, LLMUnavailableError
 
 # 1. 환경 변수 로딩
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-model = SentenceTransformer("jhgan/ko-sbert-nli")
 pc = Pinecone(api_key=PINECONE_API_KEY)
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
 app = FastAPI()
 
@@ -27,7 +28,7 @@ class RecommendAIRequest(BaseModel):
 def recommend_ai(data: RecommendAIRequest = Body(...)):
     ai_results = data.diagnosis
     query = " ".join(ai_results)
-    query_embedding = model.encode([query])[0].tolist()
+    query_embedding = encode(query).tolist()
 
     INDEXES = {
         "토너": "toner",
@@ -38,22 +39,23 @@ def recommend_ai(data: RecommendAIRequest = Body(...)):
     final_recommend_list = []
 
     for category, index_name in INDEXES.items():
-        index = pc.Index(index_name)
-        result = index.query(vector=query_embedding, top_k=30, include_metadata=True)
-        matches = result.get("matches", [])
+        # 제품 centroid 인덱스 우선, 없으면 리뷰 인덱스의 최고 점수 리뷰
+        matches = search_products(query_embedding, index_name, skin_type=data.skin_type, top_k=1)
+        if matches is None:
+            matches = query_matches(pc.Index(index_name), query_embedding, index_name, top_k=30, hydrate_top=1)
         if not matches:
             continue
-        best = max(matches, key=lambda x: x["score"])
-        meta = best["metadata"]
+        meta = matches[0]["metadata"]
         final_recommend_list.append({
             "카테고리": category,
             "제품명": meta.get("product_name", "")
         })
 
-    # 연고도 검색
-    ointment_index = pc.Index("ointment")
-    result = ointment_index.query(vector=query_embedding, top_k=5, include_metadata=True)
-    matches = result.get("matches", [])
+    # 연고도 검색 (로컬 연고 인덱스 우선, 없으면 원격 ointment 인덱스)
+    matches = search_ointments(query_embedding, top_k=1)
+    if matches is None:
+        result = pc.Index("ointment").query(vector=query_embedding, top_k=5, include_metadata=True)
+        matches = result.get("matches", [])
     best_ointment = max(matches, key=lambda x: x["score"]) if matches else None
     ointment_meta = best_ointment["metadata"] if best_ointment else {}
 
@@ -75,15 +77,25 @@ def recommend_ai(data: RecommendAIRequest = Body(...)):
         "모든 추천은 한 줄로, 간결하고 전문적인 문장으로. 이모지나 장난스러운 말투는 금지."
     )
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "너는 피부과 추천 전문가야. 요청한 형식 그대로, 아주 간단하고 깔끔하게 추천해."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=400,
-        temperature=0.3
-    )
+    try:
+        response = llm_client.chat(
+            messages=[
+                {"role": "system", "content": "너는 피부과 추천 전문가야. 요청한 형식 그대로, 아주 간단하고 깔끔하게 추천해."},
+                {"role": "user", "content": prompt}
+            ],
+            tag="recommend_ai",
+            max_tokens=400,
+            temperature=0.3
+        )
+    except LLMUnavailableError as e:
+        # GPT를 사용할 수 없으면 검색된 제품 목록만 반환
+        print(f"⚠️ GPT 추천 생성 실패, 검색 결과만 반환합니다: {e}")
+        lines = [f"{p['카테고리']}: {p['제품명']}" for p in final_recommend_list]
+        if ointment_meta:
+            lines.append(f"연고: {ointment_meta.get('product_name', '')}")
+        return {
+            "추천 결과": "\n".join(lines)
+        }
 
     return {
         "추천 결과": response.choices[0].message.content.strip()
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
+from embedding_service import encode
+from metadata_store import query_matches
+from ointment_index import search_ointments
 from pinecone import Pinecone
 import openai
 import pandas as pd
@@ -11,7 +13,6 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # 2. 모델 초기화
-model = SentenceTransformer("jhgan/ko-sbert-nli")
 pc = Pinecone(api_key=PINECONE_API_KEY)
 client = openai.OpenAI(api_key=OPENAI_API_KEY)
 
@@ -22,7 +23,7 @@ user_input = {
     "diagnosis": ["여드름", "염증성"]
 }
 query = " ".join(user_input["diagnosis"])
-query_embedding = model.encode([query])[0].tolist()
+query_embedding = encode(query).tolist()
 
 INDEXES = {
     "토너": "toner",
@@ -33,13 +34,10 @@ INDEXES = {
 final_recommend_list = []
 
 for category, index_name in INDEXES.items():
-    index = pc.Index(index_name)
-    result = index.query(vector=query_embedding, top_k=20, include_metadata=True)
-    matches = result.get("matches", [])
+    matches = query_matches(pc.Index(index_name), query_embedding, index_name, top_k=20, hydrate_top=1)
     if not matches:
         continue
-    best = max(matches, key=lambda x: x["score"])
-    meta = best["metadata"]
+    meta = matches[0]["metadata"]
     final_recommend_list.append({
         "카테고리": category,
         "제품명": meta.get("product_name", ""),
@@ -47,9 +45,10 @@ for category, index_name in INDEXES.items():
     })
 
 # 연고도 같이 검색
-ointment_index = pc.Index("ointment")
-result = ointment_index.query(vector=query_embedding, top_k=5, include_metadata=True)
-matches = result.get("matches", [])
+matches = search_ointments(query_embedding, top_k=1)
+if matches is None:
+    result = pc.Index("ointment").query(vector=query_embedding, top_k=5, include_metadata=True)
+    matches = result.get("matches", [])
 best_ointment = max(matches, key=lambda x: x["score"]) if matches else None
 ointment_meta = best_ointment["metadata"] if best_ointment else {}
 
@@ -1,21 +1,30 @@
 from fastapi import Body, APIRouter, Depends
 from sqlalchemy.orm import Session
 from schemas import RecommendAIRequest
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
 from pinecone import Pinecone
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from dotenv import load_dotenv
+from product_index import search_products, product_index_available
+from metadata_store import query_matches
+from embedding_service import encode
+from history_writer import history_writer
+from profile_recommendations import get_profile_recommendation
+from product_explanations import get_cached_reasons
+from user_profiles import UserProfile, RERANK_CANDIDATES, get_user_profile, personalize_query, rerank
+from llm_client import llm_client, LLMUnavailableError
+from prompt_builder import compact_review
+from structured_output import (
+    STRUCTURED_OUTPUT, RecommendationOutput, format_instruction, record_stat, request_structured,
+    structured_output_stats
+)
 
 router = APIRouter()
 
 # 환경변수 로딩
 load_dotenv('config.env')
 
-# 모델 초기화
-model = SentenceTransformer("jhgan/ko-sbert-nli")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 # Pinecone API 키 확인
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 pc = None
@@ -30,6 +39,29 @@ INDEXES = {
     "크림": "cream"
 }
 
+# GPT를 사용할 수 없을 때 (검색 결과만 반환)
+RETRIEVAL_ONLY_SUMMARY = "{skin_type} 피부 / 민감도: {sensitivity} / 고민: {concerns} 에 맞는 제품을 리뷰 검색 결과로 추천했습니다."
+REVIEW_REASON_TOKENS = 60
+
+# 분석 요약은 추천 이유/연고/시술 호출과 서로 독립이므로 동시에 호출
+_summary_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="analysis-summary")
+
+def retrieve_best_product(index_name: str, query_embedding, skin_type: str, profile: Optional[UserProfile] = None):
+    """카테고리별 최적 제품 메타데이터 조회
+
+    제품 centroid 인덱스가 빌드되어 있으면 한 번의 질의로 제품 순위를 얻고,
+    없으면 Pinecone 리뷰 인덱스에서 가장 점수가 높은 리뷰의 제품을 사용한다.
+    사용자 프로필이 있으면 후보를 더 받아 이미 추천한 제품을 뒤로 보낸다.
+    """
+    top_k = RERANK_CANDIDATES if profile else 1
+    matches = search_products(query_embedding, index_name, skin_type=skin_type, top_k=top_k)
+    if matches is None and pc:
+        matches = query_matches(pc.Index(index_name), query_embedding, index_name, top_k=10,
+                                hydrate_top=None if profile else 1)
+    if not matches:
+        return None
+    return rerank(matches, profile)[0]["metadata"]
+
 # 데이터베이스 세션 의존성
 def get_db():
     from database import SessionLocal
@@ -39,78 +71,51 @@ def get_db():
     finally:
         db.close()
 
-@router.post("/recommend/ai")
-def recommend_ai(data: RecommendAIRequest = Body(...), db: Session = Depends(get_db)):
-    # Pinecone API 키 확인
-    if not pc:
-        return {
-            "error": "PINECONE_API_KEY가 설정되지 않았습니다. 관리자에게 문의하세요.",
-            "분석 요약": "API 키 설정이 필요합니다.",
-            "추천 리스트": []
-        }
-
-    # 1. 분석 요약 생성
-    analysis_prompt = (
-        f"피부 타입: {data.skin_type}, 민감도: {data.sensitivity}, 피부 고민: {', '.join(data.diagnosis)}\n"
-        "위 정보를 바탕으로 사용자의 피부 상태를 간단하게 분석한 결과를 3~4줄 이내 요약해줘. 이모지, 말투 없이 전문가처럼."
-    )
-    analysis_response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": analysis_prompt}],
-        temperature=0.3,
-        max_tokens=300
-    )
-
-    # 2. Pinecone에서 추천 (토너/앰플/크림)
-    query_text = f"{data.skin_type} 피부 / 민감도: {data.sensitivity} / 상태: {', '.join(data.diagnosis)}"
-    query_embedding = model.encode(query_text).tolist()
-
-    result_list = []
-    gpt_product_prompt = ""
-    product_map = {}
+def retrieve_products(skin_type: str, sensitivity: str, diagnosis: List[str], profile: Optional[UserProfile] = None) -> dict:
+    """카테고리별 추천 제품 메타데이터 (사용자 프로필이 있으면 개인화)"""
+    query_text = f"{skin_type} 피부 / 민감도: {sensitivity} / 상태: {', '.join(diagnosis)}"
+    query_embedding = personalize_query(encode(query_text), profile)
 
+    products = {}
     for category, index_name in INDEXES.items():
-        index = pc.Index(index_name)
-        result = index.query(vector=query_embedding, top_k=10, include_metadata=True)
-        matches = result.get("matches", [])
-        if not matches:
-            continue
-        best = max(matches, key=lambda x: x["score"])
-        meta = best["metadata"]
-        product_name = meta.get("product_name", "")
-        product_review = meta.get("review", "")
+        meta = retrieve_best_product(index_name, query_embedding, skin_type, profile)
+        if meta:
+            products[category] = meta
+    return products
 
-        product_info = {
-            "카테고리": category,
-            "제품명": product_name,
-            "이미지": meta.get("image_url", ""),
-            "링크": meta.get("link", ""),
-            "피부타입": meta.get("skin_type", "")
-        }
-        product_map[category] = product_info
-        gpt_product_prompt += f"{category}: {product_name} - {product_review}\n"
-
-    # 3. GPT에게 추천 이유 포함해 연고/시술까지 생성
-    gpt_prompt = (
-        f"피부 타입: {data.skin_type}, 민감도: {data.sensitivity}, 피부 고민: {', '.join(data.diagnosis)}\n"
-        f"추천 제품 및 리뷰:\n{gpt_product_prompt}\n"
-        "각 제품의 리뷰를 바탕으로 추천 이유를 각 제품별로 한 문장씩 정리해줘.\n"
-        "그리고 연고 1개, 피부과 시술 2개도 이름과 추천 이유를 포함해 각각 한 문장씩 추천해줘."
-    )
+def apply_structured_output(output: RecommendationOutput, product_map: dict, enriched_list: list,
+                            used_categories: set) -> list:
+    """구조화 응답의 제품별 이유를 반영하고 연고/시술 항목 목록 반환"""
+    names = {info["제품명"]: category for category, info in product_map.items()}
+    for item in output.products:
+        category = item.category if item.category in product_map else names.get(item.category)
+        if category is None or category in used_categories:
+            continue
+        product_map[category]["추천이유"] = item.reason
+        enriched_list.append(product_map[category])
+        used_categories.add(category)
 
-    gpt_response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[{"role": "user", "content": gpt_prompt}],
-        temperature=0.3,
-        max_tokens=600
-    )
+    extra_items = []
+    if output.ointment:
+        extra_items.append({
+            "카테고리": "연고",
+            "제품명": output.ointment.name,
+            "추천이유": output.ointment.reason,
+            "이미지": "",
+            "링크": ""
+        })
+    for procedure in output.procedures:
+        extra_items.append({
+            "카테고리": "시술",
+            "제품명": procedure.name,
+            "추천이유": procedure.reason
+        })
+    return extra_items
 
-    gpt_text = gpt_response.choices[0].message.content.strip()
+def apply_text_output(gpt_text: str, product_map: dict, enriched_list: list, used_categories: set) -> list:
+    """자유 형식 응답을 줄 단위로 파싱 (LLM_OUTPUT_MODE=text)"""
     gpt_lines = [line.strip("- ") for line in gpt_text.split("\n") if line.strip()]
 
-    enriched_list = []
-    used_categories = set()
-
     for line in gpt_lines:
         for category, info in product_map.items():
             if category in used_categories:
@@ -121,9 +126,10 @@ def recommend_ai(data: RecommendAIRequest = Body(...), db: Session = Depends(get
                 used_categories.add(category)
                 break
 
+    extra_items = []
     for line in gpt_lines:
         if line.startswith("연고"):
-            enriched_list.append({
+            extra_items.append({
                 "카테고리": "연고",
                 "제품명": line.split(":")[0].split("|")[-1].strip(),
                 "추천이유": line.split(":")[-1].strip(),
@@ -131,23 +137,181 @@ def recommend_ai(data: RecommendAIRequest = Body(...), db: Session = Depends(get
                 "링크": ""
             })
         elif any(kw in line for kw in ["시술", "토닝", "필링"]):
-            enriched_list.append({
+            extra_items.append({
                 "카테고리": "시술",
                 "제품명": line.split(":")[0].strip(),
                 "추천이유": line.split(":")[-1].strip()
             })
+    return extra_items
 
-    # 4. 추천 결과를 DB에 자동 저장
+def generate_analysis_summary(skin_type: str, sensitivity: str, diagnosis: List[str],
+                              allow_fallback: bool = True) -> str:
+    """피부 상태 분석 요약 (GPT 호출 실패 시 검색 결과 안내 문구)"""
+    analysis_prompt = (
+        f"피부 타입: {skin_type}, 민감도: {sensitivity}, 피부 고민: {', '.join(diagnosis)}\n"
+        "위 정보를 바탕으로 사용자의 피부 상태를 간단하게 분석한 결과를 3~4줄 이내 요약해줘. 이모지, 말투 없이 전문가처럼."
+    )
+    try:
+        analysis_response = llm_client.chat(
+            messages=[{"role": "user", "content": analysis_prompt}],
+            tag="analysis_summary",
+            temperature=0.3,
+            max_tokens=300
+        )
+        return analysis_response.choices[0].message.content.strip()
+    except LLMUnavailableError as e:
+        if not allow_fallback:
+            raise
+        print(f"⚠️ 분석 요약 생성 실패, 검색 결과만 반환합니다: {e}")
+        return RETRIEVAL_ONLY_SUMMARY.format(skin_type=skin_type, sensitivity=sensitivity, concerns=", ".join(diagnosis))
+
+def generate_recommendation(skin_type: str, sensitivity: str, diagnosis: List[str],
+                            profile: Optional[UserProfile] = None, products: Optional[dict] = None,
+                            allow_fallback: bool = True, db: Optional[Session] = None) -> dict:
+    """피부 프로필로 분석 요약 + 카테고리별 추천 제품 생성 (제품 검색 + GPT 호출)
+
+    분석 요약과 추천 이유/연고/시술은 서로 독립이므로 동시에 호출한다.
+    제품 추천 이유가 모두 캐시되어 있으면 GPT 대기 시간은 호출 한 번 분량이 된다.
+    GPT 호출이 실패하거나 서킷 브레이커가 열려 있으면 검색 결과만으로 응답한다
+    (allow_fallback=False면 LLMUnavailableError를 그대로 올림 - 사전 계산 작업용).
+    """
+    # 1. 분석 요약 생성 (백그라운드)
+    summary_future = _summary_executor.submit(generate_analysis_summary, skin_type, sensitivity, diagnosis, allow_fallback)
+
+    # 2. 제품 인덱스에서 추천 (토너/앰플/크림)
+    if products is None:
+        products = retrieve_products(skin_type, sensitivity, diagnosis, profile)
+
+    result_list = []
+    gpt_product_prompt = ""
+    product_map = {}
+    product_reviews = {}
+
+    for category, meta in products.items():
+        product_name = meta.get("product_name", "")
+        product_review = meta.get("review", "")
+
+        product_info = {
+            "카테고리": category,
+            "제품명": product_name,
+            "이미지": meta.get("image_url", ""),
+            "링크": meta.get("link", ""),
+            "피부타입": meta.get("skin_type", "")
+        }
+        product_map[category] = product_info
+        product_reviews[category] = product_review
+
+    # 3. 캐시된 제품별 추천 이유 사용 (캐시에 없는 제품만 리뷰를 GPT에 전달)
+    cached_reasons = get_cached_reasons([info["제품명"] for info in product_map.values()], skin_type, diagnosis, db=db)
+
+    enriched_list = []
+    used_categories = set()
+    for category, info in product_map.items():
+        if info["제품명"] in cached_reasons:
+            info["추천이유"] = cached_reasons[info["제품명"]]
+            enriched_list.append(info)
+            used_categories.add(category)
+        else:
+            # 리뷰는 제품별 토큰 예산 안으로 압축해서 전달
+            gpt_product_prompt += f"{category}: {info['제품명']} - {compact_review(product_reviews[category])}\n"
+
+    # 4. GPT에게 (캐시에 없는 제품의) 추천 이유와 연고/시술 생성
+    gpt_prompt = f"피부 타입: {skin_type}, 민감도: {sensitivity}, 피부 고민: {', '.join(diagnosis)}\n"
+    if STRUCTURED_OUTPUT:
+        if gpt_product_prompt:
+            gpt_prompt += (
+                f"추천 제품 및 리뷰:\n{gpt_product_prompt}\n"
+                "각 제품의 리뷰를 바탕으로 추천 이유를 제품별로 한 문장씩 정리하고, "
+            )
+        gpt_prompt += "연고 1개, 피부과 시술 2개도 이름과 추천 이유를 한 문장씩 추천해줘.\n"
+        pending = [category for category in product_map if category not in used_categories]
+        gpt_prompt += format_instruction(bool(gpt_product_prompt), pending)
+    elif gpt_product_prompt:
+        gpt_prompt += (
+            f"추천 제품 및 리뷰:\n{gpt_product_prompt}\n"
+            "각 제품의 리뷰를 바탕으로 추천 이유를 각 제품별로 한 문장씩 정리해줘.\n"
+            "그리고 연고 1개, 피부과 시술 2개도 이름과 추천 이유를 포함해 각각 한 문장씩 추천해줘."
+        )
+    else:
+        gpt_prompt += "연고 1개, 피부과 시술 2개를 이름과 추천 이유를 포함해 각각 한 문장씩 추천해줘."
+
+    messages = [{"role": "user", "content": gpt_prompt}]
+    max_tokens = 600 if gpt_product_prompt else 300
+    try:
+        if STRUCTURED_OUTPUT:
+            output = request_structured(messages, tag="product_reasons", temperature=0.3, max_tokens=max_tokens)
+            extra_items = apply_structured_output(output, product_map, enriched_list, used_categories)
+        else:
+            gpt_response = llm_client.chat(
+                messages=messages,
+                tag="product_reasons",
+                temperature=0.3,
+                max_tokens=max_tokens
+            )
+            extra_items = apply_text_output(gpt_response.choices[0].message.content.strip(),
+                                            product_map, enriched_list, used_categories)
+    except LLMUnavailableError as e:
+        if not allow_fallback:
+            summary_future.cancel()
+            raise
+        print(f"⚠️ 추천 이유 생성 실패, 검색 결과만 반환합니다: {e}")
+        extra_items = None
+
+    # 이유를 받지 못한 제품은 대표 리뷰를 추천 이유로 사용 (응답 형식이 틀려도 제품이 빠지지 않도록)
+    missing = [category for category in product_map if category not in used_categories]
+    if missing and STRUCTURED_OUTPUT and extra_items is not None:
+        record_stat("missing_products", len(missing))
+    for category in missing:
+        info = product_map[category]
+        info["추천이유"] = compact_review(product_reviews[category], REVIEW_REASON_TOKENS)
+        enriched_list.append(info)
+        used_categories.add(category)
+    enriched_list.extend(extra_items or [])
+
+    return {
+        "분석 요약": summary_future.result(),
+        "추천 리스트": enriched_list
+    }
+
+@router.post("/recommend/ai")
+def recommend_ai(data: RecommendAIRequest = Body(...), db: Session = Depends(get_db)):
+    # 미리 계산해 둔 프로필 추천이 있으면 DB 조회 한 번으로 응답
+    result = get_profile_recommendation(db, data.skin_type, data.sensitivity, data.diagnosis)
+
+    # 분석/리뷰로 쌓인 선호 정보가 있으면 개인화 검색 결과가 사전 계산 결과와 다를 때만 새로 생성
+    # (추천 내역만 있는 프로필은 이전 추천 감점 때문에 항상 달라지므로 사전 계산 결과를 그대로 사용)
+    profile = get_user_profile(data.user_id, db)
+    products = None
+    if profile is not None and result is not None and not profile.has_preferences:
+        profile = None
+    if profile is not None:
+        products = retrieve_products(data.skin_type, data.sensitivity, data.diagnosis, profile)
+        if result is not None:
+            precomputed = {item.get("제품명") for item in result["추천 리스트"] if item.get("카테고리") in INDEXES}
+            if precomputed != {meta.get("product_name", "") for meta in products.values()}:
+                result = None
+
+    if result is None:
+        # Pinecone API 키 확인 (로컬 제품 인덱스가 있으면 Pinecone 없이도 추천 가능)
+        if not pc and not all(product_index_available(index_name) for index_name in INDEXES.values()):
+            return {
+                "error": "PINECONE_API_KEY가 설정되지 않았습니다. 관리자에게 문의하세요.",
+                "분석 요약": "API 키 설정이 필요합니다.",
+                "추천 리스트": []
+            }
+        result = generate_recommendation(data.skin_type, data.sensitivity, data.diagnosis, profile, products, db=db)
+
+    enriched_list = result["추천 리스트"]
+
+    # 추천 결과를 DB에 자동 저장 (write-behind 큐에 넣고 바로 응답)
     try:
-        from crud import create_recommendation_history
-        
         # 추천 내역 저장용 데이터 구성
         recommendation_data = {
-            "user_id": getattr(data, 'user_id', 1),  # 임시 사용자 ID
+            "user_id": data.user_id or 1,  # 임시 사용자 ID
             "skin_type": data.skin_type,
             "sensitivity": data.sensitivity,
             "concerns": data.diagnosis,
-            "ai_explanation": analysis_response.choices[0].message.content.strip(),
+            "ai_explanation": result["분석 요약"],
             "recommended_products": [
                 {
                     "product_name": item.get("제품명", ""),
@@ -158,14 +322,22 @@ def recommend_ai(data: RecommendAIRequest = Body(...), db: Session = Depends(get
             ]
         }
         
-        saved_history = create_recommendation_history(db, recommendation_data)
-        print(f"✅ AI 추천 결과 자동 저장 완료: ID {saved_history.id}")
+        history_writer.submit(recommendation_data)
         
     except Exception as save_error:
         print(f"⚠️ 추천 내역 저장 실패: {save_error}")
         # 저장 실패해도 추천 결과는 반환
 
-    return {
-        "분석 요약": analysis_response.choices[0].message.content.strip(),
-        "추천 리스트": enriched_list
-    }
+    return result
+
+
+@router.get("/recommend/llm-status")
+def get_llm_status():
+    """LLM 클라이언트 상태 (서킷 브레이커, 재시도/헤징/실패 건수, 용도별 토큰/지연 시간, 구조화 응답 파싱 지표)"""
+    return {**llm_client.status(), "structured_output": structured_output_stats()}
+
+
+@router.get("/recommend/history-queue")
+def get_history_queue_status():
+    """추천 내역 write-behind 큐 상태 (대기 중인 내역 수, 저장/실패 건수)"""
+    return history_writer.status()
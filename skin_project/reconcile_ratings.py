@@ -0,0 +1,70 @@
+"""
+제품 / 의사 평점 집계 정합성 맞추기
+
+리뷰 작성/수정/삭제 시 평점은 rating_sum, review_count를 증분으로만 갱신한다
+(crud.apply_product_rating_delta, medical_crud.apply_doctor_rating_delta).
+ORM을 거치지 않은 리뷰 변경(직접 SQL, 샘플 데이터 등)으로 생긴 차이를
+리뷰 테이블 기준 집계로 주기적으로 바로잡는다.
+
+    python reconcile_ratings.py --add-columns   # 기존 DB에 rating_sum 컬럼 추가 후 집계
+    python reconcile_ratings.py                 # 한 번 실행 (cron 등)
+    python reconcile_ratings.py --interval 3600 # 1시간마다 반복 실행
+"""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from database import engine, SessionLocal
+from crud import reconcile_product_ratings
+from medical_crud import reconcile_doctor_ratings
+
+
+def add_rating_sum_columns():
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS rating_sum DOUBLE PRECISION"))
+        conn.execute(text("ALTER TABLE doctors ADD COLUMN IF NOT EXISTS rating_sum INTEGER"))
+    print("✅ rating_sum 컬럼 확인 완료")
+
+
+def reconcile_ratings() -> dict:
+    db = SessionLocal()
+    try:
+        products = reconcile_product_ratings(db)
+        doctors = reconcile_doctor_ratings(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"📊 평점 집계 보정: 제품 {products}개, 의사 {doctors}개")
+    return {"products": products, "doctors": doctors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="제품/의사 평점 집계 정합성 맞추기")
+    parser.add_argument("--add-columns", action="store_true", help="기존 DB에 rating_sum 컬럼 추가")
+    parser.add_argument("--interval", type=int, default=0, help="반복 실행 간격(초), 0이면 한 번만 실행")
+    args = parser.parse_args()
+
+    if args.add_columns:
+        add_rating_sum_columns()
+
+    while True:
+        try:
+            reconcile_ratings()
+        except Exception as e:
+            print(f"❌ 평점 집계 보정 실패: {e}")
+            if not args.interval:
+                raise
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+리뷰 하이브리드 검색 (키워드/태그 역색인 + 벡터 점수)
+
+오프라인 빌드:
+    리뷰 본문의 문자 n-gram과 reviews_bulk_*.csv의 태그("건성에 좋아요", 리뷰어 피부타입)로
+    역색인(posting list)을 만들어 리뷰 인덱스 옆에 저장한다.
+    python review_search.py --category cream
+
+검색 시에는 키워드/태그 posting list 교집합으로 후보 리뷰를 고르고,
+후보 리뷰에 대해서만 벡터 점수를 계산해 키워드 점수와 합산한 뒤
+제품별 상위 PRODUCT_TOP_REVIEWS개 리뷰 점수의 평균으로 순위를 매긴다.
+("건성" 같은 태그는 대부분의 리뷰에 걸리므로 합계로 순위를 매기면 리뷰가 많은 제품이 항상 이긴다)
+필터링 비용은 전체 리뷰 수가 아니라 posting list 길이에 비례한다.
+"""
+import os
+import re
+import sys
+import argparse
+from functools import reduce
+from typing import List, Dict, Optional, Iterable
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from vector_store import LocalVectorIndex
+from product_index import DATA_DIR, review_index_path
+
+DEFAULT_KEYWORD_WEIGHT = 0.1
+PRODUCT_TOP_REVIEWS = 3  # 제품 점수에 반영할 제품별 상위 리뷰 수
+TAG_PREFIX = "#"
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+_search_indexes: Dict[str, Optional["ReviewSearchIndex"]] = {}
+
+
+def postings_path(category: str) -> str:
+    return os.path.join(DATA_DIR, f"review_postings_{category}.npz")
+
+
+def text_grams(text: str) -> List[str]:
+    """공백을 제외한 문자 unigram + bigram (한국어 부분 문자열 검색용)"""
+    grams = []
+    for word in str(text).split():
+        grams.extend(word)
+        grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def query_grams(keyword: str) -> List[str]:
+    """검색어의 단어별 bigram (한 글자 단어는 unigram)"""
+    grams = []
+    for word in keyword.split():
+        if len(word) == 1:
+            grams.append(word)
+        else:
+            grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+
+def parse_tags(*values) -> List[str]:
+    """"['건성에 좋아요', '진정에 좋아요']", "['지성', '웜톤']" 형태의 컬럼에서 태그 추출
+
+    "건성에 좋아요" 같은 태그는 "건성"으로도 색인한다.
+    """
+    tags = []
+    for value in values:
+        if not isinstance(value, str):
+            continue
+        for tag in re.findall(r"'([^']+)'", value) or [value]:
+            tag = tag.strip()
+            if not tag:
+                continue
+            tags.append(tag)
+            if tag.endswith("에 좋아요"):
+                tags.append(tag[:-len("에 좋아요")])
+    return tags
+
+
+class ReviewSearchIndex:
+    """리뷰 역색인 + 리뷰 벡터 인덱스"""
+
+    def __init__(self, review_index: LocalVectorIndex, postings: Dict[str, np.ndarray]):
+        self.review_index = review_index
+        self.postings = postings
+
+        # 리뷰 위치 -> 제품 코드 (제품별 점수 집계를 bincount 한 번으로 처리)
+        self.product_names: List[str] = []
+        codes = {}
+        product_codes = []
+        for meta in review_index.metadata:
+            name = meta.get("product_name", "")
+            if name not in codes:
+                codes[name] = len(self.product_names)
+                self.product_names.append(name)
+            product_codes.append(codes[name])
+        self.product_codes = np.array(product_codes, dtype=np.int32)
+
+    # ========== 빌드/저장 ==========
+    @classmethod
+    def build(cls, review_index: LocalVectorIndex, rows: Iterable[Dict]) -> "ReviewSearchIndex":
+        """rows: {"id", "tags"} 목록 (리뷰 본문은 리뷰 인덱스 메타데이터에서 가져옴)"""
+        lists: Dict[str, set] = {}
+        for position, meta in enumerate(review_index.metadata):
+            for gram in text_grams(meta.get("review", "")):
+                lists.setdefault(gram, set()).add(position)
+        for row in rows:
+            position = review_index.position(row["id"])
+            if position is None:
+                continue
+            for tag in row["tags"]:
+                lists.setdefault(TAG_PREFIX + tag, set()).add(position)
+
+        postings = {token: np.array(sorted(positions), dtype=np.int32) for token, positions in lists.items()}
+        return cls(review_index, postings)
+
+    def save(self, path: str):
+        """posting list를 CSR 형태(tokens, offsets, data)로 저장"""
+        tokens = list(self.postings.keys())
+        lengths = [len(self.postings[token]) for token in tokens]
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        data = np.concatenate([self.postings[token] for token in tokens]) if tokens else _EMPTY
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, tokens=np.array(tokens, dtype=object), offsets=offsets, data=data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, review_index: LocalVectorIndex, path: str) -> "ReviewSearchIndex":
+        saved = np.load(path, allow_pickle=True)
+        offsets, data = saved["offsets"], saved["data"]
+        postings = {
+            str(token): data[offsets[i]:offsets[i + 1]]
+            for i, token in enumerate(saved["tokens"])
+        }
+        return cls(review_index, postings)
+
+    # ========== 조회 ==========
+    def keyword_positions(self, keyword: str) -> np.ndarray:
+        """리뷰 본문 또는 태그에 keyword가 포함된 리뷰 위치"""
+        keyword = keyword.strip()
+        if not keyword:
+            return _EMPTY
+
+        text_hits = _EMPTY
+        grams = query_grams(keyword)
+        lists = [self.postings.get(gram) for gram in grams]
+        if lists and all(posting is not None for posting in lists):
+            # 짧은 posting list부터 교집합
+            lists.sort(key=len)
+            candidates = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), lists)
+            # n-gram 교집합은 후보(상위집합)이므로 후보에 대해서만 실제 포함 여부 확인
+            if len(grams) > 1 and len(candidates):
+                metadata = self.review_index.metadata
+                verified = [p for p in candidates if keyword in metadata[p].get("review", "")]
+                candidates = np.array(verified, dtype=np.int32)
+            text_hits = candidates
+
+        tag_hits = self.postings.get(TAG_PREFIX + keyword, _EMPTY)
+        if not len(tag_hits):
+            return text_hits
+        return np.union1d(text_hits, tag_hits)
+
+    def search(self, query_vector, keywords: Iterable[str] = (), top_k: int = 5,
+               keyword_weight: float = DEFAULT_KEYWORD_WEIGHT,
+               reviews_per_product: int = PRODUCT_TOP_REVIEWS) -> List[Dict]:
+        """키워드/태그 필터 + 벡터 점수로 제품 순위 반환
+
+        리뷰 점수 = 코사인 유사도 + keyword_weight * 일치 키워드 수
+        제품 점수 = 제품별 상위 reviews_per_product개 리뷰 점수 평균 (리뷰 수가 아니라 관련도로 순위)
+        키워드에 맞는 리뷰가 없으면 전체 리뷰를 벡터 점수만으로 순위 매김
+        """
+        if not len(self.review_index):
+            return []
+
+        hits = [self.keyword_positions(keyword) for keyword in keywords]
+        hits = [h for h in hits if len(h)]
+        if hits:
+            candidates, match_counts = np.unique(np.concatenate(hits), return_counts=True)
+        else:
+            candidates = np.arange(len(self.review_index), dtype=np.int32)
+            match_counts = np.zeros(len(candidates), dtype=np.int64)
+
+        scores = self.review_index.scores(query_vector, candidates) + keyword_weight * match_counts
+        codes = self.product_codes[candidates]
+
+        # 제품별 점수 내림차순으로 정렬 후 제품 안 순위가 reviews_per_product 미만인 리뷰만 사용
+        order = np.lexsort((-scores, codes))
+        sorted_codes = codes[order]
+        group_starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        ranks = np.arange(len(order)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(order)]))
+        top_reviews = order[ranks < reviews_per_product]
+
+        n_products = len(self.product_names)
+        counts = np.bincount(codes, minlength=n_products)
+        top_sums = np.bincount(codes[top_reviews], weights=scores[top_reviews], minlength=n_products)
+        top_counts = np.bincount(codes[top_reviews], minlength=n_products)
+        totals = np.where(top_counts > 0, top_sums / np.maximum(top_counts, 1), -np.inf)
+
+        top_k = min(top_k, int((counts > 0).sum()))
+        if top_k <= 0:
+            return []
+        top = np.argpartition(-totals, top_k - 1)[:top_k]
+        top = top[np.argsort(-totals[top])]
+
+        results = []
+        for code in top:
+            in_product = codes == code
+            best = candidates[in_product][int(np.argmax(scores[in_product]))]
+            results.append({
+                "id": self.product_names[code],
+                "score": float(totals[code]),
+                "metadata": {**self.review_index.metadata[best], "review_count": int(counts[code])}
+            })
+        return results
+
+
+def build_review_search_index(category: str, review_index: Optional[LocalVectorIndex] = None) -> ReviewSearchIndex:
+    """리뷰 인덱스 + reviews_bulk CSV 태그로 역색인 빌드 후 저장"""
+    import pandas as pd
+    from embedding_pipeline import review_vector_id
+
+    if review_index is None:
+        review_index = LocalVectorIndex.load(review_index_path(category))
+
+    def tag_rows():
+        csv_path = os.path.join(DATA_DIR, f"reviews_bulk_{category}.csv")
+        for chunk in pd.read_csv(csv_path, encoding="utf-8", chunksize=2000):
+            for row in chunk.to_dict("records"):
+                if not isinstance(row.get("review"), str):
+                    continue
+                yield {
+                    "id": review_vector_id(str(row.get("product_name", "")), row["review"]),
+                    "tags": parse_tags(row.get("title"), row.get("skin_type"))
+                }
+
+    search_index = ReviewSearchIndex.build(review_index, tag_rows())
+    search_index.save(postings_path(category))
+    _search_indexes.pop(category, None)
+    print(f"✅ {category}: 리뷰 {len(review_index)}개, 토큰 {len(search_index.postings)}개 역색인 저장")
+    return search_index
+
+
+def get_review_search_index(category: str) -> Optional[ReviewSearchIndex]:
+    """카테고리 리뷰 검색 인덱스 (처음 사용할 때 로드, 빌드 전이면 None)"""
+    if category not in _search_indexes:
+        index_path, posting_path = review_index_path(category), postings_path(category)
+        if os.path.exists(index_path) and os.path.exists(posting_path):
+            _search_indexes[category] = ReviewSearchIndex.load(LocalVectorIndex.load(index_path), posting_path)
+        else:
+            _search_indexes[category] = None
+    return _search_indexes[category]
+
+
+def hybrid_search(query_vector, category: str, keywords: Iterable[str] = (), top_k: int = 5,
+                  keyword_weight: float = DEFAULT_KEYWORD_WEIGHT) -> Optional[List[Dict]]:
+    """카테고리 하이브리드 검색 (인덱스가 빌드되지 않았으면 None)"""
+    search_index = get_review_search_index(category)
+    if search_index is None:
+        return None
+    return search_index.search(query_vector, keywords=keywords, top_k=top_k, keyword_weight=keyword_weight)
+
+
+def main():
+    from embedding_pipeline import CATEGORIES
+
+    parser = argparse.ArgumentParser(description="리뷰 키워드/태그 역색인 빌드")
+    parser.add_argument("--category", choices=list(CATEGORIES.keys()), default=None)
+    args = parser.parse_args()
+
+    categories = [args.category] if args.category else list(CATEGORIES.keys())
+    for category in categories:
+        build_review_search_index(category)
+
+
+if __name__ == "__main__":
+    main()
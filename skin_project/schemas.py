@@ -137,6 +137,7 @@ class RecommendAIRequest(BaseModel):
     diagnosis: List[str]
     skin_type: str
     sensitivity: str
+    user_id: Optional[int] = None  # 있으면 사용자 프로필로 개인화
 
 # 추천 내역 저장용 스키마
 class RecommendationHistoryCreate(BaseModel):
@@ -2,13 +2,15 @@
 AI 피부 분석 관련 CRUD 함수들
 """
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from core.models.db_models import SkinAnalysisResult, SkinAnalysisConcern, SkinAnalysisRecommendation, SkinAnalysisImage
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 import json
 
-def create_skin_analysis_result(
-    db: Session,
+from pagination import Page, paginate
+
+def build_skin_analysis_result(
     user_id: int,
     image_url: str,
     skin_type: str,
@@ -27,10 +29,8 @@ def create_skin_analysis_result(
     acne_score: Optional[int] = None,
     analysis_date: Optional[datetime] = None
 ) -> SkinAnalysisResult:
-    """AI 피부 분석 결과 저장"""
-    
-    # 메인 분석 결과 생성
-    analysis = SkinAnalysisResult(
+    """AI 피부 분석 결과 객체 생성 (고민사항/추천사항은 관계로 연결해 한 번에 저장)"""
+    return SkinAnalysisResult(
         user_id=user_id,
         image_url=image_url,
         analysis_date=analysis_date or datetime.utcnow(),
@@ -47,54 +47,55 @@ def create_skin_analysis_result(
         skin_type_confidence=confidence.get('skinType') if confidence else None,
         disease_confidence=confidence.get('disease') if confidence else None,
         state_confidence=confidence.get('state') if confidence else None,
-        detailed_analysis=detailed_analysis
+        detailed_analysis=detailed_analysis,
+        # 피부 고민사항
+        concerns=[
+            SkinAnalysisConcern(concern=concern, severity='medium')  # 기본값
+            for concern in concerns
+        ],
+        # 추천사항
+        recommendations=[
+            SkinAnalysisRecommendation(
+                recommendation_type='skincare',  # 기본값
+                recommendation_text=recommendation,
+                priority=1
+            )
+            for recommendation in recommendations
+        ]
     )
-    
+
+def create_skin_analysis_result(db: Session, **fields) -> SkinAnalysisResult:
+    """AI 피부 분석 결과 저장 (fields는 build_skin_analysis_result 인자)"""
+    analysis = build_skin_analysis_result(**fields)
     db.add(analysis)
-    db.flush()  # ID를 얻기 위해 flush
-    
-    # 피부 고민사항 추가
-    for concern in concerns:
-        concern_obj = SkinAnalysisConcern(
-            analysis_id=analysis.id,
-            concern=concern,
-            severity='medium'  # 기본값
-        )
-        db.add(concern_obj)
-    
-    # 추천사항 추가
-    for recommendation in recommendations:
-        recommendation_obj = SkinAnalysisRecommendation(
-            analysis_id=analysis.id,
-            recommendation_type='skincare',  # 기본값
-            recommendation_text=recommendation,
-            priority=1
-        )
-        db.add(recommendation_obj)
-    
     db.commit()
     db.refresh(analysis)
-    
+    return analysis
+
+async def create_skin_analysis_result_async(db: AsyncSession, **fields) -> SkinAnalysisResult:
+    """AI 피부 분석 결과 저장 (AsyncSession용)"""
+    analysis = build_skin_analysis_result(**fields)
+    db.add(analysis)
+    await db.commit()
     return analysis
 
 def get_user_skin_analysis_history(
     db: Session,
     user_id: int,
     skip: int = 0,
-    limit: int = 20
-) -> List[SkinAnalysisResult]:
-    """사용자의 AI 피부 분석 내역 조회"""
+    limit: int = 20,
+    cursor: Optional[str] = None
+) -> Page:
+    """사용자의 AI 피부 분석 내역 조회 (최신순)"""
     
-    return db.query(SkinAnalysisResult)\
+    query = db.query(SkinAnalysisResult)\
         .options(
             joinedload(SkinAnalysisResult.concerns),
             joinedload(SkinAnalysisResult.recommendations)
         )\
-        .filter(SkinAnalysisResult.user_id == user_id)\
-        .order_by(SkinAnalysisResult.analysis_date.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+        .filter(SkinAnalysisResult.user_id == user_id)
+    return paginate(query, [SkinAnalysisResult.analysis_date, SkinAnalysisResult.id], limit,
+                    cursor=cursor, skip=skip, descending=True)
 
 def get_skin_analysis_by_id(
     db: Session,
@@ -0,0 +1,229 @@
+"""
+LLM 구조화 출력 (JSON) 모드
+
+추천 이유/연고/시술을 자유 형식 텍스트 대신 아래 형태의 한 줄 JSON으로 받는다.
+    {"products":[{"category":"토너","reason":"..."}],
+     "ointment":{"name":"...","reason":"..."},
+     "procedures":[{"name":"...","reason":"..."}]}
+
+- 응답은 스트리밍으로 받으면서 항목(객체)이 닫히는 즉시 파싱/검증
+- 스트림이 중간에 끊기거나 JSON이 깨져도 이미 파싱된 항목은 사용
+- 파싱 실패는 재요청하지 않고 지표(structured_output_stats)로만 남김
+
+환경변수: LLM_OUTPUT_MODE (json | text, 기본 json)
+"""
+import os
+import json
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+STRUCTURED_OUTPUT = os.getenv("LLM_OUTPUT_MODE", "json").lower() == "json"
+
+FORMAT_EXAMPLE = {
+    "products": [{"category": "카테고리", "reason": "추천 이유"}],
+    "ointment": {"name": "연고 이름", "reason": "추천 이유"},
+    "procedures": [{"name": "시술 이름", "reason": "추천 이유"}]
+}
+
+
+class ProductReason(BaseModel):
+    category: str
+    reason: str
+
+    @field_validator("category", "reason")
+    @classmethod
+    def not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("빈 값")
+        return value
+
+
+class TreatmentItem(BaseModel):
+    name: str
+    reason: str
+
+    @field_validator("name", "reason")
+    @classmethod
+    def not_blank(cls, value: str) -> str:
+        value = value.strip()
+        if not value:
+            raise ValueError("빈 값")
+        return value
+
+
+class RecommendationOutput(BaseModel):
+    products: List[ProductReason] = []
+    ointment: Optional[TreatmentItem] = None
+    procedures: List[TreatmentItem] = []
+
+    @property
+    def empty(self) -> bool:
+        return not self.products and self.ointment is None and not self.procedures
+
+
+# ========== 지표 ==========
+_stats_lock = threading.Lock()
+_stats = {
+    "responses": 0,         # 구조화 모드 응답 수
+    "complete": 0,          # JSON 전체가 정상적으로 닫힌 응답
+    "partial": 0,           # 일부 항목만 파싱된 응답 (잘림/깨짐)
+    "failed": 0,            # 파싱된 항목이 하나도 없는 응답
+    "invalid_items": 0,     # 스키마 검증에 실패한 항목
+    "missing_products": 0   # 응답에 이유가 빠져 리뷰로 대체한 제품
+}
+
+
+def record_stat(name: str, count: int = 1):
+    with _stats_lock:
+        _stats[name] += count
+
+
+def structured_output_stats() -> Dict:
+    with _stats_lock:
+        return {"mode": "json" if STRUCTURED_OUTPUT else "text", **_stats}
+
+
+# ========== 스트리밍 파서 ==========
+class IncrementalJSONParser:
+    """JSON 텍스트를 조각 단위로 받아 항목이 닫히는 즉시 (최상위 키, 객체) 반환
+
+    최상위 객체의 값인 객체("ointment")와 최상위 배열 안의 객체("products", "procedures")를 항목으로 본다.
+    JSON 앞뒤의 다른 텍스트(코드 블록 표시 등)는 무시한다.
+    """
+
+    def __init__(self):
+        self.text: List[str] = []
+        self.length = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.last_string = ""
+        self.current_key: Optional[str] = None
+        self.item_start: Optional[int] = None
+        self.item_depth = 0
+        self.item_key: Optional[str] = None
+        self.started = False
+        self.finished = False
+        self._joined = ""
+
+    def _slice(self, start: int, end: int) -> str:
+        if len(self._joined) < end:
+            self._joined = "".join(self.text)
+        return self._joined[start:end]
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict]]:
+        items = []
+        base = self.length
+        self.text.append(chunk)
+        self.length += len(chunk)
+
+        for offset, char in enumerate(chunk):
+            position = base + offset
+            if self.finished:
+                break
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_string = self._slice(self.string_start, position)
+                continue
+
+            if char == '"' and self.stack:
+                self.in_string = True
+                self.string_start = position + 1
+            elif char == ":" and len(self.stack) == 1:
+                self.current_key = self.last_string
+            elif char in "{[":
+                if not self.stack and char == "[":
+                    continue
+                if char == "{" and self.item_start is None and (
+                        self.stack == ["{"] or self.stack == ["{", "["]):
+                    self.item_start = position
+                    self.item_depth = len(self.stack)
+                    self.item_key = self.current_key
+                self.stack.append(char)
+                self.started = True
+            elif char in "}]" and self.stack:
+                self.stack.pop()
+                if char == "}" and self.item_start is not None and len(self.stack) == self.item_depth:
+                    raw = self._slice(self.item_start, position + 1)
+                    self.item_start = None
+                    try:
+                        items.append((self.item_key, json.loads(raw)))
+                    except json.JSONDecodeError:
+                        record_stat("invalid_items")
+                if not self.stack:
+                    self.finished = True
+        return items
+
+    @property
+    def complete(self) -> bool:
+        return self.started and self.finished
+
+
+def add_item(output: RecommendationOutput, key: Optional[str], value: Dict) -> bool:
+    """파싱된 항목을 스키마로 검증해 결과에 추가 (검증 실패는 지표로 기록)"""
+    try:
+        if key == "products":
+            output.products.append(ProductReason.model_validate(value))
+        elif key == "ointment":
+            output.ointment = TreatmentItem.model_validate(value)
+        elif key == "procedures":
+            output.procedures.append(TreatmentItem.model_validate(value))
+        else:
+            return False
+        return True
+    except ValidationError:
+        record_stat("invalid_items")
+        return False
+
+
+# ========== 요청 ==========
+def format_instruction(with_products: bool, categories: Optional[List[str]] = None) -> str:
+    example = dict(FORMAT_EXAMPLE)
+    if not with_products:
+        example.pop("products")
+    instruction = "아래 JSON 형식으로만 공백 없이 한 줄로 답해줘. 다른 텍스트는 쓰지 마.\n"
+    if with_products and categories:
+        instruction += f"products의 category는 {', '.join(categories)} 중 하나로 써줘.\n"
+    return instruction + json.dumps(example, ensure_ascii=False, separators=(",", ":"))
+
+
+def request_structured(messages: List[Dict], tag: str, **kwargs) -> RecommendationOutput:
+    """LLM을 JSON 모드 스트리밍으로 호출해 항목을 점진적으로 파싱
+
+    스트림이 끊겨도 파싱된 항목이 있으면 그대로 반환하고, 하나도 없으면 LLMUnavailableError
+    """
+    from llm_client import llm_client, LLMUnavailableError
+
+    parser = IncrementalJSONParser()
+    output = RecommendationOutput()
+    record_stat("responses")
+    try:
+        for chunk in llm_client.stream_chat(messages, tag=tag, response_format={"type": "json_object"}, **kwargs):
+            for key, value in parser.feed(chunk):
+                add_item(output, key, value)
+    except LLMUnavailableError as e:
+        if output.empty:
+            if parser.started:
+                record_stat("failed")
+            raise
+        print(f"⚠️ 구조화 응답 스트림 중단, 파싱된 항목만 사용합니다: {e}")
+
+    if parser.complete and not output.empty:
+        record_stat("complete")
+    elif output.empty:
+        record_stat("failed")
+        print("⚠️ 구조화 응답 파싱 실패 (항목 없음)")
+    else:
+        record_stat("partial")
+        print("⚠️ 구조화 응답 일부만 파싱됨")
+    return output
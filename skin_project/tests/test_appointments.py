@@ -0,0 +1,141 @@
+"""
+예약 목록 조회 쿼리 수 / 대시보드 통계 캐시 테스트
+
+medical_crud.get_appointments는 의사/병원/진료 기록/사용자를 한 번의 쿼리로 함께 로드하므로
+예약 수가 늘어나도 실행되는 SQL 문 수가 같아야 한다 (N+1 회귀 방지).
+의사 대시보드 통계 캐시는 예약이 바뀌면 (이전 담당 의사 포함) 무효화되어야 한다.
+
+    cd skin_project && python -m pytest tests
+"""
+import os
+import sys
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base
+from core.models.db_models import User, GenderEnum
+from core.models.medical_models import Base as MedicalBase, Hospital, Doctor, Appointment, MedicalRecord
+import medical_crud
+
+
+@pytest.fixture
+def make_db():
+    """예약 count개가 들어 있는 새 sqlite 메모리 DB 세션을 만드는 함수"""
+    sessions = []
+
+    def make(count: int):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine, tables=[User.__table__])
+        MedicalBase.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        sessions.append(session)
+        seed_appointments(session, count)
+        return session
+
+    yield make
+    for session in sessions:
+        engine = session.get_bind()
+        session.close()
+        engine.dispose()
+
+
+def seed_appointments(db, count: int):
+    """사용자/의사/병원을 여러 명 두고 예약 count개 (절반은 진료 기록 포함) 생성"""
+    hospitals = [Hospital(name=f"병원{i}", address="서울") for i in range(3)]
+    db.add_all(hospitals)
+    db.flush()
+    doctors = [Doctor(name=f"의사{i}", hospital_id=hospitals[i % 3].id) for i in range(5)]
+    users = [
+        User(username=f"user{i}", email=f"user{i}@example.com", phone_number=f"010{i:08d}",
+             hashed_password="x", gender=GenderEnum.female, age=30, skin_type="건성")
+        for i in range(7)
+    ]
+    db.add_all(doctors + users)
+    db.flush()
+
+    for i in range(count):
+        doctor = doctors[i % len(doctors)]
+        appointment = Appointment(
+            user_id=users[i % len(users)].id,
+            doctor_id=doctor.id,
+            hospital_id=doctor.hospital_id,
+            appointment_date=date(2024, 1, 1 + i % 28),
+            appointment_time=time(9 + (i // 28) % 9, (i // 252) % 60),
+            status="confirmed"
+        )
+        db.add(appointment)
+        if i % 2 == 0:
+            db.flush()
+            db.add(MedicalRecord(appointment_id=appointment.id, diagnosis="여드름"))
+    db.commit()
+    db.expunge_all()
+
+
+def count_listing_statements(db, limit: int) -> int:
+    """예약 목록 조회 + 응답에 쓰는 관계 접근까지 실행된 SQL 문 수"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        appointments = medical_crud.get_appointments(db, limit=limit)
+        for appointment in appointments:
+            appointment.doctor.hospital.name
+            appointment.hospital.name
+            appointment.medical_record
+            appointment.user.username
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert len(appointments) == limit
+    return len(statements)
+
+
+def test_get_appointments_query_count_is_constant(make_db):
+    n = 20
+    small = count_listing_statements(make_db(n), limit=n)
+    large = count_listing_statements(make_db(3 * n), limit=3 * n)
+
+    assert small == large
+
+
+def test_dashboard_stats_invalidated_for_previous_doctor(make_db):
+    db = make_db(10)
+    medical_crud.invalidate_dashboard_stats()
+    appointment = db.query(Appointment).filter(Appointment.doctor_id == 1).first()
+    before = medical_crud.get_doctor_dashboard_stats(db, 1)["pending_appointments"]
+    medical_crud.get_doctor_dashboard_stats(db, 2)
+
+    appointment.doctor_id = 2
+    db.commit()
+
+    assert 1 not in medical_crud._dashboard_cache and 2 not in medical_crud._dashboard_cache
+    assert medical_crud.get_doctor_dashboard_stats(db, 1)["pending_appointments"] == before - 1
+
+
+def test_dashboard_stats_not_cached_when_invalidated_during_query(make_db):
+    db = make_db(10)
+    medical_crud.invalidate_dashboard_stats()
+
+    # 집계 쿼리 실행 중에 다른 세션이 예약을 바꿔 커밋한 상황
+    def invalidate_during_query(conn, cursor, statement, parameters, context, executemany):
+        medical_crud.invalidate_dashboard_stats(1)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", invalidate_during_query)
+    try:
+        medical_crud.get_doctor_dashboard_stats(db, 1)
+    finally:
+        event.remove(engine, "before_cursor_execute", invalidate_during_query)
+
+    assert 1 not in medical_crud._dashboard_cache
+    medical_crud.get_doctor_dashboard_stats(db, 1)
+    assert 1 in medical_crud._dashboard_cache
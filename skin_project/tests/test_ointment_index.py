@@ -0,0 +1,41 @@
+"""
+연고 로컬 인덱스 오프라인 빌드 테스트
+
+tests/fixtures/ointment에 기록된 응답(page_0001.xml 한 페이지, totalCount는 더 큼)으로
+인덱스를 만든다. 임베딩 모델은 내려받지 않도록 고정 차원의 가짜 인코더로 바꾼다.
+
+    cd skin_project && python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import embedding_service
+import ointment_index
+from ointment_index import build_ointment_index, fixture_page_source, DEFAULT_ROWS
+from vector_store import LocalVectorIndex
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ointment")
+
+
+def fake_encode(texts, batched=True):
+    return np.array([[len(text), 1.0, 0.0, 0.0] for text in texts], dtype=np.float32)
+
+
+def test_build_ointment_index_from_recorded_fixture(monkeypatch, tmp_path):
+    monkeypatch.setattr(embedding_service, "encode", fake_encode)
+    index_path = str(tmp_path / "ointment_index.npz")
+    monkeypatch.setattr(ointment_index, "ointment_index_path", lambda: index_path)
+
+    # totalCount(250) 기준 페이지 수가 기록된 파일 수(1)보다 많아도 기록된 페이지만 읽어야 한다
+    source, max_pages = fixture_page_source(FIXTURE_DIR)
+    assert max_pages == 1
+    index, records = build_ointment_index(source, num_rows=DEFAULT_ROWS, max_pages=max_pages)
+
+    assert [record["id"] for record in records] == ["ointment_197500285", "ointment_200400356"]
+    assert records[0]["metadata"]["product_name"] == "후시딘연고"
+    assert records[1]["metadata"]["company"] == "(주)태극제약"
+    assert len(LocalVectorIndex.load(index_path)) == len(index) == 2
@@ -0,0 +1,71 @@
+"""
+키셋 페이지네이션 테스트
+
+페이지 경계 행(각 페이지의 마지막 행)의 정렬 키가 다음 행들과 같아도
+커서로 끝까지 넘기면 모든 행을 한 번씩 받아야 한다.
+
+    cd skin_project && python -m pytest tests
+"""
+import os
+import sys
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.models.medical_models import Base as MedicalBase, Hospital, Doctor, Appointment, MedicalRecord
+from pagination import paginate
+import medical_crud
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    MedicalBase.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def seed_records(db, count: int, user_id: int = 1):
+    """진료 기록 count개 (3개씩 같은 created_at으로 묶어 페이지 경계에 동점이 생기게 함)"""
+    hospital = Hospital(name="병원", address="서울")
+    db.add(hospital)
+    db.flush()
+    doctor = Doctor(name="의사", hospital_id=hospital.id)
+    db.add(doctor)
+    db.flush()
+    for i in range(count):
+        appointment = Appointment(user_id=user_id, doctor_id=doctor.id, hospital_id=hospital.id,
+                                  appointment_date=date(2024, 1, 1 + i % 28), appointment_time=time(9, i % 60),
+                                  status="completed")
+        db.add(appointment)
+        db.flush()
+        db.add(MedicalRecord(appointment_id=appointment.id, diagnosis="여드름",
+                             created_at=datetime(2024, 1, 1, 9, i // 3)))
+    db.commit()
+
+
+def test_medical_records_pages_past_boundary_rows(db):
+    seed_records(db, 10)
+
+    seen = []
+    page = medical_crud.get_medical_records(db, user_id=1, limit=4)
+    seen.extend(record.id for record in page)
+    while page.next_cursor:
+        page = medical_crud.get_medical_records(db, user_id=1, limit=4, cursor=page.next_cursor)
+        seen.extend(record.id for record in page)
+
+    expected = [record.id for record in medical_crud.get_medical_records(db, user_id=1, limit=100)]
+    assert len(expected) == 10
+    assert seen == expected
+
+
+def test_paginate_rejects_nullable_sort_key(db):
+    with pytest.raises(ValueError):
+        paginate(db.query(Appointment), [Appointment.created_at, Appointment.id], 10)
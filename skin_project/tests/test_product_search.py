@@ -0,0 +1,45 @@
+"""
+제품 검색 색인 변경분(delta) 테스트
+
+커밋 반영은 기본 색인을 공유한 채 변경분 층만 새로 만들어야 하고,
+이전 스냅샷으로 검색 중인 스레드에는 변경이 보이지 않아야 한다.
+
+    cd skin_project && python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_search import ProductSearchIndex
+
+
+def ids(results):
+    return sorted(product_id for _, product_id in results)
+
+
+def test_with_changes_shares_base_and_keeps_old_snapshot():
+    base = ProductSearchIndex()
+    base.add(1, "수분 크림", "브랜드A", "촉촉한 보습")
+    base.add(2, "진정 토너", "브랜드B", "민감 피부")
+    base.add(3, "수분 토너", "브랜드A", None)
+
+    updated = base.with_changes({
+        1: ("비타민 앰플", "브랜드A", "미백"),  # 수정
+        2: None,  # 삭제
+        4: ("수분 앰플", "브랜드C", None)  # 추가
+    })
+
+    assert updated.documents is base.documents and updated.postings is base.postings
+    assert ids(updated.search("수분")) == [3, 4]
+    assert ids(updated.search("앰플")) == [1, 4]
+    assert ids(updated.search("토너")) == [3]
+    assert len(updated) == 3
+
+    assert ids(base.search("수분")) == [1, 3]
+    assert ids(base.search("토너")) == [2, 3]
+    assert len(base) == 3
+
+    again = updated.with_changes({2: ("진정 크림", "브랜드B", None)})
+    assert ids(again.search("크림")) == [2]
+    assert ids(updated.search("크림")) == []
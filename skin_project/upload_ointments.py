@@ -1,88 +1,49 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone
 import os
+import argparse
+import pandas as pd
 from dotenv import load_dotenv
+from ointment_index import build_ointment_index, http_page_source, fixture_page_source, DEFAULT_KEYWORD, DEFAULT_ROWS
 
 # 1. 환경 변수 로딩
 load_dotenv()
 
-# 2. API 키 및 Pinecone 초기화
+# 2. API 키
 SERVICE_KEY = os.getenv("MEDICINE_API_KEY")  # 반드시 .env에 정확히 저장되어 있어야 함
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index("ointment")
-model = SentenceTransformer("jhgan/ko-sbert-nli")
-
-# 3. 연고 데이터 수집 함수
-def fetch_ointments(keyword="연고", num_rows=30, service_key=""):
-    url = 'http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList'
-    params = {
-        'serviceKey': service_key,
-        'pageNo': '1',
-        'numOfRows': num_rows,
-        'itemName': keyword,  # ✅ 유효한 파라미터로 수정
-        'type': 'xml'
-    }
-    res = requests.get(url, params=params)
-    print(f"[응답코드] {res.status_code}")
-    print("[응답 일부]:", res.text[:300])
-
-    soup = BeautifulSoup(res.content, features="xml")
-    items = soup.find_all("item")
-    data = []
-    for i, item in enumerate(items):
-        name = item.find("itemname").text if item.find("itemname") else ""
-        effect = item.find("efcyqesitm").text if item.find("efcyqesitm") else ""
-        howto = item.find("usemethodqesitm").text if item.find("usemethodqesitm") else ""
-        if not name:
-            continue
-        data.append({
-            "id": f"ointment_{i}",
-            "product_name": name,
-            "review": effect,
-            "effect": effect,
-            "how_to": howto,
-            "skin_type": "지성",
-            "category": "ointment",
-            "image_url": "",
-            "link": ""
-        })
-    return data
 
-# 4. 실행
+# 3. 실행
+# 연고 데이터를 스트리밍 파싱 + 페이지 동시 요청으로 모두 가져와 배치 인코딩하고
+# 로컬 인덱스(crawler/data/ointment_index.npz)로 저장한다. --pinecone 이면 원격 ointment 인덱스에도 업로드
 if __name__ == "__main__":
-    data = fetch_ointments(service_key=SERVICE_KEY)
+    parser = argparse.ArgumentParser(description="연고 데이터 수집 및 인덱스 저장")
+    parser.add_argument("--keyword", default=DEFAULT_KEYWORD)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--fixture", default=None, help="기록된 응답 디렉터리 (오프라인)")
+    parser.add_argument("--pinecone", action="store_true", help="Pinecone ointment 인덱스에도 업로드")
+    args = parser.parse_args()
+
+    max_pages = None
+    if args.fixture:
+        source, max_pages = fixture_page_source(args.fixture)
+    else:
+        source = http_page_source(SERVICE_KEY, args.keyword, args.rows)
+    index, data = build_ointment_index(source, num_rows=args.rows, max_pages=max_pages)
 
     print(f"✅ 가져온 연고 수: {len(data)}개")
     if len(data) == 0:
         print("❗ [중단] 가져온 데이터가 없습니다. 인증키 또는 키워드를 확인하세요.")
         exit()
 
-    vectors = []
-    for item in data:
-        text = f"{item['skin_type']} | {item['review']}"
-        emb = model.encode(text).tolist()
-        metadata = {
-            "product_name": item["product_name"],
-            "review": item["review"],
-            "skin_type": item["skin_type"],
-            "category": item["category"],
-            "effect": item["effect"],
-            "how_to": item["how_to"],
-            "image_url": item["image_url"],
-            "link": item["link"]
-        }
-        vectors.append({
-            "id": item["id"],
-            "values": emb,
-            "metadata": metadata
-        })
+    if args.pinecone:
+        from pinecone import Pinecone
+        from embedding_pipeline import upsert_in_chunks
 
-    print("📦 업로드할 첫 벡터 예시:\n", vectors[0])
-    index.upsert(vectors=vectors)
-    print(f"✅ 연고 {len(vectors)}개 Pinecone 업로드 완료!")
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        vectors = [
+            {"id": vector_id, "values": index.matrix[i].tolist(), "metadata": index.metadata[i]}
+            for i, vector_id in enumerate(index.ids)
+        ]
+        upsert_in_chunks(pc.Index("ointment"), vectors)
+        print(f"✅ 연고 {len(vectors)}개 Pinecone 업로드 완료!")
 
     # CSV 저장 (옵션)
-    pd.DataFrame(data).to_csv("ointments_acne.csv", index=False, encoding="utf-8")
+    pd.DataFrame([record["metadata"] for record in data]).to_csv("ointments_acne.csv", index=False, encoding="utf-8")
@@ -0,0 +1,199 @@
+"""
+사용자 피부 프로필 벡터 기반 추천 개인화
+
+- 피부 분석 결과 / 제품 리뷰가 저장될 때마다 사용자 프로필 벡터를 지수 이동 평균으로 갱신한다
+  (요청 시 내역 전체를 다시 읽지 않음)
+- 추천 내역이 저장될 때 추천된 제품명을 프로필에 기록한다
+- 추천 시에는 질의 벡터에 프로필 벡터를 섞어 검색하고,
+  이미 추천했거나 낮은 평점을 준 제품의 점수를 낮춰 재정렬한다
+- 같은 사용자의 프로필 갱신이 동시에 실행될 수 있으므로 행은 INSERT ... ON CONFLICT DO NOTHING으로 만들고
+  SELECT ... FOR UPDATE로 잠근 뒤 갱신한다 (갱신 유실/유니크 제약 위반 방지)
+"""
+import time
+import threading
+from typing import List, Dict, Optional, Iterable
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from core.models.db_models import UserSkinProfile
+
+PROFILE_ALPHA = 0.3        # 새 분석/리뷰를 프로필에 반영하는 비율
+QUERY_BLEND = 0.3          # 검색 시 질의 벡터에 섞는 프로필 비율
+DEMOTE_PENALTY = 0.15      # 이미 추천/비선호 제품 점수 감점
+RERANK_CANDIDATES = 10     # 재정렬할 후보 수
+MAX_RECOMMENDED = 50       # 기억할 최근 추천 제품 수
+LOW_RATING = 2.0           # 이 이하 평점은 비선호로 기록
+HIGH_RATING = 4.0          # 이 이상 평점만 프로필 벡터에 반영
+CACHE_TTL = 60.0           # 초
+
+_cache: Dict[int, tuple] = {}
+_cache_lock = threading.Lock()
+
+
+class UserProfile:
+    """추천 재정렬용 사용자 프로필 (미리 계산된 벡터 + 제외할 제품명)"""
+
+    def __init__(self, vector: Optional[np.ndarray], recommended: Iterable[str] = (), disliked: Iterable[str] = ()):
+        self.vector = vector
+        self.disliked = set(disliked)
+        self.demoted = set(recommended) | self.disliked
+
+    @property
+    def has_preferences(self) -> bool:
+        """분석/리뷰로 쌓인 선호 정보가 있는지 (추천 내역만 있는 프로필은 False)"""
+        return self.vector is not None or bool(self.disliked)
+
+    @classmethod
+    def from_row(cls, row: UserSkinProfile) -> "UserProfile":
+        vector = np.frombuffer(row.vector, dtype=np.float32) if row.vector else None
+        return cls(vector, row.recommended_products or [], row.disliked_products or [])
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+# ========== 조회 ==========
+def get_user_profile(user_id: Optional[int], db=None) -> Optional[UserProfile]:
+    """사용자 프로필 (프로세스 캐시 우선, 없으면 DB 한 번 조회)"""
+    if not user_id:
+        return None
+    now = time.monotonic()
+    cached = _cache.get(user_id)
+    if cached and now - cached[0] < CACHE_TTL:
+        return cached[1]
+
+    own_session = db is None
+    if own_session:
+        from database import SessionLocal
+        db = SessionLocal()
+    try:
+        row = db.query(UserSkinProfile).filter(UserSkinProfile.user_id == user_id).first()
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 사용자 프로필 조회 실패: {e}")
+        return None
+    finally:
+        if own_session:
+            db.close()
+
+    profile = UserProfile.from_row(row) if row else None
+    with _cache_lock:
+        _cache[user_id] = (now, profile)
+    return profile
+
+
+def personalize_query(query_vector, profile: Optional[UserProfile], blend: float = QUERY_BLEND) -> List[float]:
+    """질의 벡터에 프로필 벡터를 섞은 검색 벡터"""
+    query = np.asarray(query_vector, dtype=np.float32)
+    if profile is None or profile.vector is None or profile.vector.shape != query.shape:
+        return query.tolist()
+    blended = (1 - blend) * _normalize(query) + blend * _normalize(profile.vector)
+    return blended.tolist()
+
+
+def rerank(matches: List[Dict], profile: Optional[UserProfile], penalty: float = DEMOTE_PENALTY) -> List[Dict]:
+    """이미 추천했거나 비선호인 제품의 점수를 낮춰 재정렬"""
+    if profile is None or not profile.demoted or not matches:
+        return matches
+    names = [match.get("metadata", {}).get("product_name", match.get("id")) for match in matches]
+    scores = np.array([match["score"] for match in matches], dtype=np.float32)
+    scores -= penalty * np.isin(names, list(profile.demoted))
+    order = np.argsort(-scores, kind="stable")
+    return [{**matches[i], "score": float(scores[i])} for i in order]
+
+
+# ========== 점진적 갱신 ==========
+def _lock_profiles(db, user_ids: List[int]) -> Dict[int, UserSkinProfile]:
+    """프로필 행을 (없으면 만들고) 잠가서 반환 (커밋/롤백까지 같은 사용자의 다른 갱신은 대기)"""
+    insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+    db.execute(
+        insert(UserSkinProfile.__table__).on_conflict_do_nothing(index_elements=["user_id"]),
+        [{"user_id": user_id, "signal_count": 0, "recommended_products": [], "disliked_products": []}
+         for user_id in user_ids]
+    )
+    # 여러 사용자를 잠글 때 교착 상태를 피하도록 user_id 순서로 잠금
+    rows = db.query(UserSkinProfile)\
+        .filter(UserSkinProfile.user_id.in_(user_ids))\
+        .order_by(UserSkinProfile.user_id)\
+        .with_for_update()\
+        .populate_existing()\
+        .all()
+    return {row.user_id: row for row in rows}
+
+
+def _blend_signal(row: UserSkinProfile, signal: np.ndarray, alpha: float = PROFILE_ALPHA):
+    signal = _normalize(np.asarray(signal, dtype=np.float32))
+    current = np.frombuffer(row.vector, dtype=np.float32) if row.vector else None
+    if current is None or current.shape != signal.shape:
+        updated = signal
+    else:
+        updated = _normalize((1 - alpha) * current + alpha * signal)
+    row.vector = updated.astype(np.float32).tobytes()
+    row.signal_count = (row.signal_count or 0) + 1
+
+
+def invalidate(user_ids: Iterable[int]):
+    with _cache_lock:
+        for user_id in user_ids:
+            _cache.pop(user_id, None)
+
+
+def _update(user_id: int, signal_text: Optional[str] = None, disliked_product_id: Optional[int] = None):
+    from database import SessionLocal
+    from embedding_service import encode
+    from core.models.db_models import Product
+
+    db = SessionLocal()
+    try:
+        # 임베딩/제품 조회는 행을 잠그기 전에
+        signal = encode(signal_text) if signal_text else None
+        disliked = None
+        if disliked_product_id:
+            product = db.query(Product.name).filter(Product.id == disliked_product_id).first()
+            disliked = product.name if product else None
+
+        row = _lock_profiles(db, [user_id])[user_id]
+        if signal is not None:
+            _blend_signal(row, signal)
+        if disliked and disliked not in (row.disliked_products or []):
+            row.disliked_products = (row.disliked_products or []) + [disliked]
+        db.commit()
+        invalidate([user_id])
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ 사용자 프로필 갱신 실패 (user {user_id}): {e}")
+    finally:
+        db.close()
+
+
+def update_from_analysis(user_id: int, skin_type: str, concerns: List[str]):
+    """피부 분석 결과 저장 후 호출 (추천 질의와 같은 형식의 문장으로 반영)"""
+    _update(user_id, signal_text=f"{skin_type} 피부 / 상태: {', '.join(concerns)}")
+
+
+def update_from_review(user_id: int, product_id: int, content: str, rating: Optional[float], skin_type: Optional[str] = None):
+    """제품 리뷰 저장 후 호출 (높은 평점은 벡터에 반영, 낮은 평점은 비선호 제품으로 기록)"""
+    from embedding_pipeline import build_embedding_text
+
+    rating = float(rating or 0)
+    if rating >= HIGH_RATING and content:
+        _update(user_id, signal_text=build_embedding_text(skin_type, content))
+    elif 0 < rating <= LOW_RATING and product_id:
+        _update(user_id, disliked_product_id=product_id)
+
+
+def apply_recommended(db, recommended: Dict[int, List[str]]):
+    """추천 내역 배치의 추천 제품명을 프로필에 기록 (커밋은 호출한 쪽 트랜잭션에서)"""
+    user_ids = sorted(user_id for user_id in recommended if user_id)
+    if not user_ids:
+        return
+    rows = _lock_profiles(db, user_ids)
+    for user_id in user_ids:
+        row = rows[user_id]
+        names = list(dict.fromkeys(name for name in recommended[user_id] if name))
+        previous = [name for name in (row.recommended_products or []) if name not in names]
+        row.recommended_products = (names + previous)[:MAX_RECOMMENDED]
@@ -0,0 +1,148 @@
+"""
+로컬 인메모리 벡터 인덱스
+
+Pinecone Index와 같은 upsert/query 인터페이스를 제공하는 작은 numpy 기반 인덱스.
+제품 수준 인덱스처럼 수천 개 이하의 벡터를 한 번의 행렬곱으로 검색할 때 사용한다.
+"""
+import os
+import json
+from typing import List, Dict, Optional
+
+import numpy as np
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorIndex:
+    """코사인 유사도 기반 로컬 벡터 인덱스 (.npz 파일로 저장/로드)"""
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.dimension = dimension
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self._positions: Dict[str, int] = {}
+        self._rows: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._mask_cache: Dict[tuple, np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ========== 쓰기 ==========
+    def upsert(self, vectors: List, namespace: Optional[str] = None):
+        """Pinecone과 같은 형식의 벡터 리스트 업서트 (dict 또는 (id, values, metadata) 튜플)"""
+        for vector in vectors:
+            if isinstance(vector, dict):
+                vector_id, values, metadata = vector["id"], vector["values"], vector.get("metadata", {})
+            else:
+                vector_id, values, metadata = vector[0], vector[1], (vector[2] if len(vector) > 2 else {})
+
+            row = np.asarray(values, dtype=np.float32)
+            if self.dimension is None:
+                self.dimension = row.shape[0]
+
+            position = self._positions.get(vector_id)
+            if position is None:
+                self._positions[vector_id] = len(self.ids)
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+                self._rows.append(row)
+            else:
+                self.metadata[position] = metadata
+                self._rows[position] = row
+        self._matrix = None
+        self._mask_cache = {}
+
+    def delete(self, ids: List[str], namespace: Optional[str] = None):
+        removed = set(ids)
+        keep = [i for i, vector_id in enumerate(self.ids) if vector_id not in removed]
+        self.ids = [self.ids[i] for i in keep]
+        self.metadata = [self.metadata[i] for i in keep]
+        self._rows = [self._rows[i] for i in keep]
+        self._positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self._matrix = None
+        self._mask_cache = {}
+
+    # ========== 조회 ==========
+    @property
+    def matrix(self) -> np.ndarray:
+        """정규화된 (N, D) 행렬 (쓰기 후 처음 조회할 때 한 번만 생성)"""
+        if self._matrix is None:
+            if self._rows:
+                self._matrix = _normalize(np.vstack(self._rows).astype(np.float32))
+            else:
+                self._matrix = np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return self._matrix
+
+    def position(self, vector_id: str) -> Optional[int]:
+        return self._positions.get(vector_id)
+
+    def filter_mask(self, filter: Dict) -> np.ndarray:
+        """메타데이터 동등 조건 마스크 (조건별로 캐시해서 요청마다 다시 만들지 않음)"""
+        key = tuple(sorted(filter.items()))
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = np.array([
+                all(meta.get(field) == value for field, value in filter.items())
+                for meta in self.metadata
+            ], dtype=bool)
+            self._mask_cache[key] = mask
+        return mask
+
+    def scores(self, vector, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """코사인 유사도 (positions를 주면 해당 행만 계산)"""
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        if positions is not None:
+            return self.matrix[positions] @ query
+        return self.matrix @ query
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True, filter: Optional[Dict] = None, **kwargs) -> Dict:
+        """Pinecone query와 같은 형식의 결과 반환 ({"matches": [{"id", "score", "metadata"}]})"""
+        if not self.ids:
+            return {"matches": []}
+
+        scores = self.scores(vector)
+        if filter:
+            scores = np.where(self.filter_mask(filter), scores, -np.inf)
+
+        top_k = min(top_k, len(self.ids))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for i in top:
+            if not np.isfinite(scores[i]):
+                continue
+            match = {"id": self.ids[i], "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = self.metadata[i]
+            matches.append(match)
+        return {"matches": matches}
+
+    # ========== 저장/로드 ==========
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array(self.ids, dtype=object),
+            vectors=self.matrix,
+            metadata=np.array(json.dumps(self.metadata, ensure_ascii=False))
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        data = np.load(path, allow_pickle=True)
+        vectors = data["vectors"].astype(np.float32)
+        index = cls(dimension=vectors.shape[1] if vectors.ndim == 2 else None)
+        index.ids = [str(vector_id) for vector_id in data["ids"]]
+        index.metadata = json.loads(str(data["metadata"]))
+        index._positions = {vector_id: i for i, vector_id in enumerate(index.ids)}
+        index._rows = list(vectors)
+        index._matrix = vectors
+        return index